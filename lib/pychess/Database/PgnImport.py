@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 import collections
+import hashlib
+import multiprocessing
 import os
 import re
 import subprocess
@@ -16,7 +18,7 @@ from pychess.Variants import name2variant
 from pychess.System.Log import log
 from pychess.System import download_file
 from pychess.System.protoopen import protoopen, protosave, PGN_ENCODING
-from pychess.Database.model import event, site, player, game, annotator, tag_game, source
+from pychess.Database.model import event, site, player, game, annotator, tag_game, source, set_sync
 # from pychess.System import profile_me
 
 # Editable (on game info dialog) tags
@@ -27,6 +29,14 @@ other_game_tags = ('Result', 'SetUp', 'FEN', 'ECO', 'Variant', 'PlyCount', 'Anno
 
 TAG_REGEX = re.compile(r"\[([a-zA-Z0-9_]+)\s+\"(.*)\"\]")
 
+# Big .pgn files are split to byte ranges of about this size at game
+# boundaries, and their headers are parsed in parallel
+SHARD_SIZE = 16 * 1024 * 1024
+
+# Size of the block before the end of the last import whose checksum
+# tells if a .pgn was only appended since
+SYNC_BLOCK = 64 * 1024
+
 GAME, EVENT, SITE, PLAYER, ANNOTATOR, SOURCE, STAT = range(7)
 
 removeDic = {
@@ -46,9 +56,11 @@ pgn2Const = {"*": RUNNING,
 
 
 class PgnImport():
-    def __init__(self, chessfile, append_pgn=False):
+    def __init__(self, chessfile, append_pgn=False, cores=None):
         self.chessfile = chessfile
         self.append_pgn = append_pgn
+        # number of header parser processes, defaults to the cpu count
+        self.cores = cores
         self.cancel = False
 
     def initialize(self):
@@ -57,7 +69,7 @@ class PgnImport():
         self.conn = self.engine.connect()
         self.CHUNK = 1000
 
-        self.count_source = select([func.count()]).select_from(source)
+        self.source_id = select([source.c.id])
 
         self.ins_event = event.insert()
         self.ins_site = site.insert()
@@ -115,6 +127,58 @@ class PgnImport():
         self.next_id[field] += 1
         return name_dict[name]
 
+    def get_ids(self, games):
+        """ Resolves the event/site/player/annotator names of a batch of
+            parsed games to ids, collecting the new names in one pass """
+
+        event_dict = self.event_dict
+        site_dict = self.site_dict
+        player_dict = self.player_dict
+        annotator_dict = self.annotator_dict
+
+        new_events = {}
+        new_sites = {}
+        new_players = {}
+        new_annotators = {}
+
+        for row, tags in games:
+            name = row["event_id"]
+            if name and name not in event_dict:
+                new_events.setdefault(name, name)
+            name = row["site_id"]
+            if name and name not in site_dict:
+                new_sites.setdefault(name, name)
+            for color in ("white_id", "black_id"):
+                name = row[color]
+                if name:
+                    key = name.title().translate(removeDic)
+                    if key not in player_dict:
+                        new_players.setdefault(key, name)
+            name = row["annotator_id"]
+            if name and name not in annotator_dict:
+                new_annotators.setdefault(name, name)
+
+        for new_names, name_dict, name_data, field in (
+                (new_events, event_dict, self.event_data, EVENT),
+                (new_sites, site_dict, self.site_data, SITE),
+                (new_players, player_dict, self.player_data, PLAYER),
+                (new_annotators, annotator_dict, self.annotator_data, ANNOTATOR)):
+            for key, name in new_names.items():
+                name_dict[key] = self.next_id[field]
+                name_data.append({'name': name})
+                self.next_id[field] += 1
+
+        for row, tags in games:
+            name = row["event_id"]
+            row["event_id"] = event_dict[name] if name else None
+            name = row["site_id"]
+            row["site_id"] = site_dict[name] if name else None
+            for color in ("white_id", "black_id"):
+                name = row[color]
+                row[color] = player_dict[name.title().translate(removeDic)] if name else None
+            name = row["annotator_id"]
+            row["annotator_id"] = annotator_dict[name] if name else None
+
     def ini_names(self, name_table, field):
         if field != GAME and field != STAT:
             s = select([name_table])
@@ -145,13 +209,73 @@ class PgnImport():
         GLib.idle_add(self.progressbar.set_text, "")
         self.cancel = True
 
+    def write_chunk(self):
+        """ Inserts the collected names and games """
+        if self.event_data:
+            self.conn.execute(self.ins_event, self.event_data)
+            self.event_data = []
+
+        if self.site_data:
+            self.conn.execute(self.ins_site, self.site_data)
+            self.site_data = []
+
+        if self.player_data:
+            self.conn.execute(self.ins_player, self.player_data)
+            self.player_data = []
+
+        if self.annotator_data:
+            self.conn.execute(self.ins_annotator, self.annotator_data)
+            self.annotator_data = []
+
+        if self.source_data:
+            self.conn.execute(self.ins_source, self.source_data)
+            self.source_data = []
+
+        if self.tag_game_data:
+            self.conn.execute(self.ins_tag_game, self.tag_game_data)
+            self.tag_game_data = []
+
+        if self.game_data:
+            self.conn.execute(self.ins_game, self.game_data)
+            self.game_data = []
+
+    def parsed_shards(self, pgnfile, start, end):
+        """ Yields the parsed games of the start..end part of pgnfile shard by
+            shard, in file order. With more than one core the shards are
+            parsed by a pool of worker processes, keeping at most two shards
+            per worker in flight. """
+
+        basename = os.path.basename(pgnfile)
+        cores = self.cores or os.cpu_count() or 1
+        shards = (end - start) // SHARD_SIZE
+        if cores > 1 and shards > 0:
+            shards = max(shards, cores)
+        bounds = split_games(pgnfile, max(shards, 1), start, end)
+        shards = collections.deque(zip(bounds, bounds[1:] + [end]))
+
+        if cores < 2 or len(shards) < 2:
+            for start, end in shards:
+                yield parse_shard(pgnfile, basename, start, end)
+            return
+
+        pending = collections.deque()
+        with multiprocessing.Pool(cores) as pool:
+            while shards or pending:
+                while shards and len(pending) < cores * 2:
+                    start, end = shards.popleft()
+                    pending.append(pool.apply_async(
+                        parse_shard, (pgnfile, basename, start, end)))
+                yield pending.popleft().get()
+
     # @profile_me
-    def do_import(self, filename, info=None, progressbar=None):
+    def do_import(self, filename, info=None, progressbar=None, start=0):
+        """ Imports the game headers of filename. A non zero start continues
+            an earlier import of the file with the games appended after it. """
         self.progressbar = progressbar
 
         orig_filename = filename
-        count_source = self.conn.execute(self.count_source.where(source.c.name == orig_filename)).scalar()
-        if count_source > 0:
+        source_id = self.conn.execute(self.source_id.where(source.c.name == orig_filename)).scalar()
+        if source_id is not None and not start:
             log.info("%s is already imported" % filename)
             return
 
@@ -192,163 +316,44 @@ class PgnImport():
             else:
                 log.info("Reading %s ..." % pgnfile)
 
+            # games appended while we are importing are left to the next sync
             size = os.path.getsize(pgnfile)
-            handle = protoopen(pgnfile)
 
             # estimated game count
-            all_games = max(size / 840, 1)
+            all_games = max((size - start) / 840, 1)
 
-            get_id = self.get_id
+            if source_id is None:
+                source_id = self.get_id(orig_filename, source, SOURCE, info=info)
 
             # use transaction to avoid autocommit slowness
             # and to let undo importing (rollback) if self.cancel was set
             trans = self.conn.begin()
             try:
                 i = 0
-                for tags in read_games(handle):
-                    if not tags:
-                        log.info("Empty game #%s" % (i + 1))
-                        continue
-
-                    if self.cancel:
-                        trans.rollback()
-                        return
-
-                    fenstr = tags["FEN"]
-
-                    variant = tags["Variant"]
-                    if variant:
-                        if "fischer" in variant.lower() or "960" in variant:
-                            variant = "Fischerandom"
-                        else:
-                            variant = variant.lower().capitalize()
-
-                    # Fixes for some non statndard Chess960 .pgn
-                    if fenstr and variant == "Fischerandom":
-                        parts = fenstr.split()
-                        parts[0] = parts[0].replace(".", "/").replace("0", "")
-                        if len(parts) == 1:
-                            parts.append("w")
-                            parts.append("-")
-                            parts.append("-")
-                        fenstr = " ".join(parts)
-
-                    if variant:
-                        if variant not in name2variant:
-                            log.info("Unknown variant: %s" % variant)
-                            continue
-                        variant = name2variant[variant].variant
-                        if variant == NORMALCHESS:
-                            # lichess uses tag [Variant "Standard"]
-                            variant = 0
-                    else:
-                        variant = 0
-
-                    if basename == "eco.pgn":
-                        white = tags["Opening"]
-                        black = tags["Variation"]
-                    else:
-                        white = tags["White"]
-                        black = tags["Black"]
-
-                    event_id = get_id(tags["Event"], event, EVENT)
-
-                    site_id = get_id(tags["Site"], site, SITE)
-
-                    date = tags["Date"]
-
-                    game_round = tags['Round']
-
-                    white_id = get_id(white, player, PLAYER)
-                    black_id = get_id(black, player, PLAYER)
-
-                    result = tags["Result"]
-                    if result in pgn2Const:
-                        result = pgn2Const[result]
-                    else:
-                        result = RUNNING
-
-                    white_elo = tags['WhiteElo']
-                    black_elo = tags['BlackElo']
-
-                    time_control = tags["TimeControl"]
-
-                    eco = tags["ECO"][:3]
-
-                    fen = tags["FEN"]
-
-                    board_tag = int(tags["Board"]) if "Board" in tags else 0
-
-                    annotator_id = get_id(tags["Annotator"], annotator, ANNOTATOR)
-
-                    source_id = get_id(orig_filename, source, SOURCE, info=info)
-
-                    ply_count = tags["PlyCount"] if "PlyCount" in tags else 0
-
-                    offset = base_offset + int(tags["offset"])
-
-                    self.game_data.append({
-                        'offset': offset,
-                        'offset8': (offset >> 3) << 3,
-                        'event_id': event_id,
-                        'site_id': site_id,
-                        'date': date,
-                        'round': game_round,
-                        'white_id': white_id,
-                        'black_id': black_id,
-                        'result': result,
-                        'white_elo': white_elo,
-                        'black_elo': black_elo,
-                        'ply_count': ply_count,
-                        'eco': eco,
-                        'fen': fen,
-                        'variant': variant,
-                        'board': board_tag,
-                        'time_control': time_control,
-                        'annotator_id': annotator_id,
-                        'source_id': source_id,
-                    })
-
-                    for tag in tags:
-                        if tag not in dedicated_tags and tag not in other_game_tags and tags[tag]:
-                            self.tag_game_data.append({
-                                'game_id': self.next_id[GAME],
-                                'tag_name': tag,
-                                'tag_value': tags[tag],
-                            })
-
-                    self.next_id[GAME] += 1
-                    i += 1
-
-                    if len(self.game_data) >= self.CHUNK:
-                        if self.event_data:
-                            self.conn.execute(self.ins_event, self.event_data)
-                            self.event_data = []
-
-                        if self.site_data:
-                            self.conn.execute(self.ins_site, self.site_data)
-                            self.site_data = []
-
-                        if self.player_data:
-                            self.conn.execute(self.ins_player,
-                                              self.player_data)
-                            self.player_data = []
-
-                        if self.annotator_data:
-                            self.conn.execute(self.ins_annotator,
-                                              self.annotator_data)
-                            self.annotator_data = []
-
-                        if self.source_data:
-                            self.conn.execute(self.ins_source, self.source_data)
-                            self.source_data = []
-
-                        if self.tag_game_data:
-                            self.conn.execute(self.ins_tag_game, self.tag_game_data)
-                            self.tag_game_data = []
-
-                        self.conn.execute(self.ins_game, self.game_data)
-                        self.game_data = []
+                parsed = self.parsed_shards(pgnfile, start, size)
+                for games in parsed:
+                    for first in range(0, len(games), self.CHUNK):
+                        chunk = games[first:first + self.CHUNK]
+                        self.get_ids(chunk)
+
+                        for row, tags in chunk:
+                            offset = base_offset + row["offset"]
+                            row["offset"] = offset
+                            row["offset8"] = (offset >> 3) << 3
+                            row["source_id"] = source_id
+                            self.game_data.append(row)
+
+                            for tag, value in tags:
+                                self.tag_game_data.append({
+                                    'game_id': self.next_id[GAME],
+                                    'tag_name': tag,
+                                    'tag_value': value,
+                                })
+
+                            self.next_id[GAME] += 1
+                        i += len(chunk)
+
+                        self.write_chunk()
 
                         if progressbar is not None:
                             GLib.idle_add(progressbar.set_fraction, i / float(all_games))
@@ -357,40 +362,21 @@ class PgnImport():
                         else:
                             log.info("From %s imported %s" % (pgnfile, i))
 
-                if self.event_data:
-                    self.conn.execute(self.ins_event, self.event_data)
-                    self.event_data = []
-
-                if self.site_data:
-                    self.conn.execute(self.ins_site, self.site_data)
-                    self.site_data = []
-
-                if self.player_data:
-                    self.conn.execute(self.ins_player, self.player_data)
-                    self.player_data = []
-
-                if self.annotator_data:
-                    self.conn.execute(self.ins_annotator, self.annotator_data)
-                    self.annotator_data = []
-
-                if self.source_data:
-                    self.conn.execute(self.ins_source, self.source_data)
-                    self.source_data = []
-
-                if self.tag_game_data:
-                    self.conn.execute(self.ins_tag_game, self.tag_game_data)
-                    self.tag_game_data = []
-
-                if self.game_data:
-                    self.conn.execute(self.ins_game, self.game_data)
-                    self.game_data = []
-
-                if progressbar is not None:
-                    GLib.idle_add(progressbar.set_fraction, i / float(all_games))
-                    GLib.idle_add(progressbar.set_text, _(
-                        "%(counter)s game headers from %(filename)s imported" % ({"counter": i, "filename": basename})))
-                else:
-                    log.info("From %s imported %s" % (pgnfile, i))
+                        if self.cancel:
+                            break
+                    if self.cancel:
+                        break
+                # stops the worker processes
+                parsed.close()
+
+                if self.cancel:
+                    trans.rollback()
+                    return
+
+                # a file without games still records its source
+                self.write_chunk()
+                if pgnfile == self.chessfile.path:
+                    set_sync(self.conn, size, pgn_checksum(pgnfile, size))
                 trans.commit()
 
                 if self.append_pgn:
@@ -399,10 +385,12 @@ class PgnImport():
                     self.db_handle = protosave(self.chessfile.path, self.append_pgn)
 
                     log.info("Append from %s to %s" % (pgnfile, self.chessfile.path))
-                    handle.seek(0)
-                    self.db_handle.writelines(handle)
+                    with protoopen(pgnfile) as handle:
+                        self.db_handle.writelines(handle)
                     self.db_handle.close()
-                    handle.close()
+
+                    size = self.chessfile.size
+                    set_sync(self.conn, size, pgn_checksum(self.chessfile.path, size))
 
                     if self.chessfile.scoutfish is not None:
                         # create new .scout from pgnfile we are importing
@@ -421,25 +409,164 @@ class PgnImport():
                 self.chessfile.handle = protoopen(self.chessfile.path)
 
             except SQLAlchemyError as e:
+                parsed.close()
                 trans.rollback()
                 log.info("Importing %s failed! \n%s" % (pgnfile, e))
 
 
-def read_games(handle):
-    """Based on chess.pgn.scan_headers() from Niklas Fiekas python-chess"""
+def split_games(filename, shards, start=0, end=None):
+    """ Splits the start..end part of the file in about shards byte ranges,
+        each starting at a game header. Returns the start offsets of the
+        ranges. """
+
+    if end is None:
+        end = os.path.getsize(filename)
+    bounds = [start]
+    with open(filename, "rb") as f:
+        for k in range(1, shards):
+            pos = max(start + (end - start) * k // shards, bounds[-1])
+            f.seek(pos)
+            # skip the rest of the line we landed in
+            f.readline()
+            prev_blank = False
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if prev_blank and line.startswith(b"[") and \
+                        TAG_REGEX.match(line.decode(PGN_ENCODING)):
+                    break
+                prev_blank = not line.strip()
+            if not line or pos >= end:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    return bounds
+
+
+def pgn_checksum(filename, size):
+    """ Returns the checksum of the SYNC_BLOCK bytes before size in the file """
+
+    with open(filename, "rb") as f:
+        f.seek(max(0, size - SYNC_BLOCK))
+        block = f.read(min(size, SYNC_BLOCK))
+    return hashlib.sha1(block).hexdigest()
+
+
+def parse_shard(filename, basename, start, end):
+    """ Parses the game headers in the byte range start..end of a .pgn file.
+        Returns a list of (game row, extra tags) with the names of events,
+        sites, players and annotators not yet resolved to ids. """
+
+    games = []
+    with protoopen(filename) as handle:
+        handle.seek(start)
+        for tags in read_games(handle, start, end):
+            if not tags:
+                log.info("Empty game in %s at %s" % (basename, start))
+                continue
+
+            game_data = parse_tags(tags, basename)
+            if game_data is not None:
+                games.append(game_data)
+    return games
+
+
+def parse_tags(tags, basename):
+    """ Converts the header tags of a game to a game table row and the list of
+        its other tags. Returns None for games in unknown variants. """
+
+    fenstr = tags["FEN"]
+
+    variant = tags["Variant"]
+    if variant:
+        if "fischer" in variant.lower() or "960" in variant:
+            variant = "Fischerandom"
+        else:
+            variant = variant.lower().capitalize()
+
+    # Fixes for some non statndard Chess960 .pgn
+    if fenstr and variant == "Fischerandom":
+        parts = fenstr.split()
+        parts[0] = parts[0].replace(".", "/").replace("0", "")
+        if len(parts) == 1:
+            parts.append("w")
+            parts.append("-")
+            parts.append("-")
+        fenstr = " ".join(parts)
+
+    if variant:
+        if variant not in name2variant:
+            log.info("Unknown variant: %s" % variant)
+            return None
+        variant = name2variant[variant].variant
+        if variant == NORMALCHESS:
+            # lichess uses tag [Variant "Standard"]
+            variant = 0
+    else:
+        variant = 0
+
+    if basename == "eco.pgn":
+        white = tags["Opening"]
+        black = tags["Variation"]
+    else:
+        white = tags["White"]
+        black = tags["Black"]
+
+    result = tags["Result"]
+    if result in pgn2Const:
+        result = pgn2Const[result]
+    else:
+        result = RUNNING
+
+    board_tag = int(tags["Board"]) if "Board" in tags else 0
+
+    ply_count = tags["PlyCount"] if "PlyCount" in tags else 0
+
+    row = {
+        'offset': int(tags["offset"]),
+        'event_id': tags["Event"],
+        'site_id': tags["Site"],
+        'date': tags["Date"],
+        'round': tags['Round'],
+        'white_id': white,
+        'black_id': black,
+        'result': result,
+        'white_elo': tags['WhiteElo'],
+        'black_elo': tags['BlackElo'],
+        'ply_count': ply_count,
+        'eco': tags["ECO"][:3],
+        'fen': tags["FEN"],
+        'variant': variant,
+        'board': board_tag,
+        'time_control': tags["TimeControl"],
+        'annotator_id': tags["Annotator"],
+    }
+
+    other_tags = [(tag, tags[tag]) for tag in tags
+                  if tag not in dedicated_tags and tag not in other_game_tags and tags[tag]]
+
+    return row, other_tags
+
+
+def read_games(handle, start=0, end=None):
+    """Based on chess.pgn.scan_headers() from Niklas Fiekas python-chess
+       The handle has to be positioned at start, and reading stops at the
+       first line starting at or after end."""
 
     in_comment = False
 
     game_headers = None
     game_pos = None
 
-    last_pos = 0
+    last_pos = start
     line = handle.readline()
 
     # scoutfish creates game offsets at previous game end
     line_end_fix = 2 if line.endswith("\r\n") else 1
 
-    while line:
+    while line and (end is None or last_pos < end):
         # Skip single line comments.
         if line.startswith("%"):
             last_pos += len(line)
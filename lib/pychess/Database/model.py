@@ -19,15 +19,15 @@ from pychess.System.prefix import addUserCachePrefix
 @event.listens_for(Engine, "before_cursor_execute")
 def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
     context._query_start_time = time.time()
-    log.debug("Start Query:\n%s" % statement, extra={"task": "SQL"})
-    log.debug("Parameters:\n%r" % (parameters,), extra={"task": "SQL"})
+    log.debug("Start Query:\n%s", statement, extra={"task": "SQL"})
+    log.debug("Parameters:\n%r", parameters, extra={"task": "SQL"})
 
 
 @event.listens_for(Engine, "after_cursor_execute")
 def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
     total = time.time() - context._query_start_time
     log.debug("Query Complete!", extra={"task": "SQL"})
-    log.debug("Total Time: %.02fms" % (total * 1000), extra={"task": "SQL"})
+    log.debug("Total Time: %.02fms", total * 1000, extra={"task": "SQL"})
 
 
 # Just to make sphinx happy...
@@ -74,13 +74,23 @@ def insert_or_ignore(engine, stmt):
 engines = {}
 
 # PyChess database schema version
-SCHEMA_VERSION = "20180221"
+SCHEMA_VERSION = "20261018"
 
 
 def get_schema_version(engine):
     return engine.execute(select([schema_version.c.version])).scalar()
 
 
+def get_sync(engine):
+    """ Returns the size and checksum of the .pgn part already imported """
+    return engine.execute(select([pgn_sync.c.size, pgn_sync.c.checksum])).first()
+
+
+def set_sync(conn, size, checksum):
+    conn.execute(pgn_sync.delete())
+    conn.execute(pgn_sync.insert(), [{"id": 1, "size": size, "checksum": checksum}, ])
+
+
 def get_engine(path=None, dialect="sqlite", echo=False):
     if path is None:
         # In memory database
@@ -182,6 +192,15 @@ schema_version = Table(
     Column('version', String(8)),
 )
 
+# Where the last import of the .pgn ended, and the checksum of the block
+# before it, to detect if the file was only appended since
+pgn_sync = Table(
+    'pgn_sync', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('size', Integer),
+    Column('checksum', String(40)),
+)
+
 
 def drop_indexes(engine):
     for table in metadata.tables.values():
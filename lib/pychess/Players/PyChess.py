@@ -12,9 +12,14 @@ try:
     from pychess.Utils.const import WHITE, ASEANCHESS, SITTUYINCHESS, ATOMICCHESS, reprResult, \
         CAMBODIANCHESS, LOSERSCHESS, KINGOFTHEHILLCHESS, DRAW, BLACKWON, WHITEWON, MAKRUKCHESS, \
         SUICIDECHESS, GIVEAWAYCHESS, THREECHECKCHESS, HORDECHESS, RACINGKINGSCHESS, PLACEMENTCHESS  # nopep8
-    from pychess.Utils.lutils import lsearch  # nopep8
     from pychess.Utils.lutils.ldata import MAXPLY  # nopep8
-    from pychess.Utils.lutils.lsearch import alphaBeta  # nopep8
+    from pychess.Utils.lutils.lsearch import Search, NULL_MOVE_REDUCTION, \
+        LATE_MOVE_REDUCTION, FUTILITY_MARGIN  # nopep8
+    from pychess.Utils.lutils.lparallel import ParallelSearch  # nopep8
+    from pychess.Utils.lutils.ltime import TimeManager, MIN_MOVES_LEFT  # nopep8
+    from pychess.Utils.lutils.TranspositionTable import TranspositionTable, \
+        SharedTranspositionTable, PersistentTranspositionTable  # nopep8
+    from pychess.System.prefix import addUserCachePrefix  # nopep8
     from pychess.Utils.lutils.lmove import listToSan, toSAN  # nopep8
     from pychess.System.Log import log  # nopep8
 except ImportError:
@@ -26,6 +31,9 @@ class PyChess:
     def __init__(self):
         self.sd = MAXPLY
         self.skipPruneChance = 0
+        self.nullMoveReduction = NULL_MOVE_REDUCTION
+        self.lateMoveReduction = LATE_MOVE_REDUCTION
+        self.futilityMargin = FUTILITY_MARGIN
 
         self.clock = [0, 0]
         self.basetime = 0
@@ -38,6 +46,10 @@ class PyChess:
         self.post = False
         self.debug = True
         self.outOfBook = False
+        self.search = Search()
+        self.persistentHash = False
+        # The variant whose persistent table the search uses, if any
+        self.tableVariant = None
 
     def print(self, text):
         try:
@@ -46,6 +58,38 @@ class PyChess:
         except BrokenPipeError:
             sys.exit(0)
 
+    def setCores(self, cores):
+        """ Searches with a pool of cores worker processes, or in this process
+            when cores is 1 """
+        egtb = self.search.egtb
+        if isinstance(self.search, ParallelSearch):
+            self.search.close()
+        self.search = ParallelSearch(cores) if cores > 1 else Search()
+        self.search.egtb = egtb
+        self.tableVariant = None
+
+    def setPersistentHash(self, enabled):
+        """ Keeps the transposition table in a file in the user cache, one per
+            variant, so later searches can reuse the entries """
+        self.persistentHash = enabled
+        if not enabled and self.tableVariant is not None:
+            tableType = SharedTranspositionTable if isinstance(
+                self.search, ParallelSearch) else TranspositionTable
+            self.search.table = tableType(32 * 1024 * 1024)
+            self.tableVariant = None
+
+    def setReductions(self, search):
+        """ Sets the reductions of the engine options on search """
+        search.nullMoveReduction = self.nullMoveReduction
+        search.lateMoveReduction = self.lateMoveReduction
+        search.futilityMargin = self.futilityMargin
+
+    def __openTable(self):
+        if self.persistentHash and self.tableVariant != self.board.variant:
+            path = addUserCachePrefix("hash_%s.bin" % self.board.variant)
+            self.search.table = PersistentTranspositionTable(path, 32 * 1024 * 1024)
+            self.tableVariant = self.board.variant
+
     # Play related
 
     def __remainingMovesA(self):
@@ -93,69 +137,54 @@ class PyChess:
 
         if not mv:
 
-            lsearch.skipPruneChance = self.skipPruneChance
-            lsearch.searching = True
+            self.search.skipPruneChance = self.skipPruneChance
+            self.setReductions(self.search)
+            self.__openTable()
 
-            timed = (self.basetime > 0 or self.increment > 0)
+            timed = self.basetime > 0 or self.increment > 0 or self.searchtime > 0
 
-            if self.searchtime > 0:
-                usetime = self.searchtime
-            else:
-                if self.movestogo > 0:
-                    remaining_moves = self.__remainingMovesB()
-                    usetime = self.clock[self.playingAs] / remaining_moves
-                    if remaining_moves == 1:
-                        usetime -= 0.05
+            if timed:
+                if self.searchtime > 0:
+                    movesLeft = 1
+                elif self.movestogo > 0:
+                    movesLeft = self.__remainingMovesB()
                 else:
-                    usetime = self.clock[self.playingAs] / self.__remainingMovesA()
+                    movesLeft = self.__remainingMovesA()
                     if self.clock[self.playingAs] > 10:
                         # If we have time, we assume 40 moves rather than 80
-                        usetime *= 2
-                    # The increment is a constant. We'll use this always
-                    usetime += self.increment
-                usetime = min(usetime, self.clock[self.playingAs] / 2)
+                        movesLeft /= 2
+                    movesLeft = max(movesLeft, MIN_MOVES_LEFT)
+                timer = TimeManager(self.clock[self.playingAs], self.increment,
+                                    movesLeft, self.searchtime)
 
-            prevtime = 0
             starttime = time()
-            lsearch.endtime = starttime + usetime if timed else sys.maxsize
+            endtime = timer.start() if timed else sys.maxsize
             if self.debug:
                 if timed:
-                    self.print("# Time left: %3.2f s; Planing to think for %3.2f s" %
-                               (self.clock[self.playingAs], usetime))
+                    self.print("# Time left: %3.2f s; Planing to think for %3.2f s, at most %3.2f s" %
+                               (self.clock[self.playingAs], timer.soft, timer.hard))
                 else:
                     self.print("# Searching to depth %d without timelimit" % self.sd)
 
-            for depth in range(1, self.sd + 1):
-                # Heuristic time saving
-                # Don't waste time, if the estimated isn't enough to complete
-                # next depth
-                if depth > 1 and timed and usetime <= prevtime * 4 and usetime > 1:
-                    break
-                lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
-                search_result = alphaBeta(self.board, depth)
-                if lsearch.searching:
-                    mvs, self.scr = search_result
-                    if time() > lsearch.endtime:
-                        break
-                    if self.post:
-                        pv1 = " ".join(listToSan(self.board, mvs))
-                        time_cs = int(100 * (time() - starttime))
-                        self.print("%s %s %s %s %s" % (
-                            depth, self.scr, time_cs, lsearch.nodes, pv1))
-                else:
-                    # We were interrupted
-                    if depth == 1:
-                        mvs, self.scr = search_result
-                    break
-                prevtime = time() - starttime - prevtime
+            def onIteration(depth, mvs, scr):
+                if self.post:
+                    pv1 = " ".join(listToSan(self.board, mvs))
+                    time_cs = int(100 * (time() - starttime))
+                    self.print("%s %s %s %s %s" % (
+                        depth, scr, time_cs, self.search.nodes, pv1))
+
+                # Stop when the timer doesn't expect the next depth to be
+                # worth starting, or to finish in time
+                return timed and timer.onIteration(depth, mvs, scr)
 
-                self.clock[self.playingAs] -= time(
-                ) - starttime - self.increment
+            mvs, self.scr = self.search.run(self.board, self.sd, endtime,
+                                            onIteration)
+            if timed and self.searchtime <= 0:
+                self.clock[self.playingAs] -= time() - starttime - self.increment
 
             if not mvs:
-                if not lsearch.searching:
+                if not self.search.searching:
                     # We were interupted
-                    lsearch.nodes = 0
                     return
 
                 # This should only happen in terminal mode
@@ -174,8 +203,7 @@ class PyChess:
                         self.print("result %s" % reprResult[BLACKWON])
                 return
 
-            lsearch.nodes = 0
-            lsearch.searching = False
+            self.search.searching = False
 
         move = mvs[0]
         sanmove = toSAN(self.board, move)
@@ -188,20 +216,16 @@ class PyChess:
             protocol """
 
         start = time()
-        lsearch.endtime = sys.maxsize
-        lsearch.searching = True
-
-        for depth in range(1, self.sd):
-            if not lsearch.searching:
-                break
-            board = self.board.clone()
-            mvs, scr = alphaBeta(board, depth)
+        board = self.board.clone()
+        self.setReductions(self.search)
+        self.__openTable()
 
+        def onIteration(depth, mvs, scr):
             pv1 = " ".join(listToSan(board, mvs))
             time_cs = int(100 * (time() - start))
-            self.print("%s %s %s %s %s" % (depth, scr, time_cs, lsearch.nodes, pv1))
+            self.print("%s %s %s %s %s" % (depth, scr, time_cs, self.search.nodes, pv1))
 
-            lsearch.nodes = 0
+        self.search.run(board, self.sd - 1, onIteration=onIteration)
 
 
 if __name__ == "__main__":
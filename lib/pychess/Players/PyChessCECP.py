@@ -16,7 +16,8 @@ from pychess.Utils.lutils.Benchmark import benchmark
 from pychess.Utils.lutils.perft import perft
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.ldata import MAXPLY
-from pychess.Utils.lutils import lsearch, leval
+from pychess.Utils.lutils.lsearch import Search
+from pychess.Utils.lutils import leval
 from pychess.Utils.lutils.lmove import parseSAN, parseAny, toSAN, ParsingError
 from pychess.Utils.lutils.lmovegen import genAllMoves, genCaptures, genCheckEvasions
 from pychess.Utils.lutils.validator import validateMove
@@ -69,9 +70,13 @@ class PyChessCECP(PyChess):
             "nps": 0,  # Unimplemented
             "debug": 1,
             "memory": 0,  # Unimplemented
-            "smp": 0,  # Unimplemented
+            "smp": 1,
             "egt": "gaviota",
-            "option": "skipPruneChance -slider 0 0 100"
+            "option": ["skipPruneChance -slider 0 0 100",
+                       "persistentHash -check 0",
+                       "nullMoveReduction -spin %d 0 4" % self.nullMoveReduction,
+                       "lateMoveReduction -spin %d 0 3" % self.lateMoveReduction,
+                       "futilityMargin -spin %d 0 1000" % self.futilityMargin]
         }
         python = sys.executable.split("/")[-1]
         python_version = "%s.%s.%s" % sys.version_info[0:3]
@@ -108,7 +113,9 @@ class PyChessCECP(PyChess):
 
                 elif lines[0] == "protover":
                     stringPairs = ["=".join([k, '"%s"' % v if isinstance(
-                        v, str) else str(v)]) for k, v in self.features.items()]
+                        v, str) else str(v)])
+                        for k, values in self.features.items()
+                        for v in (values if isinstance(values, list) else [values])]
                     self.print("feature %s" % " ".join(stringPairs))
                     self.print("feature done=1")
 
@@ -172,6 +179,7 @@ class PyChessCECP(PyChess):
                         elif lines[1] == "sittuyin":
                             self.board = LBoard(SITTUYINCHESS)
                             self.board.applyFen(SITTUYINSTART)
+                        self.board.countMaterial()
 
                 elif lines[0] == "quit":
                     self.forced = True
@@ -323,7 +331,7 @@ class PyChessCECP(PyChess):
 
                 elif lines[0] == "memory":
                     # FIXME: this is supposed to control the *total* memory use.
-                    if lsearch.searching:
+                    if self.search.searching:
                         self.print("Error (already searching):", line)
                     else:
                         limit = int(lines[1])
@@ -335,7 +343,12 @@ class PyChessCECP(PyChess):
                             # lsearch.setHashSize(limit)
 
                 elif lines[0] == "cores":
-                    pass  # We aren't SMP-capable.
+                    cores = int(lines[1])
+                    if cores < 1:
+                        self.print("Error (argument must be a positive integer): %s" % line)
+                    else:
+                        self.__stopSearching()
+                        self.setCores(cores)
 
                 elif lines[0] == "egtpath":
                     if len(lines) >= 3 and lines[1] == "gaviota":
@@ -343,8 +356,7 @@ class PyChessCECP(PyChess):
                             conf.set("egtb_path", lines[2])
                         else:
                             conf.set("egtb_path", conf.get("egtb_path"))
-                        from pychess.Utils.lutils.lsearch import enableEGTB
-                        enableEGTB()
+                        self.search.enableEGTB()
 
                 elif lines[0] == "option" and len(lines) > 1:
                     name, eq, value = lines[1].partition("=")
@@ -359,6 +371,29 @@ class PyChessCECP(PyChess):
                             self.print(
                                 "Error (argument must be an integer 0..100): %s"
                                 % line)
+                    elif name == "persistentHash":
+                        self.setPersistentHash(bool(value))
+                    elif name == "nullMoveReduction":
+                        if 0 <= value <= 4:
+                            self.nullMoveReduction = value
+                        else:
+                            self.print(
+                                "Error (argument must be an integer 0..4): %s"
+                                % line)
+                    elif name == "lateMoveReduction":
+                        if 0 <= value <= 3:
+                            self.lateMoveReduction = value
+                        else:
+                            self.print(
+                                "Error (argument must be an integer 0..3): %s"
+                                % line)
+                    elif name == "futilityMargin":
+                        if 0 <= value <= 1000:
+                            self.futilityMargin = value
+                        else:
+                            self.print(
+                                "Error (argument must be an integer 0..1000): %s"
+                                % line)
 
                 # CECP analyze mode commands
                 # See http://www.gnu.org/software/xboard/engine-intf.html#11
@@ -388,10 +423,12 @@ class PyChessCECP(PyChess):
                                 for move in genCheckEvasions(self.board)])
 
                 elif lines[0] == "benchmark":
+                    search = Search()
+                    self.setReductions(search)
                     if len(lines) > 1:
-                        benchmark(int(lines[1]))
+                        benchmark(int(lines[1]), search)
                     else:
-                        benchmark()
+                        benchmark(search=search)
 
                 elif lines[0] == "profile":
                     if len(lines) > 1:
@@ -405,7 +442,8 @@ class PyChessCECP(PyChess):
                     root = "0" if len(lines) < 3 else lines[2]
                     depth = "1" if len(lines) == 1 else lines[1]
                     if root.isdigit() and depth.isdigit():
-                        perft(self.board, int(depth), int(root))
+                        perft(self.board, int(depth), int(root),
+                              getattr(self.search, "cores", 1))
                     else:
                         self.print("Error (arguments must be integer")
 
@@ -437,7 +475,7 @@ class PyChessCECP(PyChess):
                 self.print("Error (missing argument): %s" % line)
 
     def __stopSearching(self):
-        lsearch.searching = False
+        self.search.stop()
         if self.thread:
             self.thread.join()
 
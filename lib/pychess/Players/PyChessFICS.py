@@ -19,7 +19,6 @@ from pychess.Utils.const import WHITE, PAUSE_OFFER, DRAW_OFFER, BLACK, RESUME_OF
     TAKEBACK_OFFER, ABORT_OFFER, ADJOURN_OFFER, SWITCH_OFFER, NORMALCHESS, SAN
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.lmove import determineAlgebraicNotation, toLAN, parseSAN
-from pychess.Utils.lutils import lsearch
 from pychess.Utils.repr import reprResult_long, reprReason_long
 from pychess.ic.FICSConnection import FICSMainConnection
 
@@ -349,7 +348,7 @@ class PyChessFICS(PyChess):
     def __onGameEnded(self, boardManager, ficsgame):
         self.tellHome(reprResult_long[ficsgame.result] + " " + reprReason_long[
             ficsgame.reason])
-        lsearch.searching = False
+        self.search.stop()
         if self.worker:
             self.worker.cancel()
             self.worker = None
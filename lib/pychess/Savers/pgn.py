@@ -36,8 +36,8 @@ from pychess.Utils import formatTime
 from pychess.Savers.ChessFile import ChessFile, LoadingError
 from pychess.Savers.database import col2label, TagDatabase, parseDateTag
 from pychess.Database import model as dbmodel
-from pychess.Database.PgnImport import TAG_REGEX, pgn2Const, PgnImport
-from pychess.Database.model import game, create_indexes, drop_indexes, metadata, ini_schema_version
+from pychess.Database.PgnImport import TAG_REGEX, pgn2Const, PgnImport, pgn_checksum
+from pychess.Database.model import game, create_indexes, drop_indexes, metadata, ini_schema_version, get_sync
 
 __label__ = _("Chess Game")
 __ending__ = "pgn"
@@ -447,14 +447,21 @@ class PGNFile(ChessFile):
         # Import .pgn header tags to .sqlite database
 
         sqlite_path = self.path.replace(".pgn", ".sqlite")
+        start = 0
         if os.path.isfile(self.path) and os.path.isfile(sqlite_path) and getmtime(self.path) > getmtime(sqlite_path):
-            metadata.drop_all(self.engine)
-            metadata.create_all(self.engine)
-            ini_schema_version(self.engine)
+            synced = get_sync(self.engine)
+            if synced is not None and 0 < synced.size <= self.size and \
+                    synced.checksum == pgn_checksum(self.path, synced.size):
+                # games were only appended since the last import
+                start = synced.size
+            else:
+                metadata.drop_all(self.engine)
+                metadata.create_all(self.engine)
+                ini_schema_version(self.engine)
 
         size = self.size
-        if size > 0 and self.tag_database.count == 0:
-            if size > 10000000:
+        if size > start and (start > 0 or self.tag_database.count == 0):
+            if size - start > 10000000:
                 drop_indexes(self.engine)
             if self.progressbar is not None:
                 from gi.repository import GLib
@@ -462,8 +469,8 @@ class PGNFile(ChessFile):
             if importer is None:
                 importer = PgnImport(self)
             importer.initialize()
-            importer.do_import(self.path, progressbar=self.progressbar)
-            if size > 10000000 and not importer.cancel:
+            importer.do_import(self.path, progressbar=self.progressbar, start=start)
+            if size - start > 10000000 and not importer.cancel:
                 create_indexes(self.engine)
 
         return importer
@@ -1006,8 +1013,7 @@ class PGNFile(ChessFile):
                         self.error = LoadingError(errstr1, "")
                         break
 
-                    new_board = last_board.clone()
-                    new_board.applyMove(lmove)
+                    new_board = last_board.branch(lmove)
 
                     if m.group(MOVE_COMMENT):
                         new_board.nags.append(symbol2nag(m.group(
@@ -1,5 +1,26 @@
+""" The log of PyChess.
+
+    Records are put on a queue by a TaskQueueHandler, and written to the .log
+    file by the thread of a QueueListener, so that neither the formatting of
+    the messages nor the file I/O happens in the asyncio/GTK thread. Messages
+    should be given as a format string and its args, like
+    log.debug("Got %s", line), rather than formatted by the caller.
+
+    The level of each task, the "task" of the extra dict of a record, can be
+    set with set_task_level. A record of a task below its level is dropped by
+    ExtraAdapter before it is created, as a record below the level of the
+    logger is.
+
+    A forked process, like a multiprocessing Pool worker, writes its records
+    as they are logged instead, as it may exit by os._exit without emptying
+    a queue. """
+
+import atexit
+import os
+import queue
 import time
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 from .prefix import addUserDataPrefix
 
@@ -39,11 +60,80 @@ class TaskFormatter(logging.Formatter):
         return s
 
 
+# Args which the caller may change before the writer thread formats them
+MUTABLE_ARGS = (list, dict, set, bytearray)
+
+
+class TaskQueueHandler(QueueHandler):
+    """ Puts the records on the queue as they are. QueueHandler formats the
+        message in the thread logging it; here the writer thread formats
+        it, as GLogHandler leaves it to the GLib main loop. Only messages
+        with a list, dict or set arg are formatted at once. Other args, like
+        objects with a __str__, mustn't be changed after they are logged. """
+
+    def prepare(self, record):
+        args = record.args if isinstance(record.args, tuple) else (record.args, )
+        if any(isinstance(arg, MUTABLE_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
 formatter = TaskFormatter(fmt=logformat, datefmt='%H:%M:%S')
 file_handler.setFormatter(formatter)
 
+log_queue = queue.Queue()
+queue_handler = TaskQueueHandler(log_queue)
+listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+listener.start()
+
+
+@atexit.register
+def _stop_listener():
+    """ Writes the records left on the queue """
+    listener.stop()
+
+
 logger = logging.getLogger()
-logger.addHandler(file_handler)
+logger.addHandler(queue_handler)
+
+
+def _write_in_child():
+    """ Makes a forked process write its records to the handlers of the
+        listener as they are logged, as the writer thread of the parent
+        isn't forked """
+    atexit.unregister(_stop_listener)
+    logger.removeHandler(queue_handler)
+    for handler in listener.handlers:
+        logger.addHandler(handler)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_write_in_child)
+
+# The levels of the tasks, below which their messages are dropped. The task
+# of an ICS connection is a tuple, like (host, "raw"), whose items can have
+# levels too.
+task_levels = {}
+
+
+def set_task_level(task, level):
+    """ Sets the level of task, or removes it if level is None """
+    if level is None:
+        task_levels.pop(task, None)
+    else:
+        task_levels[task] = level
+
+
+def get_task_level(task):
+    """ Returns the level of task, or None if it hasn't any """
+    level = task_levels.get(task)
+    if level is None and isinstance(task, tuple):
+        for item in task:
+            level = task_levels.get(item)
+            if level is not None:
+                break
+    return level
 
 
 class ExtraAdapter(logging.LoggerAdapter):
@@ -51,6 +141,23 @@ class ExtraAdapter(logging.LoggerAdapter):
         kwargs["extra"] = kwargs.get("extra", {"task": "Default"})
         return msg, kwargs
 
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        if task_levels:
+            extra = kwargs.get("extra")
+            task_level = get_task_level(extra.get("task") if extra else "Default")
+            if task_level is not None and level < task_level:
+                return
+        msg, kwargs = self.process(msg, kwargs)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        # Most messages are debug ones, which are mostly disabled, so they
+        # are checked before the calls of LoggerAdapter
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.log(logging.DEBUG, msg, *args, **kwargs)
+
 
 log = ExtraAdapter(logger, {})
 
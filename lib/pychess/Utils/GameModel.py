@@ -16,7 +16,7 @@ from pychess.System.protoopen import protoopen, protosave
 from pychess.System.Log import log
 from pychess.Utils.book import getOpenings
 from pychess.Utils.Move import Move
-from pychess.Utils.eco import get_eco
+from pychess.Utils.eco import get_eco, get_game_eco
 from pychess.Utils.Offer import Offer
 from pychess.Utils.TimeModel import TimeModel
 from pychess.Savers import html, txt
@@ -359,6 +359,17 @@ class GameModel(GObject.GObject):
             self.tags["Variation"] = opening[2]
             self.emit("opening_changed")
 
+    def setGameOpening(self):
+        """ Sets the opening from the last classified position of the first
+            40 plies, looking up all of them at once """
+        plies = range(max(1, self.lowply), min(40, self.ply, len(self.boards)))
+        opening = get_game_eco([self.getBoardAtPly(ply).board.hash for ply in plies])
+        if opening is not None:
+            self.tags["ECO"] = opening[0]
+            self.tags["Opening"] = opening[1]
+            self.tags["Variation"] = opening[2]
+            self.emit("opening_changed")
+
     # Board stuff
 
     def _get_ply(self):
@@ -1,7 +1,8 @@
 
+import mmap
 import os
 from struct import Struct
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 
 from pychess.System import conf
 from pychess.Utils.lutils.lmove import parsePolyglot
@@ -28,47 +29,125 @@ BookEntry = namedtuple('BookEntry', 'key move weight learn')
 
 entrystruct = Struct(">QHHI")
 entrysize = entrystruct.size
+keystruct = Struct(">Q")
 
+# Number of probed positions each book remembers
+PROBE_CACHE_SIZE = 1024
 
-def getOpenings(board):
+
+class Book:
+    """ A polyglot book file mapped to memory, with a cache of recent probes.
+        The file is mapped again when it changes on the disk. """
+
+    def __init__(self, path):
+        self.path = path
+        self.stat = None
+        self.file = None
+        self.map = None
+        self.count = 0
+        self.cache = OrderedDict()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+        self.stat = None
+        self.file = None
+        self.map = None
+        self.count = 0
+        self.cache.clear()
+
+    def update(self):
+        """ (Re)maps the file if it has changed. Returns False if the file
+            doesn't exist. """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.close()
+            return False
+
+        stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stat != self.stat:
+            self.close()
+            self.stat = stat
+            self.count = stat[1] // entrysize
+            if self.count > 0:
+                self.file = open(self.path, "rb")
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+
+    def probe(self, key):
+        """ Returns a tuple of (move, weight, learn) entries for the hash key,
+            with the moves in polyglot encoding """
+
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        entries = []
+        if self.count > 0:
+            buf = self.map
+            unpack_key = keystruct.unpack_from
+            # Find the first entry whose key is >= the position's hash
+            low, high = 0, self.count - 1
+            while low < high:
+                mid = (low + high) // 2
+                if unpack_key(buf, mid * entrysize)[0] < key:
+                    low = mid + 1
+                else:
+                    high = mid
+
+            unpack = entrystruct.unpack_from
+            for offset in range(low * entrysize, self.count * entrysize, entrysize):
+                entry_key, move, weight, learn = unpack(buf, offset)
+                if entry_key != key:
+                    break
+                entries.append((move, weight, learn))
+
+        entries = tuple(entries)
+        cache[key] = entries
+        if len(cache) > PROBE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return entries
+
+
+books = {}
+
+
+def getBook(book_path):
+    """ Returns the Book of the given path, None if it doesn't exist """
+    book = books.get(book_path)
+    if book is None:
+        book = books[book_path] = Book(book_path)
+    return book if book.update() else None
+
+
+def getOpenings(board, book_paths=None):
     """ Return a tuple (move, weight, learn) for each opening move
         in the given position. The weight is proportional to the probability
         that a move should be played. By convention, games is the number of
         times a move has been tried, and score the number of points it has
         scored (with 2 per victory and 1 per draw). However, opening books
-        aren't required to keep this information. """
+        aren't required to keep this information.
+        Several books can be given in book_paths, the moves of the first ones
+        taking precedence. By default the configured book is used. """
 
     openings = []
-    if not bookfile:
-        return openings
-
-    with open(path, "rb") as bookFile:
-        key = board.hash
-        # Find the first entry whose key is >= the position's hash
-        bookFile.seek(0, os.SEEK_END)
-        low, high = 0, bookFile.tell() // 16 - 1
-        if high < 0:
+    if book_paths is None:
+        if not bookfile:
             return openings
-        while low < high:
-            mid = (low + high) // 2
-            bookFile.seek(mid * 16)
-            entry = bookFile.read(entrysize)
-            if len(entry) != entrysize:
-                return openings
-            entry = BookEntry._make(entrystruct.unpack(entry))
-            if entry.key < key:
-                low = mid + 1
-            else:
-                high = mid
-
-        bookFile.seek(low * 16)
-        while True:
-            entry = bookFile.read(entrysize)
-            if len(entry) != entrysize:
-                return openings
-            entry = BookEntry._make(entrystruct.unpack(entry))
-            if entry.key != key:
-                break
-            move = parsePolyglot(board, entry.move)
-            openings.append((move, entry.weight, entry.learn))
+        book_paths = (path, )
+
+    seen = set()
+    for book_path in book_paths:
+        book = getBook(book_path)
+        if book is None:
+            continue
+        for pmove, weight, learn in book.probe(board.hash):
+            if pmove in seen:
+                continue
+            seen.add(pmove)
+            move = parsePolyglot(board, pmove)
+            openings.append((move, weight, learn))
     return openings
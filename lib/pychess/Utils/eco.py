@@ -30,10 +30,54 @@ else:
 hash_struct = struct.Struct('>Q')
 
 
+# Openings of the language in use by hash, read from eco.db on first use
+index = None
+index_lang = None
+
+
+def get_lang():
+    return "en" if conf.no_gettext or lang not in ("da", "de", "es", "hu") else lang
+
+
+def get_index():
+    """ Returns the dict of (eco, opening, variation) by hash """
+    global index, index_lang
+    eco_lang = get_lang()
+    if index is None or index_lang != eco_lang:
+        cur = conn.cursor()
+        select = "select hash, eco, opening, variation from openings where lang=? order by rowid"
+        cur.execute(select, (eco_lang, ))
+        new_index = {}
+        for hash, eco, opening, variation in cur:
+            # the first row of a hash wins, like in a query of the hash
+            new_index.setdefault(hash_struct.unpack(hash)[0], (eco, opening, variation))
+        index = new_index
+        index_lang = eco_lang
+    return index
+
+
 def get_eco(hash):
     if not ECO_OK:
         return None
-    cur = conn.cursor()
-    select = "select eco, opening, variation from openings where hash=? and lang=?"
-    cur.execute(select, (memoryview(hash_struct.pack(hash)), "en" if conf.no_gettext or lang not in ("da", "de", "es", "hu") else lang))
-    return cur.fetchone()
+    return get_index().get(hash)
+
+
+def get_ecos(hashes):
+    """ Returns the (eco, opening, variation) or None for each of the hashes """
+    if not ECO_OK:
+        return [None for hash in hashes]
+    get = get_index().get
+    return [get(hash) for hash in hashes]
+
+
+def get_game_eco(hashes):
+    """ Returns the (eco, opening, variation) of the last classified position
+        of the hashes of a game, or None """
+    if not ECO_OK:
+        return None
+    get = get_index().get
+    for hash in reversed(hashes):
+        opening = get(hash)
+        if opening is not None:
+            return opening
+    return None
@@ -1,11 +1,28 @@
-from pychess.Utils.lutils.LBoard import LBoard
-from pychess.Utils.lutils.leval import clearPawnTable
-from pychess.Utils.lutils.lmove import listToSan
-from pychess.Utils.lutils import lsearch
-from pychess.Utils.const import NORMALCHESS
+""" Search benchmark of the engine, and a suite of benchmarks of the hot
+    paths, comparable against a stored baseline.
+
+    PYTHONPATH=lib/ python -m pychess.Utils.lutils.Benchmark --output new.json --baseline old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
 import sys
+import tempfile
 from time import time
 
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.leval import clearPawnTable, evaluateComplete
+from pychess.Utils.lutils.lmove import listToSan, toSAN, parseSAN
+from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.lutils.lsearch import Search
+from pychess.Utils.lutils.perft import do_perft
+from pychess.Utils.const import NORMALCHESS, FEN_START, FISCHERRANDOMCHESS, \
+    CRAZYHOUSECHESS, ATOMICCHESS, SUICIDECHESS, LOSERSCHESS, SITTUYINCHESS, \
+    WHITE, BLACK
+
 # For now, we use the benchmark positions from Stockfish.
 benchmarkPositions = [
     "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
@@ -27,30 +44,236 @@ benchmarkPositions = [
 ]
 
 
-def benchmark(maxdepth=6):
-    """ Times a search of a static list of positions. """
+def benchmark(maxdepth=6, search=None):
+    """ Times a search of a static list of positions, by default with a new
+        Search. Ends with the total nodes and time it took to finish each
+        depth, which shows the effect of the search's reductions. """
 
     suite_time = time()
-    suite_nodes = lsearch.nodes
-    lsearch.endtime = sys.maxsize
-    lsearch.searching = True
+    suite_nodes = 0
+    depth_nodes = {}
+    depth_time = {}
+    if search is None:
+        search = Search()
     for i, fen in enumerate(benchmarkPositions):
-        lsearch.table.clear()
+        search.table.clear()
         clearPawnTable()
         board = LBoard(NORMALCHESS)
         board.applyFen(fen)
         pos_start_time = time()
-        pos_start_nodes = lsearch.nodes
-        for depth in range(1, maxdepth):
-            mvs, scr = lsearch.alphaBeta(board, depth)
+
+        def onIteration(depth, mvs, scr):
             pos_time = time() - pos_start_time
-            pos_nodes = lsearch.nodes - pos_start_nodes
             pv = " ".join(listToSan(board, mvs))
             time_cs = int(100 * pos_time)
-            print(depth, scr, time_cs, pos_nodes, pv)
+            print(depth, scr, time_cs, search.nodes, pv)
+            depth_nodes[depth] = depth_nodes.get(depth, 0) + search.nodes
+            depth_time[depth] = depth_time.get(depth, 0) + pos_time
+
+        search.run(board, maxdepth - 1, onIteration=onIteration)
+        pos_time = time() - pos_start_time
+        pos_nodes = search.nodes
+        suite_nodes += pos_nodes
         print("Searched position", i, "at", int(pos_nodes / pos_time) if pos_time > 0 else pos_nodes, "n/s")
     suite_time = time() - suite_time
-    suite_nodes = lsearch.nodes - suite_nodes
+    for depth in sorted(depth_nodes):
+        print("Depth %d: %d nodes in %.2f s" %
+              (depth, depth_nodes[depth], depth_time[depth]))
     print("Total:", suite_nodes, "nodes in", suite_time, "s: ", suite_nodes /
           suite_time, "n/s")
-    lsearch.nodes = 0
+
+
+# Positions of the perft benchmark, with the depth to count
+perftPositions = [
+    ("normal", NORMALCHESS, FEN_START, 4),
+    ("kiwipete", NORMALCHESS, benchmarkPositions[1], 3),
+    ("fischerandom", FISCHERRANDOMCHESS,
+     "nr1kqrbn/pbpppppp/1p6/8/8/1P6/PBPPPPPP/NR1KQRBN w BFbf - 0 1", 3),
+    ("crazyhouse", CRAZYHOUSECHESS,
+     "r1bqk2r/pppp1ppp/2n2n2/4p3/1b2P3/2N2N2/PPPP1PPP/R1BQKB1R/Pp w KQkq - 0 5", 3),
+    ("atomic", ATOMICCHESS, FEN_START, 3),
+    ("suicide", SUICIDECHESS, "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1", 3),
+    ("losers", LOSERSCHESS, FEN_START, 3),
+    ("sittuyin", SITTUYINCHESS,
+     "3r1r2/4sf2/kn1s3p/4p1pP/4PpP1/P1RSN3/1p1FKS2/2R5 b - - 1 21", 3),
+]
+
+
+def result(count, seconds):
+    """ A benchmark result of count operations done in seconds """
+    return {"count": count,
+            "seconds": round(seconds, 4),
+            "rate": round(count / seconds if seconds > 0 else count, 1)}
+
+
+def benchPerft(depth_offset=0):
+    """ Counts the leaf nodes of perftPositions """
+    results = {}
+    for name, variant, fen, depth in perftPositions:
+        board = LBoard(variant)
+        board.applyFen(fen)
+        start = time()
+        nodes = do_perft(board, max(1, depth + depth_offset), 0)
+        results["perft.%s" % name] = result(nodes, time() - start)
+    return results
+
+
+def benchEval(rounds=200):
+    """ Calls evaluateComplete for both sides of benchmarkPositions """
+    boards = []
+    for fen in benchmarkPositions:
+        board = LBoard(NORMALCHESS)
+        board.applyFen(fen)
+        boards.append(board)
+
+    count = 0
+    start = time()
+    for i in range(rounds):
+        # without the pawn hash we time the complete evaluation
+        clearPawnTable()
+        for board in boards:
+            evaluateComplete(board, WHITE)
+            evaluateComplete(board, BLACK)
+            count += 2
+    return {"eval.evaluateComplete": result(count, time() - start)}
+
+
+def benchSearch(maxdepth=3):
+    """ Searches benchmarkPositions to maxdepth with alphaBeta """
+    search = Search()
+    nodes = 0
+    seconds = 0
+    for fen in benchmarkPositions:
+        search.table.clear()
+        clearPawnTable()
+        board = LBoard(NORMALCHESS)
+        board.applyFen(fen)
+        start = time()
+        search.run(board, maxdepth)
+        seconds += time() - start
+        nodes += search.nodes
+    return {"search.alphaBeta": result(nodes, seconds)}
+
+
+def benchSan(rounds=20):
+    """ Converts every legal move of benchmarkPositions to SAN and back """
+    positions = []
+    for fen in benchmarkPositions:
+        board = LBoard(NORMALCHESS)
+        board.applyFen(fen)
+        moves = []
+        for move in genAllMoves(board):
+            board.applyMove(move)
+            if not board.opIsChecked():
+                moves.append(move)
+            board.popMove()
+        sans = [toSAN(board, move) for move in moves]
+        positions.append((board, moves, sans))
+
+    count = 0
+    start = time()
+    for i in range(rounds):
+        for board, moves, sans in positions:
+            for move in moves:
+                toSAN(board, move)
+            count += len(moves)
+    to_san = result(count, time() - start)
+
+    count = 0
+    start = time()
+    for i in range(rounds):
+        for board, moves, sans in positions:
+            for san in sans:
+                parseSAN(board, san)
+            count += len(sans)
+    parse_san = result(count, time() - start)
+
+    return {"san.toSAN": to_san, "san.parseSAN": parse_san}
+
+
+def benchPgn(pgnfile, load_games=100):
+    """ Imports the game headers of a copy of pgnfile to a new database,
+        and loads its first load_games games to GameModels """
+    from pychess.Savers.pgn import load
+    from pychess.System.protoopen import protoopen
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "benchmark.pgn")
+        shutil.copyfile(pgnfile, path)
+        chessfile = load(protoopen(path))
+        start = time()
+        chessfile.init_tag_database()
+        header_import = result(chessfile.count, time() - start)
+
+        chessfile.limit = load_games
+        records, plys = chessfile.get_records()
+        start = time()
+        for rec in records:
+            chessfile.loadToModel(rec)
+        load_model = result(len(records), time() - start)
+        chessfile.close()
+    finally:
+        shutil.rmtree(tmpdir)
+
+    return {"pgn.import": header_import, "pgn.loadToModel": load_model}
+
+
+def runSuite(quick=False, pgnfile=None):
+    """ Runs all benchmarks. Returns a dict of results by benchmark name. """
+    results = {}
+    results.update(benchPerft(-1 if quick else 0))
+    results.update(benchEval(20 if quick else 200))
+    results.update(benchSearch(2 if quick else 3))
+    results.update(benchSan(2 if quick else 20))
+    if pgnfile is not None:
+        results.update(benchPgn(pgnfile, 10 if quick else 100))
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    """ Returns a list of (name, rate, baseline rate) for the benchmarks
+        slower than the baseline by more than tolerance """
+    regressions = []
+    for name, res in sorted(results.items()):
+        if name in baseline:
+            base_rate = baseline[name]["rate"]
+            if res["rate"] < base_rate * (1 - tolerance):
+                regressions.append((name, res["rate"], base_rate))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyChess benchmark suite")
+    parser.add_argument("--output", help="write the results as json to this file")
+    parser.add_argument("--baseline", help="compare the results to this json file")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slowdown against the baseline (default 0.1)")
+    parser.add_argument("--pgn", help="benchmark header import and game loading of this .pgn")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    args = parser.parse_args(argv)
+
+    results = runSuite(args.quick, args.pgn)
+    report = {"python": platform.python_version(),
+              "machine": platform.machine(),
+              "results": results}
+
+    for name, res in sorted(results.items()):
+        print("%-22s %12d %9.3fs %14.1f/s" % (name, res["count"], res["seconds"], res["rate"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, rate, base_rate in regressions:
+            print("Regression: %s %.1f/s against %.1f/s" % (name, rate, base_rate))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import struct
+
 from pychess.Utils.const import EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, \
     ATOMICCHESS, BUGHOUSECHESS, CRAZYHOUSECHESS, CAMBODIANCHESS, MAKRUKCHESS, \
     FISCHERRANDOMCHESS, SITTUYINCHESS, WILDCASTLECHESS, WILDCASTLESHUFFLECHESS, \
@@ -10,9 +12,9 @@ from pychess.Utils.const import EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
     G1, G8, H1, H8, \
     KING_CASTLE, QUEEN_CASTLE, DROP, PROMOTIONS, ENPASSANT, B_OO, B_OOO, W_OO, W_OOO
 from pychess.Utils.repr import reprColor
-from .ldata import FILE, fileBits
+from .ldata import FILE, fileBits, tropisms, materialValues
 from .attack import isAttacked
-from .bitboard import clearBit, setBit, bitPosArray
+from .bitboard import bitPosArray, notBitPosArray, iterBits, lastBit
 from .PolyglotHash import pieceHashes, epHashes, \
     W_OOHash, W_OOOHash, B_OOHash, B_OOOHash, colorHash, holdingHash
 
@@ -24,6 +26,34 @@ from .PolyglotHash import pieceHashes, epHashes, \
 # number is not specified
 STRICT_FEN = False
 
+# Lists holding the position's history, which branched boards build lazily
+HISTORY = ("hist_move", "hist_tpiece", "hist_enpassant", "hist_castling",
+           "hist_hash", "hist_fifty", "hist_checked", "hist_opchecked",
+           "hist_capture_promoting", "hist_exploding_around", "hist_is_first_move")
+
+################################################################################
+# Snapshot                                                                     #
+################################################################################
+
+# Bump when the layout of snapshots changes
+SNAPSHOT_VERSION = 1
+
+# Version, the piece bitboards of both colors, variant, color, castling, en
+# passant cord or -1, fifty, plyCount, hash, hasCastled bits and the number of
+# history entries
+SNAPSHOT_HEADER = struct.Struct("<B12QBBBbHHQBH")
+# Holdings of both colors, promoted cords and capture_promoting
+SNAPSHOT_HOUSE = struct.Struct("<12BQ?")
+SNAPSHOT_CHECKS = struct.Struct("<2B")
+# ini_kings, ini_rooks, fin_kings and fin_rooks, with -1 for None
+SNAPSHOT_CASTLING = struct.Struct("<14b")
+SNAPSHOT_FIRST_MOVES = struct.Struct("<4?")
+# move, tpiece, enpassant, castling, hash, fifty and the capture_promoting or
+# is_first_move bits of a history entry
+SNAPSHOT_HISTORY = struct.Struct("<HBbBQHB")
+SNAPSHOT_COUNT = struct.Struct("<H")
+SNAPSHOT_EXPLOSION = struct.Struct("<3B")
+
 ################################################################################
 # LBoard                                                                       #
 ################################################################################
@@ -75,8 +105,15 @@ class LBoard:
 
     @property
     def lastMove(self):
-        return self.hist_move[-1] if self.fen_was_applied and len(
-            self.hist_move) > 0 else None
+        if not self.fen_was_applied:
+            return None
+        if "history_parent" in self.__dict__:
+            # The move a branched board was made with is in its own history
+            # entries, without building its full history
+            for name, entries in self.history_delta:
+                if name == "hist_move":
+                    return entries[-1] if entries else None
+        return self.hist_move[-1] if len(self.hist_move) > 0 else None
 
     def repetitionCount(self, draw_threshold=3):
         rc = 1
@@ -107,22 +144,26 @@ class LBoard:
                          QUEEN: 0,
                          KING: 0})
 
+    def countMaterial(self):
+        """ Counts the material on the board again, with the piece values of
+            the variant the board was changed to after applyFen """
+        self.pieceValues = materialValues(self.variant)
+        self.material = [0, 0]
+        for cord, piece in enumerate(self.arBoard):
+            if piece != EMPTY:
+                color = WHITE if self.friends[WHITE] & bitPosArray[cord] else BLACK
+                self.material[color] += self.pieceValues[piece]
+
     def iniCambodian(self):
         self.ini_kings = (D1, E8)
         self.ini_queens = (E1, D8)
         self.is_first_move = {KING: [True, True], QUEEN: [True, True]}
         self.hist_is_first_move = []
 
-    def applyFen(self, fenstr):
-        """ Applies the fenstring to the board.
-            If the string is not properly
-            written a SyntaxError will be raised, having its message ending in
-            Pos(%d) specifying the string index of the problem.
-            if an error is found, no changes will be made to the board. """
-
-        assert not self.fen_was_applied, "The applyFen() method can be used on new LBoard objects only!"
+    def iniEmpty(self):
+        """ Sets the board to empty on Black's turn (which Polyglot-hashes
+            to 0), with the initial state of the variant """
 
-        # Set board to empty on Black's turn (which Polyglot-hashes to 0)
         self.blocker = 0
 
         self.friends = [0, 0]
@@ -158,6 +199,13 @@ class LBoard:
         # piece counts
         self.pieceCount = ([0] * 7, [0] * 7)
 
+        # Material and king tropism of the pieces on the board, by color, kept
+        # up to date as pieces are added and removed. The tropism of a color
+        # is None when the opponent king has moved, until leval counts it.
+        self.pieceValues = materialValues(self.variant)
+        self.material = [0, 0]
+        self.tropism = [0, 0]
+
         # initial cords of rooks and kings for castling in Chess960
         if self.variant == FISCHERRANDOMCHESS:
             self.ini_kings = [None, None]
@@ -180,7 +228,18 @@ class LBoard:
         if self.variant in DROP_VARIANTS:
             self.iniHouse()
 
-            # Get information
+    def applyFen(self, fenstr):
+        """ Applies the fenstring to the board.
+            If the string is not properly
+            written a SyntaxError will be raised, having its message ending in
+            Pos(%d) specifying the string index of the problem.
+            if an error is found, no changes will be made to the board. """
+
+        assert not self.fen_was_applied, "The applyFen() method can be used on new LBoard objects only!"
+
+        self.iniEmpty()
+
+        # Get information
         parts = fenstr.split()
         castChr = "-"
         epChr = "-"
@@ -422,36 +481,47 @@ class LBoard:
     def willLeaveInCheck(self, move):
         if self.variant == SUICIDECHESS or self.variant == GIVEAWAYCHESS:
             return False
-        board_clone = self.clone()
+        board_clone = self.clone(history=False)
         board_clone.applyMove(move)
         return board_clone.opIsChecked()
 
     def willGiveCheck(self, move):
-        board_clone = self.clone()
+        board_clone = self.clone(history=False)
         board_clone.applyMove(move)
         return board_clone.isChecked()
 
     def _addPiece(self, cord, piece, color):
-        _setBit = setBit
-        self.boards[color][piece] = _setBit(self.boards[color][piece], cord)
-        self.friends[color] = _setBit(self.friends[color], cord)
-        self.blocker = _setBit(self.blocker, cord)
+        bit = bitPosArray[cord]
+        self.boards[color][piece] |= bit
+        self.friends[color] |= bit
+        self.blocker |= bit
 
         if piece == PAWN:
             self.pawnhash ^= pieceHashes[color][PAWN][cord]
         elif piece == KING:
             self.kings[color] = cord
+            self.tropism[1 - color] = None
+        else:
+            tropism = self.tropism
+            if tropism[color] is not None:
+                tropism[color] += tropisms[piece][cord][self.kings[1 - color]]
+        self.material[color] += self.pieceValues[piece]
         self.hash ^= pieceHashes[color][piece][cord]
         self.arBoard[cord] = piece
 
     def _removePiece(self, cord, piece, color):
-        _clearBit = clearBit
-        self.boards[color][piece] = _clearBit(self.boards[color][piece], cord)
-        self.friends[color] = _clearBit(self.friends[color], cord)
-        self.blocker = _clearBit(self.blocker, cord)
+        bit = notBitPosArray[cord]
+        self.boards[color][piece] &= bit
+        self.friends[color] &= bit
+        self.blocker &= bit
 
         if piece == PAWN:
             self.pawnhash ^= pieceHashes[color][PAWN][cord]
+        elif KNIGHT <= piece < KING:
+            tropism = self.tropism
+            if tropism[color] is not None:
+                tropism[color] -= tropisms[piece][cord][self.kings[1 - color]]
+        self.material[color] -= self.pieceValues[piece]
 
         self.hash ^= pieceHashes[color][piece][cord]
         self.arBoard[cord] = EMPTY
@@ -530,6 +600,8 @@ class LBoard:
         self.checked = None
 
         if flag == NULL_MOVE:
+            self.hist_tpiece.append(EMPTY)
+            self.setEnpassant(None)
             self.setColor(opcolor)
             self.plyCount += 1
             return move
@@ -700,7 +772,12 @@ class LBoard:
         flag = move >> 12
 
         if flag == NULL_MOVE:
+            if self.variant in DROP_VARIANTS:
+                self.capture_promoting = self.hist_capture_promoting.pop()
+            if self.variant == CAMBODIANCHESS:
+                self.is_first_move = self.hist_is_first_move.pop()
             self.setColor(color)
+            self._popState()
             return
 
         fcord = (move >> 6) & 63
@@ -789,7 +866,10 @@ class LBoard:
             self.is_first_move = self.hist_is_first_move.pop()
 
         self.setColor(color)
+        self._popState()
 
+    def _popState(self):
+        """ Restores the state popMove doesn't derive from the pieces """
         self.checked = self.hist_checked.pop()
         self.opchecked = self.hist_opchecked.pop()
         self.enpassant = self.hist_enpassant.pop()
@@ -969,7 +1049,194 @@ class LBoard:
 
         return "".join(fenstr)
 
-    def clone(self):
+    def asSnapshot(self, history=False):
+        """ Returns the position as a compact binary snapshot for
+            applySnapshot. Without history the size of a snapshot only
+            depends on the variant. With history it also keeps the moves
+            which lead to the position, so that they can be popped and
+            repetitions counted after applySnapshot. """
+
+        variant = self.variant
+        boards = self.boards[WHITE][PAWN:KING + 1] + self.boards[BLACK][PAWN:KING + 1]
+        hasCastled = int(self.hasCastled[WHITE]) | int(self.hasCastled[BLACK]) << 1
+        histLength = len(self.hist_move) if history else 0
+        enpassant = -1 if self.enpassant is None else self.enpassant
+        parts = [SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION, *boards, variant, self.color, self.castling,
+            enpassant, self.fifty, self.plyCount, self.hash, hasCastled,
+            histLength)]
+
+        if variant in DROP_VARIANTS:
+            holding = [self.holding[color][piece] for color in (WHITE, BLACK)
+                       for piece in range(PAWN, KING + 1)]
+            promoted = 0
+            for cord, isPromoted in enumerate(self.promoted):
+                if isPromoted:
+                    promoted |= bitPosArray[cord]
+            parts.append(SNAPSHOT_HOUSE.pack(*holding, promoted,
+                                             self.capture_promoting))
+        elif variant == THREECHECKCHESS:
+            parts.append(SNAPSHOT_CHECKS.pack(*self.remaining_checks))
+        elif variant in (FISCHERRANDOMCHESS, WILDCASTLECHESS,
+                         WILDCASTLESHUFFLECHESS):
+            cords = list(self.ini_kings)
+            for cordPair in self.ini_rooks + self.fin_kings + self.fin_rooks:
+                cords += cordPair
+            parts.append(SNAPSHOT_CASTLING.pack(
+                *[-1 if cord is None else cord for cord in cords]))
+        elif variant == CAMBODIANCHESS:
+            parts.append(SNAPSHOT_FIRST_MOVES.pack(
+                *self.is_first_move[KING], *self.is_first_move[QUEEN]))
+
+        if histLength:
+            if variant in DROP_VARIANTS:
+                extras = [int(capture) for capture in self.hist_capture_promoting]
+            elif variant == CAMBODIANCHESS:
+                extras = [kings[WHITE] | kings[BLACK] << 1 |
+                          queens[WHITE] << 2 | queens[BLACK] << 3
+                          for kings, queens in ((first[KING], first[QUEEN])
+                                                for first in self.hist_is_first_move)]
+            else:
+                extras = [0] * histLength
+            enpassants = [-1 if cord is None else cord for cord in self.hist_enpassant]
+            parts += map(SNAPSHOT_HISTORY.pack, self.hist_move,
+                         self.hist_tpiece, enpassants, self.hist_castling,
+                         self.hist_hash, self.hist_fifty, extras)
+
+            if variant == ATOMICCHESS:
+                parts.append(SNAPSHOT_COUNT.pack(len(self.hist_exploding_around)))
+                for apieces in self.hist_exploding_around:
+                    parts.append(SNAPSHOT_COUNT.pack(len(apieces)))
+                    parts += [SNAPSHOT_EXPLOSION.pack(*apiece) for apiece in apieces]
+
+        return b"".join(parts)
+
+    def applySnapshot(self, data, offset=0):
+        """ Applies the snapshot asSnapshot returned, at offset in data, to
+            the board, and returns the offset following the snapshot. The
+            data can be a bytes object or a memoryview of a larger buffer,
+            which isn't copied. The board takes the variant of the snapshot.
+            A ValueError is raised for snapshots of another version. """
+
+        assert not self.fen_was_applied, "The applySnapshot() method can be used on new LBoard objects only!"
+
+        header = SNAPSHOT_HEADER.unpack_from(data, offset)
+        if header[0] != SNAPSHOT_VERSION:
+            raise ValueError("Unknown snapshot version %d" % header[0])
+        offset += SNAPSHOT_HEADER.size
+        variant, color, castling, enpassant, fifty, plyCount, hash, \
+            hasCastled, histLength = header[13:]
+
+        self.variant = variant
+        self.iniEmpty()
+
+        # The pieces are set in bulk rather than by _addPiece, but to the same
+        # effect. The hash is the one of the snapshot.
+        arBoard = self.arBoard
+        pieceValues = self.pieceValues
+        for color_ in (WHITE, BLACK):
+            kingBoard = header[color_ * 6 + KING]
+            if kingBoard:
+                self.kings[color_] = lastBit(kingBoard)
+        for color_ in (WHITE, BLACK):
+            boards = self.boards[color_]
+            pieceCount = self.pieceCount[color_]
+            opking = self.kings[1 - color_]
+            material = tropism = friends = 0
+            for piece in range(PAWN, KING + 1):
+                bitboard = header[color_ * 6 + piece]
+                if not bitboard:
+                    continue
+                boards[piece] = bitboard
+                friends |= bitboard
+                cords = list(iterBits(bitboard))
+                for cord in cords:
+                    arBoard[cord] = piece
+                pieceCount[piece] = len(cords)
+                material += len(cords) * pieceValues[piece]
+                if piece == PAWN:
+                    hashes = pieceHashes[color_][PAWN]
+                    for cord in cords:
+                        self.pawnhash ^= hashes[cord]
+                elif piece != KING:
+                    table = tropisms[piece]
+                    for cord in cords:
+                        tropism += table[cord][opking]
+            self.friends[color_] = friends
+            self.material[color_] = material
+            self.tropism[color_] = tropism
+        self.blocker = self.friends[WHITE] | self.friends[BLACK]
+
+        self.color = color
+        self.castling = castling
+        self.enpassant = None if enpassant < 0 else enpassant
+        self.fifty = fifty
+        self.plyCount = plyCount
+        self.hash = hash
+        self.hasCastled = [bool(hasCastled & 1), bool(hasCastled & 2)]
+
+        if variant in DROP_VARIANTS:
+            house = SNAPSHOT_HOUSE.unpack_from(data, offset)
+            offset += SNAPSHOT_HOUSE.size
+            for color_ in (WHITE, BLACK):
+                for piece in range(PAWN, KING + 1):
+                    self.holding[color_][piece] = house[color_ * 6 + piece - 1]
+            promoted = house[12]
+            for cord in iterBits(promoted):
+                self.promoted[cord] = 1
+            self.capture_promoting = house[13]
+        elif variant == THREECHECKCHESS:
+            self.remaining_checks = list(SNAPSHOT_CHECKS.unpack_from(data, offset))
+            offset += SNAPSHOT_CHECKS.size
+        elif variant in (FISCHERRANDOMCHESS, WILDCASTLECHESS,
+                         WILDCASTLESHUFFLECHESS):
+            cords = [None if cord < 0 else cord
+                     for cord in SNAPSHOT_CASTLING.unpack_from(data, offset)]
+            offset += SNAPSHOT_CASTLING.size
+            self.ini_kings = cords[0:2]
+            self.ini_rooks = (cords[2:4], cords[4:6])
+            self.fin_kings = (cords[6:8], cords[8:10])
+            self.fin_rooks = (cords[10:12], cords[12:14])
+        elif variant == CAMBODIANCHESS:
+            first = SNAPSHOT_FIRST_MOVES.unpack_from(data, offset)
+            offset += SNAPSHOT_FIRST_MOVES.size
+            self.is_first_move = {KING: list(first[0:2]), QUEEN: list(first[2:4])}
+
+        if histLength:
+            end = offset + histLength * SNAPSHOT_HISTORY.size
+            entries = SNAPSHOT_HISTORY.iter_unpack(memoryview(data)[offset:end])
+            offset = end
+            self.hist_move, self.hist_tpiece, enpassants, self.hist_castling, \
+                self.hist_hash, self.hist_fifty, extras = map(list, zip(*entries))
+            self.hist_enpassant = [None if cord < 0 else cord for cord in enpassants]
+            self.hist_checked = [None] * histLength
+            self.hist_opchecked = [None] * histLength
+
+            if variant in DROP_VARIANTS:
+                self.hist_capture_promoting = [bool(extra) for extra in extras]
+            elif variant == CAMBODIANCHESS:
+                self.hist_is_first_move = [
+                    {KING: [bool(extra & 1), bool(extra & 2)],
+                     QUEEN: [bool(extra & 4), bool(extra & 8)]}
+                    for extra in extras]
+            elif variant == ATOMICCHESS:
+                count, = SNAPSHOT_COUNT.unpack_from(data, offset)
+                offset += SNAPSHOT_COUNT.size
+                for i in range(count):
+                    length, = SNAPSHOT_COUNT.unpack_from(data, offset)
+                    offset += SNAPSHOT_COUNT.size
+                    self.hist_exploding_around.append(
+                        [SNAPSHOT_EXPLOSION.unpack_from(data, offset + j * SNAPSHOT_EXPLOSION.size)
+                         for j in range(length)])
+                    offset += length * SNAPSHOT_EXPLOSION.size
+
+        self.fen_was_applied = True
+        return offset
+
+    def clone(self, history=True):
+        """ Returns a copy of the board. Without history the copy starts with
+            an empty move history, which is all scratch boards only applying
+            and popping moves need. """
         copy = LBoard(self.variant)
         copy.blocker = self.blocker
 
@@ -991,14 +1258,28 @@ class LBoard:
         copy.checked = self.checked
         copy.opchecked = self.opchecked
 
-        copy.hist_move = self.hist_move[:]
-        copy.hist_tpiece = self.hist_tpiece[:]
-        copy.hist_enpassant = self.hist_enpassant[:]
-        copy.hist_castling = self.hist_castling[:]
-        copy.hist_hash = self.hist_hash[:]
-        copy.hist_fifty = self.hist_fifty[:]
-        copy.hist_checked = self.hist_checked[:]
-        copy.hist_opchecked = self.hist_opchecked[:]
+        copy.pieceValues = self.pieceValues
+        copy.material = self.material[:]
+        copy.tropism = self.tropism[:]
+
+        if history:
+            copy.hist_move = self.hist_move[:]
+            copy.hist_tpiece = self.hist_tpiece[:]
+            copy.hist_enpassant = self.hist_enpassant[:]
+            copy.hist_castling = self.hist_castling[:]
+            copy.hist_hash = self.hist_hash[:]
+            copy.hist_fifty = self.hist_fifty[:]
+            copy.hist_checked = self.hist_checked[:]
+            copy.hist_opchecked = self.hist_opchecked[:]
+        else:
+            copy.hist_move = []
+            copy.hist_tpiece = []
+            copy.hist_enpassant = []
+            copy.hist_castling = []
+            copy.hist_hash = []
+            copy.hist_fifty = []
+            copy.hist_checked = []
+            copy.hist_opchecked = []
 
         if self.variant == FISCHERRANDOMCHESS:
             copy.ini_kings = self.ini_kings[:]
@@ -1011,9 +1292,10 @@ class LBoard:
             copy.promoted = self.promoted[:]
             copy.holding = (self.holding[0].copy(), self.holding[1].copy())
             copy.capture_promoting = self.capture_promoting
-            copy.hist_capture_promoting = self.hist_capture_promoting[:]
+            copy.hist_capture_promoting = self.hist_capture_promoting[:] if history else []
         elif self.variant == ATOMICCHESS:
-            copy.hist_exploding_around = [a[:] for a in self.hist_exploding_around]
+            copy.hist_exploding_around = [a[:] for a in self.hist_exploding_around] \
+                if history else []
         elif self.variant == THREECHECKCHESS:
             copy.remaining_checks = self.remaining_checks[:]
         elif self.variant == CAMBODIANCHESS:
@@ -1021,11 +1303,57 @@ class LBoard:
             copy.ini_queens = self.ini_queens
             copy.is_first_move = {KING: self.is_first_move[KING][:],
                                   QUEEN: self.is_first_move[QUEEN][:]}
-            copy.hist_is_first_move = self.hist_is_first_move[:]
+            copy.hist_is_first_move = self.hist_is_first_move[:] if history else []
 
         copy.fen_was_applied = self.fen_was_applied
         return copy
 
+    def branch(self, move):
+        """ Returns a new board with move applied. Unlike a clone, the new
+            board doesn't copy the history of this board. It only keeps a
+            reference to this board and its own history entries, and builds
+            its full history the first time it is used. A long line of
+            branched boards, like the move tree of a game, thus takes linear
+            rather than quadratic time and memory.
+            This board must not be changed as long as the branched board may
+            still build its history. """
+
+        copy = self.clone(history=False)
+        copy.applyMove(move)
+        attrs = copy.__dict__
+        copy.history_delta = [(name, attrs.pop(name)) for name in HISTORY if name in attrs]
+        copy.history_parent = self
+        return copy
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, which includes the history of a
+        # branched board until it is built.
+        if name in HISTORY and "history_parent" in self.__dict__:
+            self._buildHistory()
+            # The variant may not keep this list
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(name)
+
+    def _buildHistory(self):
+        deltas = []
+        board = self
+        while "history_parent" in board.__dict__:
+            deltas.append(board.history_delta)
+            board = board.history_parent
+        deltas.reverse()
+
+        attrs = self.__dict__
+        for name, entries in self.history_delta:
+            hist = getattr(board, name)[:]
+            for delta in deltas:
+                for dname, dentries in delta:
+                    if dname == name:
+                        hist.extend(dentries)
+            attrs[name] = hist
+        del self.history_parent
+        del self.history_delta
+
 
 START_BOARD = LBoard()
 START_BOARD.applyFen(FEN_START)
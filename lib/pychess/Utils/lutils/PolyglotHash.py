@@ -799,7 +799,10 @@ colorHash = 0xf8d626aaaf278509
 holdingHash = [[[0, ], [0, ], [0, ], [0, ], [0, ], [0, ], [0, ]],
                [[0, ], [0, ], [0, ], [0, ], [0, ], [0, ], [0, ]]]
 
+# Seeded, so that holding hashes are the same in every process and in
+# persistent transposition tables
+_random = random.Random(0x1ef6e6dbb1961ec9)
 for color in (WHITE, BLACK):
     for pt in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
         for i in range(16):
-            holdingHash[color][pt].append(random.getrandbits(64))
+            holdingHash[color][pt].append(_random.getrandbits(64))
@@ -1,4 +1,7 @@
-from ctypes import create_string_buffer, memset
+import mmap
+import os
+from ctypes import c_char, create_string_buffer, memset
+from multiprocessing.sharedctypes import RawArray
 from struct import Struct
 
 from pychess.Utils.const import hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
@@ -18,7 +21,7 @@ class TranspositionTable:
     def __init__(self, maxSize):
         assert maxSize > 0
         self.buckets = maxSize // (4 * entryType.size)
-        self.data = create_string_buffer(self.buckets * 4 * entryType.size)
+        self.data = self.allocate(self.buckets * 4 * entryType.size)
         self.search_id = 0
 
         self.killer1 = [-1] * 80
@@ -27,6 +30,9 @@ class TranspositionTable:
 
         self.butterfly = [0] * (64 * 64)
 
+    def allocate(self, size):
+        return create_string_buffer(size)
+
     def clear(self):
         memset(self.data, 0, self.buckets * 4 * entryType.size)
         self.killer1 = [-1] * 80
@@ -34,6 +40,10 @@ class TranspositionTable:
         self.hashmove = [-1] * 80
         self.butterfly = [0] * (64 * 64)
 
+    def flush(self):
+        """ Writes the entries to permanent storage, if the table has any """
+        pass
+
     def newSearch(self):
         self.search_id = (self.search_id + 1) & 0xff
         # TODO: consider clearing butterfly table
@@ -93,9 +103,20 @@ class TranspositionTable:
                 return 4
         return 0
 
+    def getKillers(self, ply):
+        """ Returns the killer moves at ply, best first, as isKiller ranks
+            them """
+        if ply >= 2:
+            return (self.killer1[ply], self.killer2[ply],
+                    self.killer1[ply - 2], self.killer2[ply - 2])
+        return self.killer1[ply], self.killer2[ply]
+
     def setHashMove(self, ply, move):
         self.hashmove[ply] = move
 
+    def getHashMove(self, ply):
+        return self.hashmove[ply]
+
     def isHashMove(self, ply, move):
         return self.hashmove[ply] == move
 
@@ -104,3 +125,98 @@ class TranspositionTable:
 
     def getButterfly(self, move):
         return self.butterfly[move & 0xfff]
+
+
+def _entryCheck(search_id, hashf, depth, score, move):
+    """ Folds the non key fields of an entry into 32 bits """
+    return (search_id | hashf << 8 | depth << 16) ^ ((score & 0xffff) | move << 16)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """ A TranspositionTable in shared memory, which several processes can
+        probe and record into at the same time. It has to be handed to the
+        other processes when they are started, e.g. as multiprocessing Pool
+        initargs.
+        Writes are not locked. Instead the key of each entry is stored xor'ed
+        with its other fields, so an entry torn by two simultaneous writes
+        simply fails to match any position. Killers, hash moves and the
+        butterfly table remain private to each process. """
+
+    def allocate(self, size):
+        return RawArray(c_char, size)
+
+    def probe(self, board, depth, alpha, beta):
+        baseIndex = (board.hash % self.buckets) * 4
+        key = (board.hash // self.buckets) & 0xffffffff
+        for i in range(baseIndex, baseIndex + 4):
+            tkey, search_id, hashf, tdepth, score, move = entryType.unpack_from(
+                self.data, i * entryType.size)
+            if tkey ^ _entryCheck(search_id, hashf, tdepth, score, move) == key:
+                # Mate score bounds are guaranteed to be accurate at any depth.
+                if tdepth < depth and abs(score) < MATE_VALUE - MAXPLY:
+                    return move, score, hashfBAD
+                if hashf == hashfEXACT:
+                    return move, score, hashf
+                if hashf == hashfALPHA and score <= alpha:
+                    return move, alpha, hashf
+                if hashf == hashfBETA and score >= beta:
+                    return move, beta, hashf
+
+    def record(self, board, move, score, hashf, depth):
+        baseIndex = (board.hash % self.buckets) * 4
+        key = (board.hash // self.buckets) & 0xffffffff
+        staleIndex = baseIndex
+        staleRelevance = 0xffff
+        for i in range(baseIndex, baseIndex + 4):
+            tkey, search_id, thashf, tdepth, tscore, tmove = entryType.unpack_from(
+                self.data, i * entryType.size)
+            tkey ^= _entryCheck(search_id, thashf, tdepth, tscore, tmove)
+            if tkey == 0 or tkey == key:
+                staleIndex = i
+                break
+            relevance = (0x8000 if search_id != self.search_id and thashf == hashfEXACT else 0) + \
+                        (0x4000 if ((self.search_id - search_id) & 0xff) > 1 else 0) + tdepth
+            if relevance < staleRelevance:
+                staleIndex = i
+                staleRelevance = relevance
+        key ^= _entryCheck(self.search_id, hashf, depth, score, move)
+        entryType.pack_into(self.data, staleIndex * entryType.size, key,
+                            self.search_id, hashf, depth, score, move)
+
+
+class PersistentTranspositionTable(SharedTranspositionTable):
+    """ A SharedTranspositionTable mapped from a file, so its entries outlive
+        the process. Searches started later, or in other processes mapping the
+        same file, are warm started from them.
+        The file only holds entries. A file of a different size than maxSize
+        asks for is cleared, as its entries would be in the wrong buckets.
+        An mmap can't be pickled, so a process the table is handed to by
+        pickling, like a spawned Pool worker, maps the file again. """
+
+    def __init__(self, path, maxSize):
+        self.path = path
+        SharedTranspositionTable.__init__(self, maxSize)
+
+    def allocate(self, size):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        return (c_char * size).from_buffer(self.map)
+
+    def flush(self):
+        self.map.flush()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["map"]
+        del state["data"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.data = self.allocate(self.buckets * 4 * entryType.size)
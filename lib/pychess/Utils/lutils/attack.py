@@ -1,9 +1,23 @@
 
-from .bitboard import bitPosArray, notBitPosArray, lastBit, firstBit, clearBit, lsb
-from .ldata import moveArray, rays, directions, fromToRay, PIECE_VALUES, PAWN_VALUE
+from .bitboard import bitPosArray, notBitPosArray, lastBit, firstBit, clearBit
+from .ldata import moveArray, rays, directions, fromToRay, rookMasks, rookAttacks, \
+    bishopMasks, bishopAttacks, PIECE_VALUES, PAWN_VALUE
 from pychess.Utils.const import ASEAN_VARIANTS, ASEAN_BBISHOP, ASEAN_WBISHOP, ASEAN_QUEEN, \
     BLACK, WHITE, PAWN, BPAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, ENPASSANT, ATOMICCHESS
 
+# The variants import this module through their boards, so the variants dict
+# is imported on first use rather than here
+variants = None
+
+
+def getVariants():
+    """ Returns the dict of variants by id, for this module and lmovegen """
+    global variants
+    if variants is None:
+        from pychess.Variants import variants
+    return variants
+
+
 #
 # Caveat: Many functions in this module has very similar code. If you fix a
 # bug, or write a perforance enchace, please update all functions. Apologies
@@ -21,7 +35,6 @@ def isAttacked(board, cord, color, ischecked=False):
     if pboards[KNIGHT] & _moveArray[KNIGHT][cord]:
         return True
 
-    rayto = fromToRay[cord]
     blocker = board.blocker
 
     # Bishops & Queens
@@ -36,15 +49,9 @@ def isAttacked(board, cord, color, ischecked=False):
         bitboard = (pboards[BISHOP] |
                     pboards[QUEEN]) & _moveArray[BISHOP][cord]
         if bitboard:
-            others = ~bitboard & blocker
-            # inlined iterBits()
-            while bitboard:
-                bit = bitboard & -bitboard
-                ray = rayto[lsb[bit]]
-                # If there is a path and no other piece stand in our way
-                if ray and not ray & others:
-                    return True
-                bitboard -= bit
+            # A slider attacks cord, if a slider on cord would attack it
+            if bitboard & bishopAttacks[cord][blocker & bishopMasks[cord]]:
+                return True
 
     # Rooks & Queens
     if board.variant in ASEAN_VARIANTS:
@@ -52,15 +59,8 @@ def isAttacked(board, cord, color, ischecked=False):
     else:
         bitboard = (pboards[ROOK] | pboards[QUEEN]) & _moveArray[ROOK][cord]
     if bitboard:
-        others = ~bitboard & blocker
-        # inlined iterBits()
-        while bitboard:
-            bit = bitboard & -bitboard
-            ray = rayto[lsb[bit]]
-            # If there is a path and no other piece stand in our way
-            if ray and not ray & others:
-                return True
-            bitboard -= bit
+        if bitboard & rookAttacks[cord][blocker & rookMasks[cord]]:
+            return True
 
             # Pawns
             # Would a pawn of the opposite color, standing at out kings cord, be able
@@ -94,7 +94,6 @@ def getAttacks(board, cord, color):
     # Pawns
     bits |= pieces[PAWN] & _moveArray[color == WHITE and BPAWN or PAWN][cord]
 
-    rayto = fromToRay[cord]
     blocker = board.blocker
 
     # Bishops and Queens
@@ -106,28 +105,16 @@ def getAttacks(board, cord, color):
         bits |= pieces[QUEEN] & _moveArray[ASEAN_QUEEN][cord]
     else:
         bitboard = (pieces[BISHOP] | pieces[QUEEN]) & _moveArray[BISHOP][cord]
-        # inlined iterBits()
-        while bitboard:
-            bit = bitboard & -bitboard
-            c = lsb[bit]
-            ray = rayto[c]
-            if ray and not clearBit(ray & blocker, c):
-                bits |= bitPosArray[c]
-            bitboard -= bit
+        if bitboard:
+            bits |= bitboard & bishopAttacks[cord][blocker & bishopMasks[cord]]
 
     # Rooks and queens
     if board.variant in ASEAN_VARIANTS:
         bitboard = pieces[ROOK] & _moveArray[ROOK][cord]
     else:
         bitboard = (pieces[ROOK] | pieces[QUEEN]) & _moveArray[ROOK][cord]
-    # inlined iterBits()
-    while bitboard:
-        bit = bitboard & -bitboard
-        c = lsb[bit]
-        ray = rayto[c]
-        if ray and not clearBit(ray & blocker, c):
-            bits |= bitPosArray[c]
-        bitboard -= bit
+    if bitboard:
+        bits |= bitboard & rookAttacks[cord][blocker & rookMasks[cord]]
 
     return bits
 
@@ -215,8 +202,7 @@ def staticExchangeEvaluate(board, moveOrTcord, color=None):
             ours, theirs = addXrayPiece(board, tcord, fcord, color, ours,
                                         theirs)
 
-        from pychess.Variants import variants
-        PROMOTIONS = variants[board.variant].PROMOTIONS
+        PROMOTIONS = getVariants()[board.variant].PROMOTIONS
         if flag in PROMOTIONS:
             swaplist = [PIECE_VALUES[flag - 3] - PAWN_VALUE]
             lastval = -PIECE_VALUES[flag - 3]
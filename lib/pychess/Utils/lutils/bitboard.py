@@ -32,14 +32,11 @@ def firstBit(bitboard):
 # The bitCount array returns the leading non-zero bit in the 16 bit
 # input argument.
 
-lzArray = array('B', [0] * 65536)
-
-s = n = 1
+# The entries 2**i to 2**(i+1) - 1 all have their leading bit at 16 - 1 - i,
+# so the array is built from runs of repeated bytes
+lzArray = array('B', [0])
 for i in range(16):
-    for j in range(s, s + n):
-        lzArray[j] = 16 - 1 - i
-    s += n
-    n += n
+    lzArray.frombytes(bytes([16 - 1 - i]) * 2**i)
 
 
 # lastBit returns the bit closest to 63 (H8) that is set in the board
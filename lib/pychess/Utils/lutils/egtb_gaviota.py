@@ -1,15 +1,24 @@
 import os
 import re
+from collections import OrderedDict
 from ctypes import byref, c_byte, c_char_p, c_int, c_uint, c_ulong, c_size_t, c_double, Structure,\
     CDLL, CFUNCTYPE, POINTER
 
-from .bitboard import firstBit, clearBit
+from .bitboard import iterBits
 from .lmovegen import genAllMoves, genCheckEvasions
 from pychess.Utils.const import WHITE, BLACK, DRAW, WHITEWON, BLACKWON
 from pychess.System import conf
 from pychess.System.prefix import getDataPrefix
 from pychess.System.Log import log
 
+# Probe results kept in the LRU cache of EgtbGaviota
+PROBE_CACHE_SIZE = 1 << 16
+
+# Size of the cache of the library, and the part of it, in 128ths, for WDL
+# probes
+TB_CACHE_SIZE = 4 * 1024 * 1024
+WDL_CACHE_FRACTION = 32
+
 
 class TbStats(Structure):
     _fields_ = [
@@ -38,6 +47,18 @@ class EgtbGaviota:
         self.libgtb = None
         self.initialized = False
 
+        # Results of probes by the hash of the position, least recently used
+        # first. The depth is None for WDL probes.
+        self.probeCache = OrderedDict()
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+        # Arguments of the probe functions, reused by every probe
+        self.squares = ((c_uint * 65)(), (c_uint * 65)())
+        self.pieces = ((c_byte * 65)(), (c_byte * 65)())
+        self.tbinfo = c_uint()
+        self.plies = c_uint()
+
         # Get a list of files in the tablebase folder.
         configuredTbPath = conf.get("egtb_path")
         tbPath = configuredTbPath or getDataPrefix()
@@ -80,8 +101,7 @@ class EgtbGaviota:
         elif initInfo:
             log.info(initInfo)
 
-        # TODO: Set up a WDL cache area once the engine can use it.
-        self.initialized &= self.tbcache_init(4 * 1024 * 1024, 0)
+        self.initialized &= self.tbcache_init(TB_CACHE_SIZE, WDL_CACHE_FRACTION)
         if not self.initialized:
             log.warning("Failed to initialize Gaviota EGTB cache")
             self.tb_done()
@@ -130,54 +150,73 @@ class EgtbGaviota:
         return scores
 
     def scoreGame(self, board, omitDepth, probeSoft):
+        """ Returns the result and depth to mate of board, looked up in the
+            probe cache first. A result with a depth also answers WDL probes,
+            which are all the search needs below the root. """
+
+        cache = self.probeCache
+        entry = cache.get(board.hash)
+        if entry is not None and (omitDepth or entry[1] is not None or
+                                  entry[0] == DRAW):
+            cache.move_to_end(board.hash)
+            self.cacheHits += 1
+            result, depth = entry
+            return result, None if omitDepth else depth
+
+        self.cacheMisses += 1
+        result, depth = self._probe(board, omitDepth, probeSoft)
+        if result is not None:
+            cache[board.hash] = (result, depth)
+            cache.move_to_end(board.hash)
+            if len(cache) > PROBE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return result, depth
+
+    def _probe(self, board, omitDepth, probeSoft):
         stm = board.color
         epsq = board.enpassant or 64  # 64 is tb_NOSQUARE
         castles = (board.castling >> 2 & 3) | (board.castling << 2 & 12)
-        tbinfo = c_uint()
-        depth = c_uint()
 
-        SqArray = c_uint * 65
-        PcArray = c_byte * 65
-        pc, sq = [], []
+        arBoard = board.arBoard
         for color in (WHITE, BLACK):
-            sq.append(SqArray())
-            pc.append(PcArray())
-            i = 0
-            bb = board.friends[color]
-            while bb:
-                b = firstBit(bb)
-                bb = clearBit(bb, b)
-                sq[-1][i] = b
-                pc[-1][i] = board.arBoard[b]
-                i += 1
-            sq[-1][i] = 64  # tb_NOSQUARE, terminates the list
-            pc[-1][i] = 0  # tb_NOPIECE,  terminates the list
+            sq = self.squares[color]
+            pc = self.pieces[color]
+            # iterBits yields the cords from H8 down
+            cords = list(iterBits(board.friends[color]))
+            cords.reverse()
+            for i, cord in enumerate(cords):
+                sq[i] = cord
+                pc[i] = arBoard[cord]
+            sq[len(cords)] = 64  # tb_NOSQUARE, terminates the list
+            pc[len(cords)] = 0  # tb_NOPIECE,  terminates the list
 
+        sq, pc = self.squares, self.pieces
+        tbinfo = byref(self.tbinfo)
         if omitDepth and probeSoft:
             ok = self.tb_probe_WDL_soft(stm, epsq, castles, sq[WHITE],
                                         sq[BLACK], pc[WHITE], pc[BLACK],
-                                        byref(tbinfo))
+                                        tbinfo)
         elif omitDepth and not probeSoft:
             ok = self.tb_probe_WDL_hard(stm, epsq, castles, sq[WHITE],
                                         sq[BLACK], pc[WHITE], pc[BLACK],
-                                        byref(tbinfo))
+                                        tbinfo)
         elif not omitDepth and probeSoft:
             ok = self.tb_probe_soft(stm, epsq, castles, sq[WHITE], sq[BLACK],
-                                    pc[WHITE], pc[BLACK], byref(tbinfo),
-                                    byref(depth))
+                                    pc[WHITE], pc[BLACK], tbinfo,
+                                    byref(self.plies))
         elif not omitDepth and not probeSoft:
             ok = self.tb_probe_hard(stm, epsq, castles, sq[WHITE], sq[BLACK],
-                                    pc[WHITE], pc[BLACK], byref(tbinfo),
-                                    byref(depth))
+                                    pc[WHITE], pc[BLACK], tbinfo,
+                                    byref(self.plies))
 
         resultMap = [DRAW, WHITEWON, BLACKWON]
-        if not ok or not 0 <= tbinfo.value <= 2:
+        if not ok or not 0 <= self.tbinfo.value <= 2:
             return None, None
-        result = resultMap[tbinfo.value]
+        result = resultMap[self.tbinfo.value]
         if omitDepth or result == DRAW:
             depth = None
         else:
-            depth = depth.value
+            depth = self.plies.value
         return result, depth
 
     def _loadLibrary(self):
@@ -0,0 +1,192 @@
+""" Evaluation of large batches of positions with NumPy, for screening
+    databases where a search, or the full evaluation of leval, isn't needed.
+
+    The positions are the rows of an array of positionType: the twelve piece
+    bitboards of LBoard.boards (the white pawns to king, then the black ones),
+    the color to move, the castling rights and the en passant cord, or -1.
+    evaluateBatch scores all rows at once by material, piece square tables,
+    mobility and pawn structure. The terms follow leval, but are simplified
+    so that they can be computed for every row with array operations.
+    Only normal chess is evaluated.
+
+    NumPy is an optional dependency, and importing this module without it
+    raises an ImportError. """
+
+import numpy as np
+
+from pychess.Utils.const import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, \
+    KING
+from .ldata import PIECE_VALUES, fileBits, pawnScoreBoard, passedScores, \
+    isolani_normal, isolani_weaker, normalKing, endingKing
+
+positionType = np.dtype([("boards", np.uint64, 12),
+                         ("color", np.uint8),
+                         ("castling", np.uint8),
+                         ("enpassant", np.int8)])
+
+# Rows evaluated at once. The per cord terms need 768 bytes per row.
+CHUNK_SIZE = 1 << 14
+
+# Bonus by attacked cord not occupied by an own piece
+MOBILITY_WEIGHTS = {KNIGHT: 4, BISHOP: 4, ROOK: 2, QUEEN: 1}
+
+_bitCounts = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_notFileA = np.uint64(~fileBits[0] & 0xffffffffffffffff)
+_notFileH = np.uint64(~fileBits[7] & 0xffffffffffffffff)
+_notFileAB = np.uint64(~(fileBits[0] | fileBits[1]) & 0xffffffffffffffff)
+_notFileGH = np.uint64(~(fileBits[6] | fileBits[7]) & 0xffffffffffffffff)
+_fileBits = np.array(fileBits, dtype=np.uint64)
+_adjacentFiles = np.array([(fileBits[f - 1] if f > 0 else 0) |
+                           (fileBits[f + 1] if f < 7 else 0)
+                           for f in range(8)], dtype=np.uint64)
+
+_shifts = [np.uint64(i) for i in range(18)]
+
+_pawnTables = [np.array(pawnScoreBoard[color], dtype=np.float32)
+               for color in (WHITE, BLACK)]
+_passedTables = [np.repeat(np.array(passedScores[color], dtype=np.float32), 8)
+                 for color in (WHITE, BLACK)]
+_normalKing = np.array(normalKing, dtype=np.int64)
+_endingKing = np.array(endingKing, dtype=np.int64)
+
+# Cord n is bit 63 - n, so a step to a higher cord is a right shift. The
+# masks drop the cords a step wrapped around to the other side of the board.
+_directions = {
+    "n": lambda b: b >> _shifts[8],
+    "s": lambda b: b << _shifts[8],
+    "e": lambda b: (b >> _shifts[1]) & _notFileA,
+    "w": lambda b: (b << _shifts[1]) & _notFileH,
+    "ne": lambda b: (b >> _shifts[9]) & _notFileA,
+    "nw": lambda b: (b >> _shifts[7]) & _notFileH,
+    "se": lambda b: (b << _shifts[7]) & _notFileA,
+    "sw": lambda b: (b << _shifts[9]) & _notFileH,
+}
+_rookDirections = [_directions[d] for d in ("n", "s", "e", "w")]
+_bishopDirections = [_directions[d] for d in ("ne", "nw", "se", "sw")]
+
+
+def fromBoards(boards):
+    """ Returns an array of positionType with a row for each LBoard """
+    positions = np.zeros(len(boards), dtype=positionType)
+    for i, board in enumerate(boards):
+        row = positions[i]
+        row["boards"] = board.boards[WHITE][PAWN:KING + 1] + \
+            board.boards[BLACK][PAWN:KING + 1]
+        row["color"] = board.color
+        row["castling"] = board.castling
+        row["enpassant"] = -1 if board.enpassant is None else board.enpassant
+    return positions
+
+
+def popCount(bitboards):
+    """ Returns the number of bits set in each of the uint64 bitboards """
+    if hasattr(np, "bitwise_count"):
+        # NumPy 2
+        return np.bitwise_count(bitboards).astype(np.int32)
+    bitboards = np.ascontiguousarray(bitboards, dtype=np.uint64)
+    octets = bitboards.view(np.uint8).reshape(bitboards.shape + (8, ))
+    return _bitCounts[octets].sum(axis=-1, dtype=np.int32)
+
+
+def toCords(bitboards):
+    """ Returns an array of 0 and 1 by cord for each of the bitboards """
+    bitboards = np.ascontiguousarray(bitboards, dtype=">u8")
+    octets = bitboards.view(np.uint8).reshape(bitboards.shape + (8, ))
+    return np.unpackbits(octets, axis=-1).reshape(bitboards.shape + (64, ))
+
+
+def _sumTable(bitboards, table):
+    """ Returns the sum of the values of table by cord of each bitboard """
+    # Float matrix products are the fastest, and exact for these sums
+    return (toCords(bitboards).astype(np.float32) @ table).astype(np.int64)
+
+
+def _slide(pieces, empty, directions):
+    attacks = np.zeros_like(pieces)
+    for step in directions:
+        ray = step(pieces)
+        for i in range(6):
+            attacks |= ray
+            ray = step(ray & empty)
+        attacks |= ray
+    return attacks
+
+
+def _knightAttacks(knights):
+    s = _shifts
+    return ((knights >> s[17]) & _notFileA) | ((knights >> s[15]) & _notFileH) | \
+        ((knights >> s[10]) & _notFileAB) | ((knights >> s[6]) & _notFileGH) | \
+        ((knights << s[17]) & _notFileH) | ((knights << s[15]) & _notFileA) | \
+        ((knights << s[10]) & _notFileGH) | ((knights << s[6]) & _notFileAB)
+
+
+def _fill(pawns, step):
+    """ Returns the cords beyond pawns in the direction of step """
+    span = step(pawns)
+    for i in range(5):
+        span |= step(span)
+    return span
+
+
+def _evaluateChunk(positions):
+    boards = positions["boards"]
+    counts = popCount(boards)
+
+    values = np.array(PIECE_VALUES[PAWN:KING] + [0], dtype=np.int64)
+    material = np.stack((counts[:, :6] @ values, counts[:, 6:] @ values))
+    phase = np.maximum(1, 8 - (material[WHITE] + material[BLACK]) // 1150)
+    score = material[WHITE] - material[BLACK]
+
+    friends = (np.bitwise_or.reduce(boards[:, :6], axis=1),
+               np.bitwise_or.reduce(boards[:, 6:], axis=1))
+    empty = ~(friends[WHITE] | friends[BLACK])
+
+    for color in (WHITE, BLACK):
+        sign = 1 if color == WHITE else -1
+        pieces = [None] + [boards[:, color * 6 + i] for i in range(6)]
+        pawns = pieces[PAWN]
+        oppawns = boards[:, (1 - color) * 6]
+
+        # Piece square tables of the pawns and king
+        score += sign * _sumTable(pawns, _pawnTables[color]) * 2
+        # The log of a single bit is exact
+        kings = 63 - np.log2(np.maximum(pieces[KING], 1).astype(np.float64)).astype(np.int64)
+        score += sign * np.where(phase >= 6, _endingKing[kings], _normalKing[kings])
+
+        # Mobility
+        notFriends = ~friends[color]
+        attacks = {KNIGHT: _knightAttacks(pieces[KNIGHT]),
+                   BISHOP: _slide(pieces[BISHOP], empty, _bishopDirections),
+                   ROOK: _slide(pieces[ROOK], empty, _rookDirections),
+                   QUEEN: _slide(pieces[QUEEN], empty,
+                                 _rookDirections + _bishopDirections)}
+        for piece, weight in MOBILITY_WEIGHTS.items():
+            score += sign * weight * popCount(attacks[piece] & notFriends)
+
+        # Passed pawns, which no opponent pawn in front of them can stop
+        stops = _fill(oppawns, _directions["s" if color == WHITE else "n"])
+        stops |= _directions["e"](stops) | _directions["w"](stops)
+        passed = _sumTable(pawns & ~stops, _passedTables[color])
+        score += sign * (passed * phase // 12)
+
+        # Doubled and isolated pawns, by file
+        pawnFiles = popCount(pawns[:, None] & _fileBits)
+        doubled = (pawnFiles > 1).sum(axis=1)
+        score -= sign * doubled * (8 + phase)
+        isolated = (pawnFiles > 0) & ((pawns[:, None] & _adjacentFiles) == 0)
+        halfOpen = (oppawns[:, None] & _fileBits) == 0
+        penalties = np.where(halfOpen, isolani_weaker, isolani_normal)
+        score += sign * (isolated * penalties * pawnFiles).sum(axis=1)
+
+    return np.where(positions["color"] == WHITE, score, -score).astype(np.int32)
+
+
+def evaluateBatch(positions):
+    """ Returns an int32 array of the score of each row of positions, an array
+        of positionType, for the color to move """
+    scores = np.empty(len(positions), dtype=np.int32)
+    for start in range(0, len(positions), CHUNK_SIZE):
+        chunk = positions[start:start + CHUNK_SIZE]
+        scores[start:start + len(chunk)] = _evaluateChunk(chunk)
+    return scores
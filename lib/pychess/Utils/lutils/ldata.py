@@ -5,9 +5,12 @@ from pychess.Utils.const import WHITE, BLACK, KING, PAWN, EMPTY, KNIGHT, ROOK, B
     A1, A2, A3, A4, A5, A6, A7, A8, \
     B2, C3, D4, E5, F6, G7, H8,\
     B7, C6, D5, E4, F3, G2, H1, \
-    B1, B8, H2, H7, G3, G6, B3, B6, sliders
+    B1, B8, H2, H7, G3, G6, B3, B6, sliders, ASEAN_VARIANTS, ATOMICCHESS, \
+    CRAZYHOUSECHESS, LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS
 
+from . import bitboard
 from .bitboard import bitPosArray, iterBits, setBit
+from .tablecache import loadTables
 
 
 def RANK(cord):
@@ -33,6 +36,23 @@ ASEAN_PIECE_VALUES = (0, 100, 450, 300, 630, 180, 2000)
 CRAZY_PIECE_VALUES = (0, 100, 200, 240, 240, 380, 2000)
 ATOMIC_PIECE_VALUES = (0, 100, 90, 0, 220, 850, 2000)
 
+
+def materialValues(variant):
+    """ Returns the values leval counts the material on the board of variant
+        with, by piece """
+    if variant == CRAZYHOUSECHESS:
+        return CRAZY_PIECE_VALUES[:KING] + (0, )
+    elif variant == LOSERSCHESS:
+        return (0, 1, 1, 1, 1, 1, 0)
+    elif variant == SUICIDECHESS or variant == GIVEAWAYCHESS:
+        return (0, 1, 1, 1, 1, 1, 1)
+    elif variant == ATOMICCHESS:
+        return ATOMIC_PIECE_VALUES
+    elif variant in ASEAN_VARIANTS:
+        return ASEAN_PIECE_VALUES
+    return tuple(PIECE_VALUES[:KING]) + (0, )
+
+
 # Maximum possible search depth. The hash structure only allows 8-bit depths.
 MAXPLY = 10
 # Maximum possible score. Mate in n ply is +/- (MATE_VALUE-n).
@@ -66,27 +86,6 @@ isolani_normal = (-8, -10, -12, -14, -14, -12, -10, -8)
 # Penalties if the file is half-open (i.e. no enemy pawns on it)
 isolani_weaker = (-22, -24, -26, -28, -28, -26, -24, -22)
 
-# Distance boards for different pieces
-
-taxicab = [[0] * 64 for i in range(64)]
-sdistance = [[0] * 64 for i in range(64)]
-for fcord in range(64):
-    for tcord in range(fcord + 1, 64):
-        fx = FILE(fcord)
-        fy = RANK(fcord)
-        tx = FILE(tcord)
-        ty = RANK(tcord)
-        taxicab[fcord][tcord] = taxicab[fcord][tcord] = abs(fx - tx) + abs(fy -
-                                                                           ty)
-        sdistance[fcord][tcord] = sdistance[fcord][tcord] = min(
-            abs(fx - tx), abs(fy - ty))
-
-distance = [[[0] * 64 for i in range(64)] for j in range(KING + 1)]
-
-distance[EMPTY] = None
-distance[KING] = sdistance
-distance[PAWN] = sdistance
-
 # Special table for knightdistances
 
 knightDistance = [
@@ -107,49 +106,6 @@ knightDistance = [
     6, 5, 4, 5, 4, 5, 4, 5, 4, 5, 4, 5, 4, 5, 6,
 ]
 
-# Calculate
-
-for fcord in range(64):
-    frank = RANK(fcord)
-    ffile = FILE(fcord)
-
-    for tcord in range(fcord + 1, 64):
-        # Notice, that we skip fcord == tcord, as all fields are zero from
-        # scratch in anyway
-
-        trank = RANK(tcord)
-        tfile = FILE(tcord)
-
-        # Knight
-        field = (7 - frank + trank) * 15 + 7 - ffile + tfile
-        distance[KNIGHT][tcord][fcord] = distance[KNIGHT][fcord][tcord] = \
-            knightDistance[field]
-
-        # Rook
-        if frank == trank or ffile == tfile:
-            distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 1
-        else:
-            distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 2
-
-        # Bishop
-        if abs(frank - trank) == abs(ffile - tfile):
-            distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 1
-        else:
-            distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 2
-
-        # Queen
-        if frank == trank or ffile == tfile or abs(frank - trank) == abs(
-                ffile - tfile):
-            distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 1
-        else:
-            distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 2
-
-# Special cases for knights in corners
-distance[KNIGHT][A1][B2] = distance[KNIGHT][B2][A1] = 4
-distance[KNIGHT][H1][G2] = distance[KNIGHT][G2][H1] = 4
-distance[KNIGHT][A8][B7] = distance[KNIGHT][B7][A8] = 4
-distance[KNIGHT][H8][G7] = distance[KNIGHT][G7][H8] = 4
-
 ###############################################################################
 # Boards used for evaluating
 ###############################################################################
@@ -302,147 +258,6 @@ right = fileBits[5] | fileBits[6] | fileBits[7]
 # # # # - - - - -
 left = fileBits[0] | fileBits[1] | fileBits[2]
 
-#  Generate the move bitboards.  For e.g. the bitboard for all                 #
-#  the moves of a knight on f3 is given by MoveArray[knight][21].              #
-
-dir = [
-    None,
-    [9, 11],  # Only capture moves are included
-    [-21, -19, -12, -8, 8, 12, 19, 21],
-    [-11, -9, 9, 11],
-    [-10, -1, 1, 10],
-    [-11, -10, -9, -1, 1, 9, 10, 11],
-    [-11, -10, -9, -1, 1, 9, 10, 11],
-    [-9, -11],
-    [-11, -9, 9, 10, 11],
-    [-11, -10, -9, 9, 11],
-    [-11, -9, 9, 11],
-
-    # Following are for front and back walls. Will be removed from list after
-    # the loop
-    [9, 10, 11],
-    [-9, -10, -11]
-]
-
-sliders += [False, False]
-
-map = [
-    -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
-    -1, -1, 0, 1, 2, 3, 4, 5, 6, 7, -1, -1, 8, 9, 10, 11, 12, 13, 14, 15, -1,
-    -1, 16, 17, 18, 19, 20, 21, 22, 23, -1, -1, 24, 25, 26, 27, 28, 29, 30, 31,
-    -1, -1, 32, 33, 34, 35, 36, 37, 38, 39, -1, -1, 40, 41, 42, 43, 44, 45, 46,
-    47, -1, -1, 48, 49, 50, 51, 52, 53, 54, 55, -1, -1, 56, 57, 58, 59, 60, 61,
-    62, 63, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
-    -1, -1, -1, -1
-]
-
-moveArray = [[0] * 64 for i in range(len(dir))]  # moveArray[len(dir)][64]
-
-for piece in range(1, len(dir)):
-    for fcord in range(120):
-        f = map[fcord]
-        if f == -1:
-            # We only generate moves for squares inside the board
-            continue
-        # Create a new bitboard
-        b = 0
-        for d in dir[piece]:
-            tcord = fcord
-            while True:
-                tcord += d
-                t = map[tcord]
-                if t == -1:
-                    # If we landed outside of board, there is no more to look
-                    # for
-                    break
-                b = setBit(b, t)
-                if not sliders[piece]:
-                    # If we are a slider, we should not break, but add the dir
-                    # value once again
-                    break
-        moveArray[piece][f] = b
-
-frontWall = (moveArray[-2], moveArray[-1])
-del moveArray[-1]
-del moveArray[-1]
-del dir[-1]
-del dir[-1]
-del sliders[-1]
-del sliders[-1]
-
-# For each square, there are 8 rays.  The first 4 rays are diagonals
-# for the bishops and the next 4  are file/rank for the rooks.
-# The queen uses all 8 rays.
-# These rays are used for move generation rather than MoveArray[].
-# Also initialize the directions[][] array.  directions[f][t] returns
-# the index into rays[f] array allow us to find the ray in that direction.
-
-directions = [[-1] * 64 for i in range(64)]  # directions[64][64]
-rays = [[0] * 8 for i in range(64)]  # rays[64][8]
-
-for fcord in range(120):
-    f = map[fcord]
-    if f == -1:
-        continue
-    ray = -1
-    for piece in BISHOP, ROOK:
-        for d in dir[piece]:
-            ray += 1
-            b = 0
-            tcord = fcord
-            while True:
-                tcord += d
-                t = map[tcord]
-                if t == -1:
-                    break
-                rays[f][ray] = setBit(rays[f][ray], t)
-                directions[f][t] = ray
-
-# The FromToRay[b2][f6] gives the diagonal ray from c3 to f6;
-# It also produces horizontal/vertical rays as well. If no
-# ray is possible, then a 0 is returned.
-
-fromToRay = [[0] * 64 for i in range(64)]  # fromToRay[64][64]
-
-for piece in BISHOP, ROOK:
-    for fcord in range(120):
-        f = map[fcord]
-        if f == -1:
-            continue
-        for d in dir[piece]:
-            tcord = fcord
-            t = map[tcord]
-
-            while True:
-                b = fromToRay[f][t]
-                tcord += d
-                t = map[tcord]
-                if t == -1:
-                    break
-                fromToRay[f][t] = setBit(fromToRay[f][t], t)
-                fromToRay[f][t] |= b
-
-# The PassedPawnMask variable is used to determine if a pawn is passed.
-#  his mask is basically all 1's from the square in front of the pawn to
-# the promotion square, also duplicated on both files besides the pawn
-# file. Other bits will be set to zero.
-# E.g. PassedPawnMask[white][b3] = 1's in a4-c4-c8-a8 rect, 0 otherwise.
-
-passedPawnMask = [[0] * 64, [0] * 64]
-
-#  Do for white pawns first
-for cord in range(64):
-    passedPawnMask[WHITE][cord] = rays[cord][7]
-    passedPawnMask[BLACK][cord] = rays[cord][4]
-    if cord & 7 != 0:
-        #  If file is not left most
-        passedPawnMask[WHITE][cord] |= rays[cord - 1][7]
-        passedPawnMask[BLACK][cord] |= rays[cord - 1][4]
-    if cord & 7 != 7:
-        #  If file is not right most
-        passedPawnMask[WHITE][cord] |= rays[cord + 1][7]
-        passedPawnMask[BLACK][cord] |= rays[cord + 1][4]
-
 # The IsolaniMask variable is used to determine if a pawn is an isolani.
 # This mask is basically all 1's on files beside the file the pawn is on.
 # Other bits will be set to zero.
@@ -455,128 +270,438 @@ isolaniMask[7] = fileBits[6]
 for i in range(1, 7):
     isolaniMask[i] = fileBits[i - 1] | fileBits[i + 1]
 
-# The SquarePawnMask is used to determine if a king is in the square of
-# the passed pawn and is able to prevent it from queening.
-# Caveat:  Pawns on 2nd rank have the same mask as pawns on the 3rd rank
-# as they can advance 2 squares.
-
-squarePawnMask = [[0] * 64, [0] * 64]
-for cord in range(64):
-    # White mask
-    rank = 7 - RANK(cord)
-    i = max(cord & 56, cord - rank)
-    j = min(cord | 7, cord + rank)
-    for k in range(i, j + 1):
-        squarePawnMask[WHITE][cord] |= bitPosArray[k] | fromToRay[k][k | 56]
-
-    # Black mask
-    rank = RANK(cord)
-    i = max(cord & 56, cord - rank)
-    j = min(cord | 7, cord + rank)
-    for k in range(i, j + 1):
-        squarePawnMask[BLACK][cord] |= bitPosArray[k] | fromToRay[k][k & 7]
-
-# For pawns on 2nd rank, they have same mask as pawns on 3rd rank
-for cord in range(A2, H2 + 1):
-    squarePawnMask[WHITE][cord] = squarePawnMask[WHITE][cord + 8]
-for cord in range(A7, H7 + 1):
-    squarePawnMask[BLACK][cord] = squarePawnMask[BLACK][cord - 8]
-
-# These tables are used to calculate rook, queen and bishop moves
-
-ray00 = [rays[cord][5] | rays[cord][6] | 1 << (63 - cord)
-         for cord in range(64)]
-ray45 = [rays[cord][0] | rays[cord][3] | 1 << (63 - cord)
-         for cord in range(64)]
-ray90 = [rays[cord][4] | rays[cord][7] | 1 << (63 - cord)
-         for cord in range(64)]
-ray135 = [rays[cord][1] | rays[cord][2] | 1 << (63 - cord)
-          for cord in range(64)]
-
-attack00 = [{} for a in range(64)]
-attack45 = [{} for a in range(64)]
-attack90 = [{} for a in range(64)]
-attack135 = [{} for a in range(64)]
-
-cmap = [128, 64, 32, 16, 8, 4, 2, 1]
-rot1 = [A1, A2, A3, A4, A5, A6, A7, A8]
-rot2 = [A1, B2, C3, D4, E5, F6, G7, H8]
-rot3 = [A8, B7, C6, D5, E4, F3, G2, H1]
-
-# To save time, we init a main line for each of the four directions, and next
-# we will translate it for each possible cord
-for cord in range(8):
-    for map in range(1, 256):
-
-        # Skip entries without cord set, as cord will always be set
-        if not map & cmap[cord]:
+###############################################################################
+# Tables computed at import time, cached by tablecache                        #
+###############################################################################
+
+MAXBITBOARD = (1 << 64) - 1
+
+
+def generateTables():
+    """ Computes the distance, move, ray and attack tables """
+
+    taxicab = [[0] * 64 for i in range(64)]
+    sdistance = [[0] * 64 for i in range(64)]
+    for fcord in range(64):
+        for tcord in range(fcord + 1, 64):
+            fx = FILE(fcord)
+            fy = RANK(fcord)
+            tx = FILE(tcord)
+            ty = RANK(tcord)
+            taxicab[fcord][tcord] = taxicab[fcord][tcord] = abs(fx - tx) + abs(fy - ty)
+            sdistance[fcord][tcord] = sdistance[fcord][tcord] = min(
+                abs(fx - tx), abs(fy - ty))
+
+    distance = [[[0] * 64 for i in range(64)] for j in range(KING + 1)]
+
+    distance[EMPTY] = None
+    distance[KING] = sdistance
+    distance[PAWN] = sdistance
+
+    # Calculate
+
+    for fcord in range(64):
+        frank = RANK(fcord)
+        ffile = FILE(fcord)
+
+        for tcord in range(fcord + 1, 64):
+            # Notice, that we skip fcord == tcord, as all fields are zero from
+            # scratch in anyway
+
+            trank = RANK(tcord)
+            tfile = FILE(tcord)
+
+            # Knight
+            field = (7 - frank + trank) * 15 + 7 - ffile + tfile
+            distance[KNIGHT][tcord][fcord] = distance[KNIGHT][fcord][tcord] = \
+                knightDistance[field]
+
+            # Rook
+            if frank == trank or ffile == tfile:
+                distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 1
+            else:
+                distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 2
+
+            # Bishop
+            if abs(frank - trank) == abs(ffile - tfile):
+                distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 1
+            else:
+                distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 2
+
+            # Queen
+            if frank == trank or ffile == tfile or abs(frank - trank) == abs(
+                    ffile - tfile):
+                distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 1
+            else:
+                distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 2
+
+    # Special cases for knights in corners
+    distance[KNIGHT][A1][B2] = distance[KNIGHT][B2][A1] = 4
+    distance[KNIGHT][H1][G2] = distance[KNIGHT][G2][H1] = 4
+    distance[KNIGHT][A8][B7] = distance[KNIGHT][B7][A8] = 4
+    distance[KNIGHT][H8][G7] = distance[KNIGHT][G7][H8] = 4
+
+    #  Generate the move bitboards.  For e.g. the bitboard for all                 #
+    #  the moves of a knight on f3 is given by MoveArray[knight][21].              #
+
+    dir = [
+        None,
+        [9, 11],  # Only capture moves are included
+        [-21, -19, -12, -8, 8, 12, 19, 21],
+        [-11, -9, 9, 11],
+        [-10, -1, 1, 10],
+        [-11, -10, -9, -1, 1, 9, 10, 11],
+        [-11, -10, -9, -1, 1, 9, 10, 11],
+        [-9, -11],
+        [-11, -9, 9, 10, 11],
+        [-11, -10, -9, 9, 11],
+        [-11, -9, 9, 11],
+
+        # Following are for front and back walls. Will be removed from list after
+        # the loop
+        [9, 10, 11],
+        [-9, -10, -11]
+    ]
+
+    slides = sliders + [False, False]
+
+    map = [
+        -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+        -1, -1, 0, 1, 2, 3, 4, 5, 6, 7, -1, -1, 8, 9, 10, 11, 12, 13, 14, 15, -1,
+        -1, 16, 17, 18, 19, 20, 21, 22, 23, -1, -1, 24, 25, 26, 27, 28, 29, 30, 31,
+        -1, -1, 32, 33, 34, 35, 36, 37, 38, 39, -1, -1, 40, 41, 42, 43, 44, 45, 46,
+        47, -1, -1, 48, 49, 50, 51, 52, 53, 54, 55, -1, -1, 56, 57, 58, 59, 60, 61,
+        62, 63, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+        -1, -1, -1, -1
+    ]
+
+    moveArray = [[0] * 64 for i in range(len(dir))]  # moveArray[len(dir)][64]
+
+    for piece in range(1, len(dir)):
+        for fcord in range(120):
+            f = map[fcord]
+            if f == -1:
+                # We only generate moves for squares inside the board
+                continue
+            # Create a new bitboard
+            b = 0
+            for d in dir[piece]:
+                tcord = fcord
+                while True:
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        # If we landed outside of board, there is no more to look
+                        # for
+                        break
+                    b = setBit(b, t)
+                    if not slides[piece]:
+                        # If we are a slider, we should not break, but add the dir
+                        # value once again
+                        break
+            moveArray[piece][f] = b
+
+    frontWall = (moveArray[-2], moveArray[-1])
+    del moveArray[-1]
+    del moveArray[-1]
+
+    # For each square, there are 8 rays.  The first 4 rays are diagonals
+    # for the bishops and the next 4  are file/rank for the rooks.
+    # The queen uses all 8 rays.
+    # These rays are used for move generation rather than MoveArray[].
+    # Also initialize the directions[][] array.  directions[f][t] returns
+    # the index into rays[f] array allow us to find the ray in that direction.
+
+    directions = [[-1] * 64 for i in range(64)]  # directions[64][64]
+    rays = [[0] * 8 for i in range(64)]  # rays[64][8]
+
+    for fcord in range(120):
+        f = map[fcord]
+        if f == -1:
             continue
+        ray = -1
+        for piece in BISHOP, ROOK:
+            for d in dir[piece]:
+                ray += 1
+                b = 0
+                tcord = fcord
+                while True:
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        break
+                    rays[f][ray] = setBit(rays[f][ray], t)
+                    directions[f][t] = ray
+
+    # The FromToRay[b2][f6] gives the diagonal ray from c3 to f6;
+    # It also produces horizontal/vertical rays as well. If no
+    # ray is possible, then a 0 is returned.
+
+    fromToRay = [[0] * 64 for i in range(64)]  # fromToRay[64][64]
 
-        # Find limits inclusive
-        cord1 = cord2 = cord
-        while cord1 > 0:
-            cord1 -= 1
-            if cmap[cord1] & map:
-                break
-        while cord2 < 7:
-            cord2 += 1
-            if cmap[cord2] & map:
-                break
-
-        # Remember A1 is the left most bit
-        map00 = map << 56
-
-        attack00[cord][map00] = \
-            fromToRay[cord][cord1] |\
-            fromToRay[cord][cord2]
-
-        map90 = reduce(or_, (1 << 63 - rot1[c] for c in iterBits(map00)))
-        attack90[rot1[cord]][map90] = \
-            fromToRay[rot1[cord]][rot1[cord1]] | \
-            fromToRay[rot1[cord]][rot1[cord2]]
-
-        map45 = reduce(or_, (1 << 63 - rot2[c] for c in iterBits(map00)))
-        attack45[rot2[cord]][map45] = \
-            fromToRay[rot2[cord]][rot2[cord1]] | \
-            fromToRay[rot2[cord]][rot2[cord2]]
-
-        map135 = reduce(or_, (1 << 63 - rot3[c] for c in iterBits(map00)))
-        attack135[rot3[cord]][map135] = \
-            fromToRay[rot3[cord]][rot3[cord1]] |\
-            fromToRay[rot3[cord]][rot3[cord2]]
+    for piece in BISHOP, ROOK:
+        for fcord in range(120):
+            f = map[fcord]
+            if f == -1:
+                continue
+            for d in dir[piece]:
+                tcord = fcord
+                t = map[tcord]
 
-MAXBITBOARD = (1 << 64) - 1
+                while True:
+                    b = fromToRay[f][t]
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        break
+                    fromToRay[f][t] = setBit(fromToRay[f][t], t)
+                    fromToRay[f][t] |= b
+
+    # The PassedPawnMask variable is used to determine if a pawn is passed.
+    #  his mask is basically all 1's from the square in front of the pawn to
+    # the promotion square, also duplicated on both files besides the pawn
+    # file. Other bits will be set to zero.
+    # E.g. PassedPawnMask[white][b3] = 1's in a4-c4-c8-a8 rect, 0 otherwise.
+
+    passedPawnMask = [[0] * 64, [0] * 64]
+
+    #  Do for white pawns first
+    for cord in range(64):
+        passedPawnMask[WHITE][cord] = rays[cord][7]
+        passedPawnMask[BLACK][cord] = rays[cord][4]
+        if cord & 7 != 0:
+            #  If file is not left most
+            passedPawnMask[WHITE][cord] |= rays[cord - 1][7]
+            passedPawnMask[BLACK][cord] |= rays[cord - 1][4]
+        if cord & 7 != 7:
+            #  If file is not right most
+            passedPawnMask[WHITE][cord] |= rays[cord + 1][7]
+            passedPawnMask[BLACK][cord] |= rays[cord + 1][4]
+
+    # The SquarePawnMask is used to determine if a king is in the square of
+    # the passed pawn and is able to prevent it from queening.
+    # Caveat:  Pawns on 2nd rank have the same mask as pawns on the 3rd rank
+    # as they can advance 2 squares.
+
+    squarePawnMask = [[0] * 64, [0] * 64]
+    for cord in range(64):
+        # White mask
+        rank = 7 - RANK(cord)
+        i = max(cord & 56, cord - rank)
+        j = min(cord | 7, cord + rank)
+        for k in range(i, j + 1):
+            squarePawnMask[WHITE][cord] |= bitPosArray[k] | fromToRay[k][k | 56]
+
+        # Black mask
+        rank = RANK(cord)
+        i = max(cord & 56, cord - rank)
+        j = min(cord | 7, cord + rank)
+        for k in range(i, j + 1):
+            squarePawnMask[BLACK][cord] |= bitPosArray[k] | fromToRay[k][k & 7]
+
+    # For pawns on 2nd rank, they have same mask as pawns on 3rd rank
+    for cord in range(A2, H2 + 1):
+        squarePawnMask[WHITE][cord] = squarePawnMask[WHITE][cord + 8]
+    for cord in range(A7, H7 + 1):
+        squarePawnMask[BLACK][cord] = squarePawnMask[BLACK][cord - 8]
+
+    # Bonus of a piece for its closeness to the opponent king, by piece, cord
+    # and king cord
+
+    tropisms = [None] + [[[0] * 64 for i in range(64)]
+                         for piece in range(PAWN, KING)] + [None]
+    for pcord in range(64):
+        for kcord in range(pcord + 1, 64):
+            tropisms[PAWN][pcord][kcord] = tropisms[PAWN][kcord][pcord] = \
+                (14 - taxicab[pcord][kcord])**2 * 10 / 169
+            tropisms[KNIGHT][pcord][kcord] = tropisms[KNIGHT][kcord][pcord] = \
+                (6 - distance[KNIGHT][pcord][kcord])**2 * 2
+            for piece, weight in ((BISHOP, 30), (ROOK, 40), (QUEEN, 50)):
+                tropisms[piece][pcord][kcord] = tropisms[piece][kcord][pcord] = \
+                    (14 - distance[piece][pcord][kcord] *
+                     sdistance[pcord][kcord])**2 * weight // 169
+
+    # These tables are used to calculate rook, queen and bishop moves
+
+    ray00 = [rays[cord][5] | rays[cord][6] | 1 << (63 - cord)
+             for cord in range(64)]
+    ray45 = [rays[cord][0] | rays[cord][3] | 1 << (63 - cord)
+             for cord in range(64)]
+    ray90 = [rays[cord][4] | rays[cord][7] | 1 << (63 - cord)
+             for cord in range(64)]
+    ray135 = [rays[cord][1] | rays[cord][2] | 1 << (63 - cord)
+              for cord in range(64)]
+
+    attack00 = [{} for a in range(64)]
+    attack45 = [{} for a in range(64)]
+    attack90 = [{} for a in range(64)]
+    attack135 = [{} for a in range(64)]
+
+    cmap = [128, 64, 32, 16, 8, 4, 2, 1]
+    rot1 = [A1, A2, A3, A4, A5, A6, A7, A8]
+    rot2 = [A1, B2, C3, D4, E5, F6, G7, H8]
+    rot3 = [A8, B7, C6, D5, E4, F3, G2, H1]
+
+    # To save time, we init a main line for each of the four directions, and next
+    # we will translate it for each possible cord
+    for cord in range(8):
+        for map in range(1, 256):
+
+            # Skip entries without cord set, as cord will always be set
+            if not map & cmap[cord]:
+                continue
+
+            # Find limits inclusive
+            cord1 = cord2 = cord
+            while cord1 > 0:
+                cord1 -= 1
+                if cmap[cord1] & map:
+                    break
+            while cord2 < 7:
+                cord2 += 1
+                if cmap[cord2] & map:
+                    break
 
-for r in range(A2, A8 + 1, 8):
-    for cord in iterBits(ray00[r]):
-        attack00[cord] = dict((map >> 8, ray >> 8)
-                              for map, ray in attack00[cord - 8].items())
-
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray90[r]):
-        attack90[cord] = dict((map >> 1, ray >> 1)
-                              for map, ray in attack90[cord - 1].items())
-
-# Bottom right
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
-                              for map, ray in attack45[cord + 8].items())
-
-# Top left
-for r in reversed(range(A8, H8)):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = dict((map >> 8, ray >> 8)
-                              for map, ray in attack45[cord - 8].items())
-
-# Top right
-for r in range(B8, H8 + 1):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = dict((map >> 8, ray >> 8)
-                               for map, ray in attack135[cord - 8].items())
-
-# Bottom left
-for r in reversed(range(A1, H1)):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
-                               for map, ray in attack135[cord + 8].items())
+            # Remember A1 is the left most bit
+            map00 = map << 56
+
+            attack00[cord][map00] = \
+                fromToRay[cord][cord1] |\
+                fromToRay[cord][cord2]
+
+            map90 = reduce(or_, (1 << 63 - rot1[c] for c in iterBits(map00)))
+            attack90[rot1[cord]][map90] = \
+                fromToRay[rot1[cord]][rot1[cord1]] | \
+                fromToRay[rot1[cord]][rot1[cord2]]
+
+            map45 = reduce(or_, (1 << 63 - rot2[c] for c in iterBits(map00)))
+            attack45[rot2[cord]][map45] = \
+                fromToRay[rot2[cord]][rot2[cord1]] | \
+                fromToRay[rot2[cord]][rot2[cord2]]
+
+            map135 = reduce(or_, (1 << 63 - rot3[c] for c in iterBits(map00)))
+            attack135[rot3[cord]][map135] = \
+                fromToRay[rot3[cord]][rot3[cord1]] |\
+                fromToRay[rot3[cord]][rot3[cord2]]
+
+    for r in range(A2, A8 + 1, 8):
+        for cord in iterBits(ray00[r]):
+            attack00[cord] = dict((map >> 8, ray >> 8)
+                                  for map, ray in attack00[cord - 8].items())
+
+    for r in range(B1, H1 + 1):
+        for cord in iterBits(ray90[r]):
+            attack90[cord] = dict((map >> 1, ray >> 1)
+                                  for map, ray in attack90[cord - 1].items())
+
+    # Bottom right
+    for r in range(B1, H1 + 1):
+        for cord in iterBits(ray45[r]):
+            attack45[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
+                                  for map, ray in attack45[cord + 8].items())
+
+    # Top left
+    for r in reversed(range(A8, H8)):
+        for cord in iterBits(ray45[r]):
+            attack45[cord] = dict((map >> 8, ray >> 8)
+                                  for map, ray in attack45[cord - 8].items())
+
+    # Top right
+    for r in range(B8, H8 + 1):
+        for cord in iterBits(ray135[r]):
+            attack135[cord] = dict((map >> 8, ray >> 8)
+                                   for map, ray in attack135[cord - 8].items())
+
+    # Bottom left
+    for r in reversed(range(A1, H1)):
+        for cord in iterBits(ray135[r]):
+            attack135[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
+                                   for map, ray in attack135[cord + 8].items())
+
+    # The same attacks, in one table for each slider and cord. The tables are
+    # keyed by the occupied squares on the lines of the cord, less the cord
+    # itself and the far ends, which never block anything. So every blocker
+    # masked by the cord has an entry, and rook and bishop attacks take one
+    # lookup each.
+
+    def occupancyTables(lines):
+        masks = []
+        tables = []
+        for cord in range(64):
+            bit = bitPosArray[cord]
+            mask = 0
+            for ray, attack, ends in lines:
+                mask |= ray[cord] & ~ends & ~bit
+            table = {}
+            occupied = 0
+            while True:
+                blocker = occupied | bit
+                table[occupied] = reduce(or_, (attack[cord][ray[cord] & blocker]
+                                               for ray, attack, ends in lines))
+                occupied = (occupied - mask) & mask
+                if not occupied:
+                    break
+            masks.append(mask)
+            tables.append(table)
+        return masks, tables
+
+    fileEnds = fileBits[0] | fileBits[7]
+    rankEnds = rankBits[0] | rankBits[7]
+    rookMasks, rookAttacks = occupancyTables((
+        (ray00, attack00, fileEnds), (ray90, attack90, rankEnds)))
+    bishopMasks, bishopAttacks = occupancyTables((
+        (ray45, attack45, fileEnds | rankEnds),
+        (ray135, attack135, fileEnds | rankEnds)))
+
+    return {
+        "taxicab": taxicab,
+        "sdistance": sdistance,
+        "distance": distance,
+        "moveArray": moveArray,
+        "frontWall": frontWall,
+        "directions": directions,
+        "rays": rays,
+        "fromToRay": fromToRay,
+        "passedPawnMask": passedPawnMask,
+        "squarePawnMask": squarePawnMask,
+        "tropisms": tropisms,
+        "ray00": ray00,
+        "ray45": ray45,
+        "ray90": ray90,
+        "ray135": ray135,
+        "attack00": attack00,
+        "attack45": attack45,
+        "attack90": attack90,
+        "attack135": attack135,
+        "rookMasks": rookMasks,
+        "rookAttacks": rookAttacks,
+        "bishopMasks": bishopMasks,
+        "bishopAttacks": bishopAttacks,
+    }
+
+
+# The tables are made with the helpers of this module and bitboard
+_tables = loadTables("ldata", generateTables, (__file__, bitboard.__file__))
+taxicab = _tables["taxicab"]
+sdistance = _tables["sdistance"]
+distance = _tables["distance"]
+moveArray = _tables["moveArray"]
+frontWall = _tables["frontWall"]
+directions = _tables["directions"]
+rays = _tables["rays"]
+fromToRay = _tables["fromToRay"]
+passedPawnMask = _tables["passedPawnMask"]
+squarePawnMask = _tables["squarePawnMask"]
+tropisms = _tables["tropisms"]
+ray00 = _tables["ray00"]
+ray45 = _tables["ray45"]
+ray90 = _tables["ray90"]
+ray135 = _tables["ray135"]
+attack00 = _tables["attack00"]
+attack45 = _tables["attack45"]
+attack90 = _tables["attack90"]
+attack135 = _tables["attack135"]
+rookMasks = _tables["rookMasks"]
+rookAttacks = _tables["rookAttacks"]
+bishopMasks = _tables["bishopMasks"]
+bishopAttacks = _tables["bishopAttacks"]
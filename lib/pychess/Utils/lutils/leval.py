@@ -7,12 +7,12 @@ from pychess.Utils.const import WHITE, BLACK, LOSERSCHESS, SUICIDECHESS, GIVEAWA
     BPAWN, BISHOP, KNIGHT, QUEEN, KING, PAWN, ROOK, \
     CAS_FLAGS, H7, B6, A7, H2, G3, A2, B3, G6, D1, G8, B8, G1, B1
 from .bitboard import iterBits, firstBit, lsb
-from .ldata import fileBits, bitPosArray, PIECE_VALUES, FILE, RANK, PAWN_VALUE,\
-    WHITE_SQUARES, BLACK_SQUARES, ASEAN_PIECE_VALUES, ATOMIC_PIECE_VALUES, CRAZY_PIECE_VALUES,\
+from .ldata import fileBits, bitPosArray, FILE, RANK, PAWN_VALUE,\
+    WHITE_SQUARES, BLACK_SQUARES, CRAZY_PIECE_VALUES,\
     kwingpawns1, kwingpawns2, qwingpawns1, qwingpawns2, frontWall, endingKing,\
     brank7, brank8, distance, isolaniMask, d2e2, passedScores, squarePawnMask,\
     moveArray, brank67, lbox, stonewall, isolani_normal, isolani_weaker,\
-    passedPawnMask, fromToRay, pawnScoreBoard, sdistance, taxicab, racingKing
+    passedPawnMask, fromToRay, pawnScoreBoard, racingKing, tropisms
 from .lsort import staticExchangeEvaluate
 from .lmovegen import newMove
 from pychess.Variants.threecheck import checkCount
@@ -74,41 +74,13 @@ def evalMaterial(board, color):
 
     pieceCount = board.pieceCount
     opcolor = 1 - color
-    material = [0, 0]
+    material = board.material[:]
     if board.variant == CRAZYHOUSECHESS:
         for piece in range(PAWN, KING):
-            material[WHITE] += CRAZY_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += CRAZY_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
             material[WHITE] += CRAZY_PIECE_VALUES[piece] * board.holding[
                 WHITE][piece]
             material[BLACK] += CRAZY_PIECE_VALUES[piece] * board.holding[
                 BLACK][piece]
-    elif board.variant == LOSERSCHESS:
-        for piece in range(PAWN, KING):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == SUICIDECHESS or board.variant == GIVEAWAYCHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == ATOMICCHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ATOMIC_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += ATOMIC_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
-    elif board.variant in ASEAN_VARIANTS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ASEAN_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += ASEAN_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
-    else:
-        for piece in range(PAWN, KING):
-            material[WHITE] += PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += PIECE_VALUES[piece] * pieceCount[BLACK][piece]
 
     phase = max(1, 8 - (material[WHITE] + material[BLACK]) // 1150)
 
@@ -144,37 +116,15 @@ def evalMaterial(board, color):
     ################################################################################
 
 
-pawnTropism = [[0] * 64 for i in range(64)]
-bishopTropism = [[0] * 64 for i in range(64)]
-knightTropism = [[0] * 64 for i in range(64)]
-rookTropism = [[0] * 64 for i in range(64)]
-queenTropism = [[0] * 64 for i in range(64)]
-
-for pcord in range(64):
-    for kcord in range(pcord + 1, 64):
-        pawnTropism[pcord][kcord] = pawnTropism[kcord][pcord] = \
-            (14 - taxicab[pcord][kcord])**2 * 10 / 169
-        knightTropism[pcord][kcord] = knightTropism[kcord][pcord] = \
-            (6 - distance[KNIGHT][pcord][kcord])**2 * 2
-        bishopTropism[pcord][kcord] = bishopTropism[kcord][pcord] = \
-            (14 - distance[BISHOP][pcord][kcord] * sdistance[pcord][kcord])**2 * 30 // 169
-        rookTropism[pcord][kcord] = rookTropism[kcord][pcord] = \
-            (14 - distance[ROOK][pcord][kcord] * sdistance[pcord][kcord])**2 * 40 // 169
-        queenTropism[pcord][kcord] = queenTropism[kcord][pcord] = \
-            (14 - distance[QUEEN][pcord][kcord] * sdistance[pcord][kcord])**2 * 50 // 169
-
-tropisms = {
-    PAWN: pawnTropism,
-    KNIGHT: knightTropism,
-    BISHOP: bishopTropism,
-    ROOK: rookTropism,
-    QUEEN: queenTropism
-}
-
-
 def evalKingTropism(board, color, phase):
     """ All other things being equal, having your Knights, Queens and Rooks
-        close to the opponent's king is a good thing """
+        close to the opponent's king is a good thing.
+        The board keeps the score up to date as the pieces move, so it is
+        only counted here after the opponent king has moved. """
+    score = board.tropism[color]
+    if score is not None:
+        return score
+
     _tropisms = tropisms
     _lsb = lsb
     opcolor = 1 - color
@@ -192,6 +142,7 @@ def evalKingTropism(board, color, phase):
             bit = bitboard & -bitboard
             score += tropism[_lsb[bit]][opking]
             bitboard -= bit
+    board.tropism[color] = score
     return score
 
 
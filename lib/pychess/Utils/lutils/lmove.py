@@ -160,7 +160,7 @@ def toSAN(board, move, localRepr=False):
         The board should be prior to the move """
 
     def check_or_mate():
-        board_clone = board.clone()
+        board_clone = board.clone(history=False)
         board_clone.applyMove(move)
         sign = ""
         if board_clone.isChecked():
@@ -221,7 +221,7 @@ def toSAN(board, move, localRepr=False):
         xs = []
         ys = []
 
-        board_clone = board.clone()
+        board_clone = board.clone(history=False)
         for altmove in genAllMoves(board_clone, drops=False):
             mfcord = FCORD(altmove)
             if board_clone.arBoard[mfcord] == fpiece and \
@@ -469,7 +469,7 @@ def parseSAN(board, san):
                         continue
                     if ffile is not None and ffile != FILE(f):
                         continue
-                    board_clone = board.clone()
+                    board_clone = board.clone(history=False)
                     board_clone.applyMove(move)
                     if board_clone.opIsChecked():
                         continue
@@ -1,7 +1,7 @@
 from .bitboard import bitPosArray, iterBits, clearBit, firstBit
-from .attack import isAttacked, pinnedOnKing, getAttacks
+from .attack import isAttacked, pinnedOnKing, getAttacks, getVariants
 from .ldata import fromToRay, moveArray, directions, fileBits, rankBits,\
-    ray45, attack45, ray135, attack135, ray90, attack90, ray00, attack00, FILE, rays
+    rookMasks, rookAttacks, bishopMasks, bishopAttacks, FILE, rays
 from pychess.Utils.const import EMPTY, PAWN,\
     QUEEN, KNIGHT, BISHOP, ROOK, KING, WHITE, BLACK,\
     SITTUYINCHESS, FISCHERRANDOMCHESS, SUICIDECHESS, GIVEAWAYCHESS, CAMBODIANCHESS,\
@@ -116,11 +116,7 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(bishops):
-                try:
-                    attackBoard = attack45[fcord][ray45[fcord] & blocker] | \
-                        attack135[fcord][ray135[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks[fcord][blocker & bishopMasks[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -129,11 +125,7 @@ def genPieceMoves(board, piece, tcord):
         blocker = board.blocker
         rooks = board.boards[board.color][ROOK]
         for fcord in iterBits(rooks):
-            try:
-                attackBoard = attack00[fcord][ray00[fcord] & blocker] | \
-                    attack90[fcord][ray90[fcord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[fcord][blocker & rookMasks[fcord]]
             if tcord in iterBits(attackBoard & notfriends):
                 moves.add(newMove(fcord, tcord))
         return moves
@@ -158,19 +150,11 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(queens):
-                try:
-                    attackBoard = attack45[fcord][ray45[fcord] & blocker] | \
-                        attack135[fcord][ray135[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks[fcord][blocker & bishopMasks[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
 
-                try:
-                    attackBoard = attack00[fcord][ray00[fcord] & blocker] | \
-                        attack90[fcord][ray90[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = rookAttacks[fcord][blocker & rookMasks[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -189,7 +173,7 @@ def genPieceMoves(board, piece, tcord):
 
 
 def gen_sittuyin_promotions(board):
-    from pychess.Variants import variants
+    variants = getVariants()
     blocker = board.blocker
     notblocker = ~blocker
 
@@ -198,7 +182,7 @@ def gen_sittuyin_promotions(board):
     queenMoves = moveArray[ASEAN_QUEEN]
 
     def willDirectAttack(board, move, cord):
-        board_clone = board.clone()
+        board_clone = board.clone(history=False)
         board_clone.applyMove(move)
         return board.friends[1 - board.color] & moveArray[ASEAN_QUEEN][cord]
 
@@ -218,7 +202,7 @@ def gen_sittuyin_promotions(board):
 
 
 def genAllMoves(board, drops=True):
-    from pychess.Variants import variants
+    variants = getVariants()
     if drops and board.variant in DROP_VARIANTS:
         for move in genDrops(board):
             yield move
@@ -269,11 +253,7 @@ def genAllMoves(board, drops=True):
     if board.variant in ASEAN_VARIANTS:
         # Rooks
         for cord in iterBits(rooks):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMasks[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
@@ -293,21 +273,13 @@ def genAllMoves(board, drops=True):
     else:
         # Rooks and Queens
         for cord in iterBits(rooks | queens):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMasks[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
     # Bishops and Queens
         for cord in iterBits(bishops | queens):
-            try:
-                attackBoard = attack45[cord][ray45[cord] & blocker] | \
-                    attack135[cord][ray135[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks[cord][blocker & bishopMasks[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
@@ -468,7 +440,7 @@ def genAllMoves(board, drops=True):
 
 
 def genCaptures(board):
-    from pychess.Variants import variants
+    variants = getVariants()
 
     blocker = board.blocker
     enpassant = board.enpassant
@@ -505,20 +477,12 @@ def genCaptures(board):
     # Rooks and Queens
     if board.variant in ASEAN_VARIANTS:
         for cord in iterBits(rooks):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMasks[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(rooks | queens):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMasks[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
@@ -535,11 +499,7 @@ def genCaptures(board):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(bishops | queens):
-            try:
-                attackBoard = attack45[cord][ray45[cord] & blocker] | \
-                    attack135[cord][ray135[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks[cord][blocker & bishopMasks[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
@@ -615,7 +575,7 @@ def genCaptures(board):
 
 
 def genCheckEvasions(board):
-    from pychess.Variants import variants
+    variants = getVariants()
     color = board.color
     opcolor = 1 - color
 
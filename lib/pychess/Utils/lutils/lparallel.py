@@ -0,0 +1,180 @@
+""" Root split parallel search.
+
+    The root moves of each iteration are shared out among a pool of worker
+    processes, each running a serial Search on its own clone of the board. All
+    of them probe and record into one SharedTranspositionTable. Workers pick up
+    the best score found so far by their siblings through a shared value, and
+    search their move with a null window against it. The results are merged
+    into one pv and score. """
+
+import multiprocessing
+from time import time
+
+from .ldata import MATE_VALUE
+from .lsearch import Search, TIMECHECK_FREQ
+from .TranspositionTable import SharedTranspositionTable
+
+# Below this depth the root moves are too cheap to be worth sending to workers
+PARALLEL_MIN_DEPTH = 3
+
+# Worker process state, set up by _initWorker
+_search = None
+_stopEvent = None
+_rootAlpha = None
+
+
+class _WorkerSearch(Search):
+    def checkTime(self):
+        if time() > self.endtime or _stopEvent.is_set():
+            self.searching = False
+
+
+def _initWorker(table, stopEvent, rootAlpha):
+    global _search, _stopEvent, _rootAlpha
+    _search = _WorkerSearch(table)
+    _stopEvent = stopEvent
+    _rootAlpha = rootAlpha
+
+
+def _searchRootMove(board, move, depth, alpha, beta, searchId, endtime,
+                    skipPruneChance, reductions, egtb):
+    """ Searches the root move on board in a worker process.
+        Returns a tuple of the move, its pv, its score, the number of nodes
+        searched and whether the search was interrupted. The score is None, if
+        the move was cut off by a sibling before it was searched, or if it
+        failed low against the score of a sibling, as it is only an upper
+        bound then. """
+
+    search = _search
+    # Entries are aged by the search id of the main process
+    search.table.search_id = searchId
+    if egtb and search.egtb is None:
+        search.enableEGTB()
+    search.skipPruneChance = skipPruneChance
+    search.nullMoveReduction, search.lateMoveReduction, search.futilityMargin = \
+        reductions
+    search.endtime = endtime
+    search.timecheck_counter = TIMECHECK_FREQ
+    search.searching = not _stopEvent.is_set()
+    search.nodes = 0
+
+    bound = max(alpha, _rootAlpha.value)
+    if bound >= beta:
+        return move, [], None, 0, False
+
+    board.applyMove(move)
+    if bound > alpha:
+        # A sibling already has a score, so we only need to prove we are worse
+        mvs, val = search.alphaBeta(board, depth - 1, -bound - 1, -bound, 1)
+        val = -val
+        if val <= bound:
+            board.popMove()
+            return move, [], None, search.nodes + 1, not search.searching
+        if val < beta:
+            mvs, val = search.alphaBeta(board, depth - 1, -beta, -bound, 1)
+            val = -val
+    else:
+        mvs, val = search.alphaBeta(board, depth - 1, -beta, -alpha, 1)
+        val = -val
+    board.popMove()
+
+    return move, mvs, val, search.nodes + 1, not search.searching
+
+
+class ParallelSearch(Search):
+    """ A Search splitting the root moves across cores worker processes """
+
+    def __init__(self, cores, table=None):
+        if table is None:
+            table = SharedTranspositionTable(32 * 1024 * 1024)
+        Search.__init__(self, table)
+        self.cores = cores
+        self.pool = None
+        self.poolTable = None
+        self.bestmove = None
+        self.stopEvent = multiprocessing.Event()
+        self.rootAlpha = multiprocessing.Value("i", 0)
+
+    def close(self):
+        """ Terminates the worker processes """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def stop(self):
+        Search.stop(self)
+        self.stopEvent.set()
+
+    def run(self, board, maxdepth, endtime=None, onIteration=None):
+        self.stopEvent.clear()
+        self.bestmove = None
+        return Search.run(self, board, maxdepth, endtime, onIteration)
+
+    def alphaBeta(self, board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
+        if ply > 0 or depth < PARALLEL_MIN_DEPTH or \
+                (self.egtb and self.egtb.scoreAllMoves(board)):
+            return Search.alphaBeta(self, board, depth, alpha, beta, ply)
+        return self.splitRoot(board, depth, alpha, beta)
+
+    def splitRoot(self, board, depth, alpha, beta):
+        isCheck = board.isChecked()
+        moves = []
+        for value, move in self.sortedMoves(board, depth, isCheck):
+            board.applyMove(move)
+            if isCheck or not board.opIsChecked():
+                moves.append(move)
+            board.popMove()
+
+        # Mates, stalemates and forced moves are left to the serial search
+        if len(moves) < 2:
+            return Search.alphaBeta(self, board, depth, alpha, beta)
+
+        if self.bestmove in moves:
+            moves.remove(self.bestmove)
+            moves.insert(0, self.bestmove)
+
+        beta = min(beta, MATE_VALUE - 1)
+        self.rootAlpha.value = alpha
+
+        def raiseAlpha(result):
+            move, mvs, val, nodes, interrupted = result
+            if val is not None and not interrupted:
+                with self.rootAlpha.get_lock():
+                    if val > self.rootAlpha.value:
+                        self.rootAlpha.value = val
+
+        if self.poolTable is not self.table:
+            # The workers are handed the table when they start
+            self.close()
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(
+                self.cores, _initWorker,
+                (self.table, self.stopEvent, self.rootAlpha))
+            self.poolTable = self.table
+        clone = board.clone()
+        pending = [self.pool.apply_async(
+            _searchRootMove,
+            (clone, move, depth, alpha, beta, self.table.search_id, self.endtime,
+             self.skipPruneChance,
+             (self.nullMoveReduction, self.lateMoveReduction, self.futilityMargin),
+             self.egtb is not None),
+            callback=raiseAlpha) for move in moves]
+
+        best = alpha
+        amove = []
+        for result in pending:
+            move, mvs, val, nodes, interrupted = result.get()
+            self.nodes += nodes
+            if interrupted:
+                self.searching = False
+            elif val is not None and val > best:
+                best = val
+                amove = [move] + mvs
+
+        if not amove:
+            return [moves[0]], alpha
+        self.bestmove = amove[0]
+        if best >= beta:
+            return amove, beta
+        return amove, best
@@ -1,3 +1,4 @@
+import sys
 from time import time
 from random import random
 from heapq import heappush, heappop
@@ -5,11 +6,12 @@ from heapq import heappush, heappop
 from .lmovegen import genAllMoves, genCheckEvasions, genCaptures
 from .egtb_gaviota import EgtbGaviota
 from pychess.Utils.const import ATOMICCHESS, KINGOFTHEHILLCHESS, THREECHECKCHESS,\
-    LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, EMPTY, PROMOTIONS, DROP, KING,\
-    RACINGKINGSCHESS, hashfALPHA, hashfBETA, hashfEXACT, hashfBAD, DRAW, WHITE, WHITEWON
+    LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, EMPTY, PROMOTIONS, DROP, KING, PAWN,\
+    ENPASSANT, NULL_MOVE, RACINGKINGSCHESS, SITTUYINCHESS, PLACEMENTCHESS, hashfALPHA,\
+    hashfBETA, hashfEXACT, hashfBAD, DRAW, WHITE, WHITEWON
 from .leval import evaluateComplete
-from .lsort import getCaptureValue, getMoveValue
-from .ldata import MATE_VALUE, VALUE_AT_PLY
+from .lsort import getCaptureValue, getMoveValue, MovePicker
+from .ldata import MATE_VALUE, MATE_DEPTH, MAXPLY, PAWN_VALUE, VALUE_AT_PLY
 from .TranspositionTable import TranspositionTable
 from pychess.Variants.atomic import kingExplode
 from pychess.Variants.kingofthehill import testKingInCenter
@@ -19,347 +21,550 @@ from . import ldraw
 
 TIMECHECK_FREQ = 500
 
-table = TranspositionTable(32 * 1024 * 1024)
-skipPruneChance = 0
-searching = False
-nodes = 0
-endtime = 0
-timecheck_counter = TIMECHECK_FREQ
-egtb = None
-
-
-def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
-    """ This is a alphabeta/negamax/quiescent/iterativedeepend search algorithm
-        Based on moves found by the validator.py findmoves2 function and
-        evaluated by eval.py.
-        The function recalls itself "depth" times. If the last move in range
-        depth was a capture, it will continue calling itself, only searching for
-        captures.
-        It returns a tuple of
-        *   a list of the path it found through the search tree (last item being
-            the deepest)
-        *   a score of your standing the the last possition. """
-
-    global searching, nodes, table, endtime, timecheck_counter
-    foundPv = False
-    hashf = hashfALPHA
-    amove = []
-
-    ############################################################################
-    # Mate distance pruning
-    ############################################################################
-
-    MATED = -MATE_VALUE + ply
-    MATE_IN_1 = MATE_VALUE - ply - 1
-
-    if beta <= MATED:
-        return [], MATED
-    if beta >= MATE_IN_1:
-        beta = MATE_IN_1
-        if alpha >= beta:
-            return [], MATE_IN_1
-
-    if board.variant == ATOMICCHESS:
-        if bin(board.boards[board.color][KING]).count("1") == 0:
-            return [], MATED
-    elif board.variant == LOSERSCHESS:
-        if pieceCount(board, board.color) == 1:
-            return [], -MATED
-    elif board.variant == SUICIDECHESS or board.variant == GIVEAWAYCHESS:
-        if pieceCount(board, board.color) == 0:
-            return [], -MATED
-    elif board.variant == KINGOFTHEHILLCHESS:
-        if testKingInCenter(board):
-            return [], MATED
-    elif board.variant == THREECHECKCHESS:
-        if checkCount(board, board.color) == 3:
-            return [], MATED
-
-    ############################################################################
-    # Look in the end game table
-    ############################################################################
-
-    global egtb
-    if egtb:
-        tbhits = egtb.scoreAllMoves(board)
-        if tbhits:
-            move, state, steps = tbhits[0]
-
-            if state == DRAW:
-                score = 0
-            elif board.color == WHITE:
-                if state == WHITEWON:
-                    score = MATE_VALUE - steps
-                else:
-                    score = -MATE_VALUE + steps
+# Half width of the aspiration window placed around the previous iteration's
+# score. The window is widened by this factor each time the search fails.
+ASPIRATION_WINDOW = PAWN_VALUE // 2
+ASPIRATION_WIDEN = 4
+
+# Variants whose move lists are filtered as a whole, so they can't be picked
+# in stages
+UNSTAGED_VARIANTS = (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, ATOMICCHESS,
+                     RACINGKINGSCHESS)
+
+# Variants the reductions below aren't safe in. Zugzwang is common in the
+# first four, and a quiet king move can win the last two at once.
+UNPRUNED_VARIANTS = (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, ATOMICCHESS,
+                     KINGOFTHEHILLCHESS, RACINGKINGSCHESS)
+
+# Depth the null move search is reduced by, on top of the move itself
+NULL_MOVE_REDUCTION = 2
+# Depth quiet moves late in the move list are reduced by, and the number of
+# moves searched to full depth before them
+LATE_MOVE_REDUCTION = 1
+LATE_MOVE_FULL_MOVES = 3
+# Quiet moves at depth 1 and 2 are skipped when the static score is this much
+# per ply below alpha
+FUTILITY_MARGIN = 2 * PAWN_VALUE
+
+NULLMOVE = NULL_MOVE << 12
+
+# Score of a tablebase win below the root, where only the result is probed.
+# It is below the mate scores, which the wins at the root are scored as.
+TB_WIN_VALUE = MATE_VALUE - MATE_DEPTH - MAXPLY
+
+
+class Search:
+    """ Iterative deepening alphabeta search. Every instance owns its own
+        transposition table, node counter and time control, so several
+        searches can coexist in one process. """
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else TranspositionTable(32 * 1024 * 1024)
+        self.skipPruneChance = 0
+        self.searching = False
+        self.nodes = 0
+        self.endtime = 0
+        self.timecheck_counter = TIMECHECK_FREQ
+        self.egtb = None
+        self.pickers = []
+        # Setting any of these to 0 turns the reduction off
+        self.nullMoveReduction = NULL_MOVE_REDUCTION
+        self.lateMoveReduction = LATE_MOVE_REDUCTION
+        self.futilityMargin = FUTILITY_MARGIN
+
+    def stop(self):
+        """ Interrupts the running search. It will return as soon as it notices. """
+        self.searching = False
+
+    def enableEGTB(self):
+        self.egtb = EndgameTable()
+
+    def run(self, board, maxdepth, endtime=None, onIteration=None):
+        """ Searches board with increasing depth until maxdepth is reached,
+            the time is past endtime or stop() is called.
+            Every iteration but the first is searched with an aspiration window
+            around the score of the previous one.
+            onIteration(depth, mvs, score) is called after every finished
+            iteration, and may return True to end the search.
+            Returns a tuple of the pv and score of the deepest finished
+            iteration. If even the first iteration was interrupted its partial
+            result is returned. """
+
+        self.searching = True
+        self.nodes = 0
+        self.endtime = sys.maxsize if endtime is None else endtime
+        self.table.newSearch()
+
+        mvs, score = [], 0
+        for depth in range(1, maxdepth + 1):
+            self.timecheck_counter = TIMECHECK_FREQ
+            if depth == 1:
+                result = self.alphaBeta(board, depth)
+            else:
+                result = self.aspirate(board, depth, score)
+            if not self.searching:
+                # We were interrupted
+                if depth == 1:
+                    mvs, score = result
+                break
+            mvs, score = result
+            if onIteration is not None and onIteration(depth, mvs, score):
+                break
+            if time() > self.endtime:
+                break
+        self.table.flush()
+        return mvs, score
+
+    def aspirate(self, board, depth, guess):
+        """ Searches board to depth with a narrow window around guess, widening
+            it on the failing side until the score falls inside. """
+
+        if abs(guess) >= MATE_VALUE - MAXPLY * 2:
+            # Mate scores are exact, and don't tell much about the next depth
+            return self.alphaBeta(board, depth)
+
+        delta = ASPIRATION_WINDOW
+        alpha = guess - delta
+        beta = guess + delta
+        while True:
+            mvs, score = self.alphaBeta(board, depth, alpha, beta)
+            if not self.searching:
+                return mvs, score
+            if score <= alpha and alpha > -MATE_VALUE:
+                delta *= ASPIRATION_WIDEN
+                alpha = max(guess - delta, -MATE_VALUE)
+            elif score >= beta and beta < MATE_VALUE:
+                delta *= ASPIRATION_WIDEN
+                beta = min(guess + delta, MATE_VALUE)
             else:
-                if state == WHITEWON:
-                    score = -MATE_VALUE + steps
+                return mvs, score
+
+    def sortedMoves(self, board, depth, isCheck):
+        """ Returns the pseudo legal moves of board the variant allows, as a
+            list of (-value, move) tuples sorted best first. """
+
+        if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
+            mlist = [m for m in genCaptures(board)]
+            if board.variant == LOSERSCHESS:
+                if isCheck:
+                    evasions = [m for m in genCheckEvasions(board)]
+                    eva_cap = [m for m in evasions if m in mlist]
+                    mlist = eva_cap if eva_cap else evasions
                 else:
-                    score = MATE_VALUE - steps
-            return [move], score
-
-    ###########################################################################
-    # We don't save repetition in the table, so we need to test draw before   #
-    # table.                                                                  #
-    ###########################################################################
-
-    # We don't adjudicate draws. Clients may have different rules for that.
-    if ply > 0:
-        if ldraw.test(board):
-            return [], 0
-
-    ############################################################################
-    # Look up transposition table                                              #
-    ############################################################################
-    if ply == 0:
-        table.newSearch()
-
-    table.setHashMove(depth, -1)
-    probe = table.probe(board, depth, alpha, beta)
-    if probe:
-        move, score, hashf = probe
-        score = VALUE_AT_PLY(score, ply)
-        table.setHashMove(depth, move)
-
-        if hashf == hashfEXACT:
-            return [move], score
-        elif hashf == hashfBETA:
-            beta = min(score, beta)
-        elif hashf == hashfALPHA:
-            alpha = score
-
-        if hashf != hashfBAD and alpha >= beta:
-            return [move], score
-
-    ############################################################################
-    # Cheking the time                                                         #
-    ############################################################################
-
-    timecheck_counter -= 1
-    if timecheck_counter == 0:
-        if time() > endtime:
-            searching = False
-        timecheck_counter = TIMECHECK_FREQ
-
-    ############################################################################
-    # Break itereation if interupted or if times up                            #
-    ############################################################################
-
-    if not searching:
-        return [], -evaluateComplete(board, 1 - board.color)
-
-    ############################################################################
-    # Go for quiescent search                                                  #
-    ############################################################################
-
-    isCheck = board.isChecked()
-
-    if depth <= 0:
-        if isCheck:
-            # Being in check is that serious, that we want to take a deeper look
-            depth += 1
-        elif board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, ATOMICCHESS, RACINGKINGSCHESS):
-            return [], evaluateComplete(board, board.color)
+                    valid_captures = []
+                    for move in mlist:
+                        board.applyMove(move)
+                        if not board.opIsChecked():
+                            valid_captures.append(move)
+                        board.popMove()
+                    mlist = valid_captures
+            if not mlist and not isCheck:
+                mlist = [m for m in genAllMoves(board)]
+            moves = [(-getMoveValue(board, self.table, depth, m), m) for m in mlist]
+        elif board.variant == ATOMICCHESS:
+            if isCheck:
+                mlist = [m
+                         for m in genCheckEvasions(board)
+                         if not kingExplode(board, m, board.color)]
+            else:
+                mlist = [m
+                         for m in genAllMoves(board)
+                         if not kingExplode(board, m, board.color)]
+            moves = [(-getMoveValue(board, self.table, depth, m), m) for m in mlist]
+        elif board.variant == RACINGKINGSCHESS:
+            mlist = [m for m in genAllMoves(board) if not board.willGiveCheck(m)]
+            moves = [(-getMoveValue(board, self.table, depth, m), m) for m in mlist]
         else:
-            mvs, val = quiescent(board, alpha, beta, ply)
-            return mvs, val
-
-    ############################################################################
-    # Find and sort moves                                                      #
-    ############################################################################
-
-    if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
-        mlist = [m for m in genCaptures(board)]
-        if board.variant == LOSERSCHESS:
             if isCheck:
-                evasions = [m for m in genCheckEvasions(board)]
-                eva_cap = [m for m in evasions if m in mlist]
-                mlist = eva_cap if eva_cap else evasions
+                moves = [(-getMoveValue(board, self.table, depth, m), m)
+                         for m in genCheckEvasions(board)]
             else:
-                valid_captures = []
-                for move in mlist:
-                    board.applyMove(move)
-                    if not board.opIsChecked():
-                        valid_captures.append(move)
+                moves = [(-getMoveValue(board, self.table, depth, m), m)
+                         for m in genAllMoves(board)]
+        moves.sort()
+        return moves
+
+    def pickedMoves(self, board, depth, ply, isCheck):
+        """ Returns an iterable of the pseudo legal moves of board the variant
+            allows, best first. Where possible, they are picked in stages by
+            the MovePicker of ply. """
+
+        if isCheck or board.variant in UNSTAGED_VARIANTS or \
+                board.variant in (SITTUYINCHESS, PLACEMENTCHESS) and \
+                board.plyCount < 16:
+            return [move for value, move in self.sortedMoves(board, depth, isCheck)]
+
+        pickers = self.pickers
+        while len(pickers) <= ply:
+            pickers.append(MovePicker())
+        return pickers[ply].reset(board, self.table, depth)
+
+    def isPrunable(self, board, ply, isCheck):
+        """ Returns whether the node of board may be reduced at all """
+        return ply > 0 and not isCheck and \
+            board.variant not in UNPRUNED_VARIANTS and \
+            not (board.variant in (SITTUYINCHESS, PLACEMENTCHESS) and
+                 board.plyCount < 16)
+
+    def checkTime(self):
+        """ Called every TIMECHECK_FREQ nodes. Ends the search when time is up. """
+        if time() > self.endtime:
+            self.searching = False
+
+    def alphaBeta(self, board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
+        """ This is a alphabeta/negamax/quiescent/iterativedeepend search algorithm
+            Based on moves found by the validator.py findmoves2 function and
+            evaluated by eval.py.
+            The function recalls itself "depth" times. If the last move in range
+            depth was a capture, it will continue calling itself, only searching for
+            captures.
+            It returns a tuple of
+            *   a list of the path it found through the search tree (last item being
+                the deepest)
+            *   a score of your standing the the last possition. """
+
+        foundPv = False
+        hashf = hashfALPHA
+        amove = []
+
+        ########################################################################
+        # Mate distance pruning
+        ########################################################################
+
+        MATED = -MATE_VALUE + ply
+        MATE_IN_1 = MATE_VALUE - ply - 1
+
+        if beta <= MATED:
+            return [], MATED
+        if beta >= MATE_IN_1:
+            beta = MATE_IN_1
+            if alpha >= beta:
+                return [], MATE_IN_1
+
+        if board.variant == ATOMICCHESS:
+            if bin(board.boards[board.color][KING]).count("1") == 0:
+                return [], MATED
+        elif board.variant == LOSERSCHESS:
+            if pieceCount(board, board.color) == 1:
+                return [], -MATED
+        elif board.variant == SUICIDECHESS or board.variant == GIVEAWAYCHESS:
+            if pieceCount(board, board.color) == 0:
+                return [], -MATED
+        elif board.variant == KINGOFTHEHILLCHESS:
+            if testKingInCenter(board):
+                return [], MATED
+        elif board.variant == THREECHECKCHESS:
+            if checkCount(board, board.color) == 3:
+                return [], MATED
+
+        ########################################################################
+        # Look in the end game self.table
+        ########################################################################
+
+        if self.egtb and ply > 0:
+            # Below the root we only need to know who wins
+            state, steps = self.egtb.scoreGame(board, True)
+            if state is not None:
+                if state == DRAW:
+                    return [], 0
+                score = TB_WIN_VALUE - ply
+                if (state == WHITEWON) == (board.color == WHITE):
+                    return [], score
+                return [], -score
+
+        elif self.egtb:
+            tbhits = self.egtb.scoreAllMoves(board)
+            if tbhits:
+                move, state, steps = tbhits[0]
+
+                if state == DRAW:
+                    score = 0
+                elif board.color == WHITE:
+                    if state == WHITEWON:
+                        score = MATE_VALUE - steps
+                    else:
+                        score = -MATE_VALUE + steps
+                else:
+                    if state == WHITEWON:
+                        score = -MATE_VALUE + steps
+                    else:
+                        score = MATE_VALUE - steps
+                return [move], score
+
+        ########################################################################
+        # We don't save repetition in the table, so we need to test draw     #
+        # before table.                                                        #
+        ########################################################################
+
+        # We don't adjudicate draws. Clients may have different rules for that.
+        if ply > 0:
+            if ldraw.test(board):
+                return [], 0
+
+        ########################################################################
+        # Look up transposition table                                          #
+        ########################################################################
+        self.table.setHashMove(depth, -1)
+        probe = self.table.probe(board, depth, alpha, beta)
+        if probe:
+            move, score, hashf = probe
+            score = VALUE_AT_PLY(score, ply)
+            self.table.setHashMove(depth, move)
+
+            if hashf == hashfEXACT:
+                return [move], score
+            elif hashf == hashfBETA:
+                beta = min(score, beta)
+            elif hashf == hashfALPHA:
+                alpha = score
+
+            if hashf != hashfBAD and alpha >= beta:
+                return [move], score
+
+        ########################################################################
+        # Cheking the time                                                     #
+        ########################################################################
+
+        self.timecheck_counter -= 1
+        if self.timecheck_counter == 0:
+            self.checkTime()
+            self.timecheck_counter = TIMECHECK_FREQ
+
+        ########################################################################
+        # Break itereation if interupted or if times up                        #
+        ########################################################################
+
+        if not self.searching:
+            return [], -evaluateComplete(board, 1 - board.color)
+
+        ########################################################################
+        # Go for quiescent search                                              #
+        ########################################################################
+
+        isCheck = board.isChecked()
+
+        if depth <= 0:
+            if isCheck:
+                # Being in check is that serious, that we want to take a deeper look
+                depth += 1
+            elif board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS, ATOMICCHESS, RACINGKINGSCHESS):
+                return [], evaluateComplete(board, board.color)
+            else:
+                mvs, val = self.quiescent(board, alpha, beta, ply)
+                return mvs, val
+
+        ########################################################################
+        # Null move pruning                                                    #
+        ########################################################################
+
+        prunable = self.isPrunable(board, ply, isCheck)
+        staticScore = None
+
+        if prunable and self.nullMoveReduction and depth >= 2 and \
+                beta < MATE_VALUE - MAXPLY * 2 and \
+                board.hist_move and board.hist_move[-1] >> 12 != NULL_MOVE:
+            color = board.color
+            pieces = board.boards[color]
+            # Without pieces, zugzwang is too likely for passing to be safe
+            if board.friends[color] & ~(pieces[PAWN] | pieces[KING]):
+                staticScore = evaluateComplete(board, color)
+                if staticScore >= beta:
+                    board.applyMove(NULLMOVE)
+                    mvs, val = self.alphaBeta(board, depth - 1 - self.nullMoveReduction,
+                                              -beta, -beta + 1, ply + 1)
                     board.popMove()
-                mlist = valid_captures
-        if not mlist and not isCheck:
-            mlist = [m for m in genAllMoves(board)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    elif board.variant == ATOMICCHESS:
-        if isCheck:
-            mlist = [m
-                     for m in genCheckEvasions(board)
-                     if not kingExplode(board, m, board.color)]
-        else:
-            mlist = [m
-                     for m in genAllMoves(board)
-                     if not kingExplode(board, m, board.color)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    elif board.variant == RACINGKINGSCHESS:
-        mlist = [m for m in genAllMoves(board) if not board.willGiveCheck(m)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    else:
-        if isCheck:
-            moves = [(-getMoveValue(board, table, depth, m), m)
-                     for m in genCheckEvasions(board)]
-        else:
-            moves = [(-getMoveValue(board, table, depth, m), m)
-                     for m in genAllMoves(board)]
-    moves.sort()
+                    if -val >= beta and self.searching:
+                        return [], beta
 
-    # This is needed on checkmate
-    catchFailLow = None
+        ########################################################################
+        # Futility pruning                                                     #
+        ########################################################################
 
-    ############################################################################
-    # Loop moves                                                               #
-    ############################################################################
+        futile = False
+        if prunable and self.futilityMargin and depth <= 2 and \
+                abs(alpha) < MATE_VALUE - MAXPLY * 2:
+            if staticScore is None:
+                staticScore = evaluateComplete(board, board.color)
+            futile = staticScore + self.futilityMargin * depth <= alpha
 
-    for moveValue, move in moves:
-        nodes += 1
+        lateReduction = self.lateMoveReduction if prunable and depth >= 3 else 0
 
-        board.applyMove(move)
-        if not isCheck:
-            if board.opIsChecked():
-                board.popMove()
-                continue
+        ########################################################################
+        # Find and sort moves                                                  #
+        ########################################################################
 
-        catchFailLow = move
+        moves = self.pickedMoves(board, depth, ply, isCheck)
+        searched = 0
 
-        if foundPv:
-            mvs, val = alphaBeta(board, depth - 1, -alpha - 1, -alpha, ply + 1)
-            val = -val
-            if val > alpha and val < beta:
-                mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
-                val = -val
-        else:
-            mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
-            val = -val
+        # This is needed on checkmate
+        catchFailLow = None
 
-        board.popMove()
+        ########################################################################
+        # Loop moves                                                           #
+        ########################################################################
 
-        if val > alpha:
-            if val >= beta:
-                if searching and move >> 12 != DROP:
-                    table.record(board, move, VALUE_AT_PLY(beta, -ply),
-                                 hashfBETA, depth)
-                    # We don't want to use our valuable killer move spaces for
-                    # captures and promotions, as these are searched early anyways.
-                    if board.arBoard[move & 63] == EMPTY and \
-                            not move >> 12 in PROMOTIONS:
-                        table.addKiller(depth, move)
-                        table.addButterfly(move, depth)
-                return [move] + mvs, beta
+        for move in moves:
+            self.nodes += 1
 
-            alpha = val
-            amove = [move] + mvs
-            hashf = hashfEXACT
-            foundPv = True
+            quiet = (futile or lateReduction) and \
+                board.arBoard[move & 63] == EMPTY and \
+                move >> 12 != ENPASSANT and move >> 12 not in PROMOTIONS
 
-    ############################################################################
-    # Return                                                                   #
-    ############################################################################
+            board.applyMove(move)
+            if not isCheck:
+                if board.opIsChecked():
+                    board.popMove()
+                    continue
 
-    if amove:
-        if searching:
-            table.record(board, amove[0], VALUE_AT_PLY(alpha, -ply), hashf,
-                         depth)
-            if board.arBoard[amove[0] & 63] == EMPTY:
-                table.addKiller(depth, amove[0])
-        return amove, alpha
+            catchFailLow = move
+            searched += 1
 
-    if catchFailLow:
-        if searching:
-            table.record(board, catchFailLow, VALUE_AT_PLY(alpha, -ply), hashf,
-                         depth)
-        return [catchFailLow], alpha
+            if quiet and board.isChecked():
+                # Checks are never reduced
+                quiet = False
 
-    # If no moves were found, this must be a mate or stalemate
-    if isCheck:
-        return [], MATED
+            if quiet and futile and searched > 1:
+                board.popMove()
+                continue
 
-    return [], 0
+            if quiet and lateReduction and searched > LATE_MOVE_FULL_MOVES:
+                # Late quiet moves are unlikely to be any good. Only if the
+                # reduced search says otherwise, they are searched in full.
+                mvs, val = self.alphaBeta(board, depth - 1 - lateReduction,
+                                          -alpha - 1, -alpha, ply + 1)
+                if -val <= alpha:
+                    board.popMove()
+                    continue
 
+            if foundPv:
+                mvs, val = self.alphaBeta(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                val = -val
+                if val > alpha and val < beta:
+                    mvs, val = self.alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
+                    val = -val
+            else:
+                mvs, val = self.alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
+                val = -val
 
-def quiescent(board, alpha, beta, ply):
+            board.popMove()
+
+            if val > alpha:
+                if val >= beta:
+                    if self.searching and move >> 12 != DROP:
+                        self.table.record(board, move, VALUE_AT_PLY(beta, -ply),
+                                          hashfBETA, depth)
+                        # We don't want to use our valuable killer move spaces for
+                        # captures and promotions, as these are searched early anyways.
+                        if board.arBoard[move & 63] == EMPTY and \
+                                not move >> 12 in PROMOTIONS:
+                            self.table.addKiller(depth, move)
+                            self.table.addButterfly(move, depth)
+                    return [move] + mvs, beta
+
+                alpha = val
+                amove = [move] + mvs
+                hashf = hashfEXACT
+                foundPv = True
+
+        ########################################################################
+        # Return                                                               #
+        ########################################################################
+
+        if amove:
+            if self.searching:
+                self.table.record(board, amove[0], VALUE_AT_PLY(alpha, -ply),
+                                  hashf, depth)
+                if board.arBoard[amove[0] & 63] == EMPTY:
+                    self.table.addKiller(depth, amove[0])
+            return amove, alpha
+
+        if catchFailLow:
+            if self.searching:
+                self.table.record(board, catchFailLow,
+                                  VALUE_AT_PLY(alpha, -ply), hashf, depth)
+            return [catchFailLow], alpha
+
+        # If no moves were found, this must be a mate or stalemate
+        if isCheck:
+            return [], MATED
 
-    if skipPruneChance and random() < skipPruneChance:
-        return [], (alpha + beta) // 2
+        return [], 0
 
-    global searching, nodes, endtime, timecheck_counter
+    def quiescent(self, board, alpha, beta, ply):
 
-    if ldraw.test(board):
-        return [], 0
+        if self.skipPruneChance and random() < self.skipPruneChance:
+            return [], (alpha + beta) // 2
+
+        if ldraw.test(board):
+            return [], 0
 
-    timecheck_counter -= 1
-    if timecheck_counter == 0:
-        if time() > endtime:
-            searching = False
-        timecheck_counter = TIMECHECK_FREQ
+        self.timecheck_counter -= 1
+        if self.timecheck_counter == 0:
+            self.checkTime()
+            self.timecheck_counter = TIMECHECK_FREQ
 
-    ############################################################################
-    # Break itereation if interupted or if times up                            #
-    ############################################################################
+        ########################################################################
+        # Break itereation if interupted or if times up                        #
+        ########################################################################
 
-    if not searching:
-        return [], -evaluateComplete(board, 1 - board.color)
+        if not self.searching:
+            return [], -evaluateComplete(board, 1 - board.color)
 
-    isCheck = board.isChecked()
+        isCheck = board.isChecked()
 
-    # no stand-pat when in check
-    if not isCheck:
-        value = evaluateComplete(board, board.color)
-        if value >= beta:
-            return [], beta
-        if value > alpha:
-            alpha = value
+        # no stand-pat when in check
+        if not isCheck:
+            value = evaluateComplete(board, board.color)
+            if value >= beta:
+                return [], beta
+            if value > alpha:
+                alpha = value
 
-    amove = []
+        amove = []
 
-    heap = []
+        heap = []
 
-    if isCheck:
-        someMove = False
-        for move in genCheckEvasions(board):
-            someMove = True
-            # Heap.append is fine, as we don't really do sorting on the few moves
-            heap.append((0, move))
-        if not someMove:
-            return [], -MATE_VALUE + ply
-    else:
-        for move in genCaptures(board):
-            heappush(heap, (-getCaptureValue(board, move), move))
+        if isCheck:
+            someMove = False
+            for move in genCheckEvasions(board):
+                someMove = True
+                # Heap.append is fine, as we don't really do sorting on the few moves
+                heap.append((0, move))
+            if not someMove:
+                return [], -MATE_VALUE + ply
+        else:
+            for move in genCaptures(board):
+                heappush(heap, (-getCaptureValue(board, move), move))
 
-    while heap:
+        while heap:
 
-        nodes += 1
+            self.nodes += 1
 
-        v, move = heappop(heap)
+            v, move = heappop(heap)
 
-        board.applyMove(move)
-        if not isCheck:
-            if board.opIsChecked():
-                board.popMove()
-                continue
+            board.applyMove(move)
+            if not isCheck:
+                if board.opIsChecked():
+                    board.popMove()
+                    continue
 
-        mvs, val = quiescent(board, -beta, -alpha, ply + 1)
-        val = -val
+            mvs, val = self.quiescent(board, -beta, -alpha, ply + 1)
+            val = -val
 
-        board.popMove()
+            board.popMove()
 
-        if val >= beta:
-            return [move] + mvs, beta
+            if val >= beta:
+                return [move] + mvs, beta
 
-        if val > alpha:
-            alpha = val
-            amove = [move] + mvs
+            if val > alpha:
+                alpha = val
+                amove = [move] + mvs
 
-    if amove:
-        return amove, alpha
+        if amove:
+            return amove, alpha
 
-    else:
-        return [], alpha
+        else:
+            return [], alpha
 
 
 class EndgameTable():
@@ -383,7 +588,13 @@ class EndgameTable():
             return self.provider.scoreAllMoves(lBoard)
         return []
 
+    def scoreGame(self, lBoard, omitDepth=False, probeSoft=False):
+        """ Return the result and depth to mate of the position, or None, None
+            if it isn't in the tables. The depth is None if omitDepth is set,
+            which may save time, or the game is drawn.
+        """
 
-def enableEGTB():
-    global egtb
-    egtb = EndgameTable()
+        pc = self._pieceCounts(lBoard)
+        if self.provider.supports(pc):
+            return self.provider.scoreGame(lBoard, omitDepth, probeSoft)
+        return None, None
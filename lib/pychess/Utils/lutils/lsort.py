@@ -1,8 +1,12 @@
 import sys
 
 from .attack import staticExchangeEvaluate
-from .ldata import PIECE_VALUES, ASEAN_PIECE_VALUES, PAWN_VALUE, MATE_VALUE
-from pychess.Utils.const import DROP, EMPTY, ASEAN_VARIANTS, PROMOTIONS, ATOMICCHESS
+from .bitboard import bitPosArray
+from .ldata import PIECE_VALUES, ASEAN_PIECE_VALUES, PAWN_VALUE, MATE_VALUE, \
+    moveArray, rookMasks, rookAttacks, bishopMasks, bishopAttacks
+from .lmovegen import genAllMoves, genCaptures
+from pychess.Utils.const import DROP, EMPTY, ASEAN_VARIANTS, PROMOTIONS, ATOMICCHESS, \
+    PLACEMENTCHESS, NORMAL_MOVE, KNIGHT, BISHOP, ROOK, QUEEN, KING
 from pychess.Utils.eval import pos as position_values
 from pychess.Variants.atomic import kingExplode
 
@@ -100,3 +104,211 @@ def sortMoves(board, table, ply, hashmove, moves):
         return getMoveValue(board, table, ply, hashmove, move)
     moves.sort(key=sort_moves_func, reverse=True)
     return moves
+
+
+def getQuietValue(board, table, move):
+    """ Sort criteria for moves not capturing anything, as in getMoveValue.
+        Promotions and drops first, then history and moves to the centre. """
+
+    flag = move >> 12
+
+    if flag in PROMOTIONS:
+        if board.variant in ASEAN_VARIANTS:
+            return ASEAN_PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
+        else:
+            return PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
+
+    if flag == DROP:
+        return 1000
+
+    if board.variant in ASEAN_VARIANTS:
+        score = 0
+    else:
+        fcord = (move >> 6) & 63
+        fpiece = board.arBoard[fcord]
+        score = position_values[fpiece][board.color][move & 63] - \
+            position_values[fpiece][board.color][fcord]
+
+    return score + table.getButterfly(move)
+
+
+################################################################################
+#   Staged move picking                                                        #
+################################################################################
+
+STAGE_HASH, STAGE_CAPTURES, STAGE_KILLERS, STAGE_QUIETS, STAGE_BAD_CAPTURES, \
+    STAGE_DONE = range(6)
+
+
+class MovePicker:
+    """ Hands out the pseudo legal moves of a board one at a time, best first:
+        the hash move, captures winning material by SEE, killers, other moves
+        by history and last the captures losing material. Each stage is only
+        generated when the previous ones failed to cut off.
+        The searches keep one picker for each ply, and reuse its buffers. """
+
+    def __init__(self):
+        self.captures = []
+        self.captureValues = []
+        self.badCaptures = []
+        # Every capture generated, as the ones picked are gone from the lists
+        self.allCaptures = set()
+        self.quiets = []
+        self.quietValues = []
+        self.killers = []
+
+    def reset(self, board, table, depth):
+        """ Starts picking the moves of board. Killers and the hash move are
+            taken from table at depth. """
+
+        self.board = board
+        self.table = table
+        self.depth = depth
+        self.hashmove = table.getHashMove(depth)
+        self.hashFound = False
+        self.capturesGenerated = False
+        self.quietsGenerated = False
+        self.stage = STAGE_HASH
+        del self.captures[:]
+        del self.captureValues[:]
+        del self.badCaptures[:]
+        self.allCaptures.clear()
+        del self.quiets[:]
+        del self.quietValues[:]
+        del self.killers[:]
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            stage = self.stage
+
+            if stage == STAGE_CAPTURES:
+                if not self.capturesGenerated:
+                    self._generateCaptures()
+                values = self.captureValues
+                if values:
+                    best = values.index(max(values))
+                    return self._take(self.captures, values, best)
+                self.stage = STAGE_KILLERS
+                self._generateQuiets()
+
+            elif stage == STAGE_KILLERS:
+                if self.killers:
+                    return self.killers.pop()
+                self.stage = STAGE_QUIETS
+                self._scoreQuiets()
+
+            elif stage == STAGE_QUIETS:
+                values = self.quietValues
+                if values:
+                    best = values.index(max(values))
+                    return self._take(self.quiets, values, best)
+                self.stage = STAGE_BAD_CAPTURES
+
+            elif stage == STAGE_BAD_CAPTURES:
+                if self.badCaptures:
+                    return self.badCaptures.pop()
+                self.stage = STAGE_DONE
+
+            elif stage == STAGE_HASH:
+                self.stage = STAGE_CAPTURES
+                hashmove = self.hashmove
+                if hashmove > 0:
+                    if self._isPieceMove(hashmove):
+                        return hashmove
+                    # Find out the hard way, whether it is a move of ours
+                    self._generateCaptures()
+                    self._generateQuiets()
+                    if self.hashFound:
+                        return hashmove
+
+            else:
+                raise StopIteration
+
+    def _take(self, moves, values, i):
+        """ Removes and returns the move at i, moving the last one there """
+        move = moves[i]
+        moves[i] = moves[-1]
+        moves.pop()
+        values[i] = values[-1]
+        values.pop()
+        return move
+
+    def _generateCaptures(self):
+        self.capturesGenerated = True
+        board = self.board
+        hashmove = self.hashmove
+        captures = self.captures
+        values = self.captureValues
+        allCaptures = self.allCaptures
+        for move in genCaptures(board):
+            allCaptures.add(move)
+            if move == hashmove:
+                self.hashFound = True
+                continue
+            value = getCaptureValue(board, move)
+            if value < 0:
+                self.badCaptures.append(move)
+            else:
+                captures.append(move)
+                values.append(value)
+
+    def _generateQuiets(self):
+        if self.quietsGenerated:
+            return
+        self.quietsGenerated = True
+        allCaptures = self.allCaptures
+        hashmove = self.hashmove
+        quiets = self.quiets
+        for move in genAllMoves(self.board):
+            if move == hashmove:
+                self.hashFound = True
+            elif move not in allCaptures:
+                quiets.append(move)
+
+        killers = self.killers
+        for move in self.table.getKillers(self.depth):
+            if move in quiets and move not in killers:
+                killers.append(move)
+                quiets.remove(move)
+        # They are popped from the end
+        killers.reverse()
+
+    def _scoreQuiets(self):
+        board = self.board
+        table = self.table
+        self.quietValues.extend(getQuietValue(board, table, move)
+                                for move in self.quiets)
+
+    def _isPieceMove(self, move):
+        """ Tells cheaply if move is an ordinary move of a knight, bishop,
+            rook, queen or king of the side to move. Other moves have to be
+            looked up among the generated ones. """
+
+        board = self.board
+        if move >> 12 != NORMAL_MOVE or board.variant in ASEAN_VARIANTS or \
+                board.variant == PLACEMENTCHESS and board.plyCount < 16:
+            return False
+        fcord = (move >> 6) & 63
+        tcord = move & 63
+        friends = board.friends[board.color]
+        if not friends & bitPosArray[fcord] or friends & bitPosArray[tcord]:
+            return False
+
+        piece = board.arBoard[fcord]
+        blocker = board.blocker
+        if piece == KNIGHT or piece == KING:
+            attacks = moveArray[piece][fcord]
+        elif piece == BISHOP:
+            attacks = bishopAttacks[fcord][blocker & bishopMasks[fcord]]
+        elif piece == ROOK:
+            attacks = rookAttacks[fcord][blocker & rookMasks[fcord]]
+        elif piece == QUEEN:
+            attacks = bishopAttacks[fcord][blocker & bishopMasks[fcord]] | \
+                rookAttacks[fcord][blocker & rookMasks[fcord]]
+        else:
+            return False
+        return bool(attacks & bitPosArray[tcord])
@@ -0,0 +1,125 @@
+""" Time management of the engine.
+
+    A TimeManager splits the clock into a soft and a hard limit for one
+    search. The hard limit is the end time of Search.run, at which the
+    search stops wherever it is. The soft limit is the time the move should
+    take. After every finished iteration the manager decides whether to start
+    the next one: it scales the soft limit up while the best move changes or
+    the score drops, down once the best move has been stable for a few
+    iterations, and it doesn't start an iteration predicted to end past the
+    hard limit, as an interrupted iteration is wasted. """
+
+from time import time
+
+from .ldata import MATE_VALUE, MAXPLY, PAWN_VALUE
+
+# Seconds kept on the clock for sending the move and for lag
+MOVE_OVERHEAD = 0.05
+# The least time a search is given, in seconds
+MIN_TIME = 0.01
+# The least number of moves a sudden death clock is made to last
+MIN_MOVES_LEFT = 10
+
+# The hard limit is at most this many soft limits, and this share of the clock
+HARD_FACTOR = 4
+MAX_CLOCK_SHARE = 0.5
+
+# An iteration is started if it is predicted to end within this many soft
+# limits
+ITERATION_OVERRUN = 1.5
+# Ratio of the times of two successive iterations, and its bounds when
+# measured
+BRANCHING_FACTOR = 4
+MIN_BRANCHING, MAX_BRANCHING = 2, 8
+
+# The soft limit is scaled by this when the best move is the same for
+# STABLE_ITERATIONS iterations in a row
+STABLE_ITERATIONS = 4
+STABLE_SCALE = 0.6
+# Each change of the best move adds this to the scale of the soft limit. The
+# changes count half as much with each iteration.
+INSTABILITY_SCALE = 0.5
+# The soft limit is scaled by this after an iteration whose score dropped by
+# more than FAIL_LOW_MARGIN
+FAIL_LOW_MARGIN = PAWN_VALUE // 2
+FAIL_LOW_SCALE = 1.5
+
+
+class TimeManager:
+    """ The time limits of one search, for the side to move with clock
+        seconds left, getting increment seconds per move. movesLeft is the
+        number of moves the clock must last, the moves to go of a classical
+        time control or an estimate of the moves left in the game. A
+        searchtime more than 0 is a fixed time for the move. """
+
+    def __init__(self, clock, increment=0, movesLeft=40, searchtime=0):
+        if searchtime > 0:
+            self.soft = self.hard = max(searchtime - MOVE_OVERHEAD, MIN_TIME)
+        else:
+            clock = max(clock - MOVE_OVERHEAD, 0)
+            soft = clock / max(movesLeft, 1) + increment
+            self.hard = max(min(soft * HARD_FACTOR, clock * MAX_CLOCK_SHARE),
+                            MIN_TIME)
+            self.soft = min(soft, self.hard)
+        self.start()
+
+    def start(self):
+        """ Starts the clock of the search, and returns its hard end time """
+        self.starttime = time()
+        self.lastTime = 0
+        self.iterationTime = 0
+        self.branching = BRANCHING_FACTOR
+        self.bestmove = None
+        self.stableIterations = 0
+        self.instability = 0
+        self.score = None
+        self.scale = 1
+        return self.endtime
+
+    @property
+    def endtime(self):
+        return self.starttime + self.hard
+
+    def elapsed(self):
+        return time() - self.starttime
+
+    def onIteration(self, depth, mvs, score):
+        """ Records the iteration to depth, which found the pv mvs with score,
+            and returns whether the search should stop """
+
+        elapsed = self.elapsed()
+        iterationTime = elapsed - self.lastTime
+        if self.iterationTime > 0 and iterationTime > 0:
+            self.branching = min(max(iterationTime / self.iterationTime,
+                                     MIN_BRANCHING), MAX_BRANCHING)
+        self.lastTime = elapsed
+        self.iterationTime = iterationTime
+
+        bestmove = mvs[0] if mvs else None
+        self.instability /= 2
+        if bestmove == self.bestmove:
+            self.stableIterations += 1
+        else:
+            self.stableIterations = 0
+            if self.bestmove is not None:
+                self.instability += 1
+        self.bestmove = bestmove
+
+        # A best move whose score drops isn't stable
+        failLow = self.score is not None and \
+            abs(self.score) < MATE_VALUE - MAXPLY * 2 and \
+            score < self.score - FAIL_LOW_MARGIN
+        if failLow:
+            self.stableIterations = 0
+        self.score = score
+
+        if self.stableIterations >= STABLE_ITERATIONS:
+            self.scale = STABLE_SCALE
+        else:
+            self.scale = 1 + self.instability * INSTABILITY_SCALE
+        if failLow:
+            self.scale *= FAIL_LOW_SCALE
+
+        finish = elapsed + iterationTime * self.branching
+        return finish > self.hard or \
+            finish > self.soft * self.scale * ITERATION_OVERRUN
@@ -1,9 +1,36 @@
+""" Perft, the count of the leaf nodes of the tree of legal moves to a depth,
+    for verifying and timing the move generator.
 
+    do_perft walks the tree applying every move. countLeaves returns the same
+    count faster: at depth 1 it counts the legal moves rather than making
+    them, and it can look up and record the counts of subtrees by the hash of
+    their position. divide shares the root moves out among worker processes,
+    and returns the count of each. """
+
+import multiprocessing
 from time import time
 
+from pychess.Utils.const import ATOMICCHESS, SUICIDECHESS, GIVEAWAYCHESS, \
+    THREECHECKCHESS, CAMBODIANCHESS, DROP_VARIANTS, QUEEN, KING, DROP, ENPASSANT
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.attack import pinnedOnKing
+from pychess.Utils.lutils.ldata import directions
 from pychess.Utils.lutils.lmovegen import genAllMoves
 from pychess.Utils.lutils.lmove import toLAN
 
+# Variants without check, where all the moves generated are legal
+NO_CHECK_VARIANTS = (SUICIDECHESS, GIVEAWAYCHESS)
+
+# Variants where captures explode the pieces around them and touching kings
+# can't check each other, so that countMoves has to make every move
+EXPLOSION_VARIANTS = (ATOMICCHESS, )
+
+# Cache entries kept at most, by process
+CACHE_SIZE = 1 << 20
+
+# Below this depth the root moves are too cheap to be worth sending to workers
+PARALLEL_MIN_DEPTH = 3
+
 
 def do_perft(board, depth, root):
     nodes = 0
@@ -25,10 +52,154 @@ def do_perft(board, depth, root):
     return nodes
 
 
-def perft(board, depth, root):
+def legalMoves(board):
+    """ Returns the list of legal moves of board """
+    moves = []
+    for move in genAllMoves(board):
+        board.applyMove(move)
+        if not board.opIsChecked():
+            moves.append(move)
+        board.popMove()
+    return moves
+
+
+def countMoves(board):
+    """ Returns the number of legal moves of board. Only the moves of the
+        king, en passant captures and the moves of pinned pieces away from
+        their pin ray may leave the king in check. The pinned pieces are
+        found without making moves, so only the other moves are made. """
+
+    color = board.color
+    kings = board.boards[color][KING]
+    if board.variant in NO_CHECK_VARIANTS or not kings:
+        return sum(1 for move in genAllMoves(board))
+    # Setup positions may have more than one king
+    if kings & (kings - 1) or board.isChecked() or \
+            board.variant in EXPLOSION_VARIANTS:
+        return len(legalMoves(board))
+
+    kingCord = board.kings[color]
+    lines = directions[kingCord]
+    pinned = {}
+    count = 0
+    for move in genAllMoves(board):
+        flag = move >> 12
+        # The from cord of a drop is the piece dropped
+        fcord = (move >> 6) & 63
+        if flag == DROP:
+            if fcord != KING:
+                count += 1
+                continue
+        elif fcord != kingCord and flag != ENPASSANT:
+            line = lines[fcord]
+            if line == -1 or lines[move & 63] == line:
+                count += 1
+                continue
+            if fcord not in pinned:
+                pinned[fcord] = pinnedOnKing(board, fcord, color)
+            if not pinned[fcord]:
+                count += 1
+            continue
+        board.applyMove(move)
+        if not board.opIsChecked():
+            count += 1
+        board.popMove()
+    return count
+
+
+def _unhashedState(board):
+    """ Returns the state of board the moves depend on, which the hash
+        doesn't cover """
+    if board.variant in DROP_VARIANTS:
+        return tuple(board.promoted)
+    elif board.variant == THREECHECKCHESS:
+        return tuple(board.remaining_checks)
+    elif board.variant == CAMBODIANCHESS:
+        return tuple(board.is_first_move[KING] + board.is_first_move[QUEEN])
+    return None
+
+
+def countLeaves(board, depth, cache=None):
+    """ Returns the number of leaf nodes of the legal move tree of board to
+        depth. The counts of subtrees are looked up and recorded in the
+        cache dict, if given. """
+
+    if depth <= 1:
+        return countMoves(board) if depth == 1 else 1
+
+    if cache is not None:
+        key = (board.hash, depth, _unhashedState(board))
+        nodes = cache.get(key)
+        if nodes is not None:
+            return nodes
+
+    nodes = 0
+    for move in genAllMoves(board):
+        board.applyMove(move)
+        if not board.opIsChecked():
+            nodes += countLeaves(board, depth - 1, cache)
+        board.popMove()
+
+    if cache is not None and len(cache) < CACHE_SIZE:
+        cache[key] = nodes
+    return nodes
+
+
+# Worker process state, set up by _initWorker
+_cache = None
+
+
+def _initWorker(useCache):
+    global _cache
+    _cache = {} if useCache else None
+
+
+def _countMove(snapshot, move, depth):
+    """ Returns the leaf count of the subtree of move in a worker process,
+        with the position given as an LBoard snapshot """
+    board = LBoard()
+    board.applySnapshot(snapshot)
+    board.applyMove(move)
+    return countLeaves(board, depth - 1, _cache)
+
+
+def divide(board, depth, workers=1, cache=None):
+    """ Returns a list of each legal move of board and the leaf count of its
+        subtree to depth, in the order of the move generator. With more than
+        one worker, the moves are counted in a pool of worker processes, each
+        keeping a cache of its own if cache isn't None. Otherwise the cache
+        dict is used, if given. """
+
+    moves = legalMoves(board)
+    if workers > 1 and depth >= PARALLEL_MIN_DEPTH and len(moves) > 1:
+        snapshot = board.asSnapshot()
+        with multiprocessing.Pool(min(workers, len(moves)), _initWorker,
+                                  (cache is not None, )) as pool:
+            counts = pool.starmap(_countMove, [(snapshot, move, depth)
+                                               for move in moves], chunksize=1)
+    else:
+        counts = []
+        for move in moves:
+            board.applyMove(move)
+            counts.append(countLeaves(board, depth - 1, cache))
+            board.popMove()
+    return list(zip(moves, counts))
+
+
+def perft(board, depth, root, workers=1):
+    """ Prints the leaf node counts of depth 1 to depth, and returns the last.
+        If root is more than 0, the count of each root move is printed too. """
+    nodes = 0
+    cache = {}
     for i in range(depth):
         start_time = time()
-        nodes = do_perft(board, i + 1, root)
+        counts = divide(board, i + 1, workers, cache)
+        nodes = 0
+        for move, count in counts:
+            nodes += count
+            if root > 0:
+                print("%8s %10d %10d" % (toLAN(board, move), count, nodes))
         ttime = time() - start_time
         print("%2d %10d %5.2f %12.2fnps" %
               (i + 1, nodes, ttime, nodes / ttime if ttime > 0 else nodes))
+    return nodes
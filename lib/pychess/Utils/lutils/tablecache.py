@@ -0,0 +1,96 @@
+""" Cache of lookup tables computed at import time.
+
+    The tables are pickled to the user cache directory, behind a header with
+    a key of the cache version, the python version, the bytecode of the
+    function generating them and the source of the modules it depends on,
+    and a checksum of the pickle. A cache file with a stale key or a bad
+    checksum is generated and written again.
+    The cache directory is found here rather than by pychess.System.prefix,
+    as importing the System package would load most of the standard library
+    with the move generator. """
+
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+# Bump to invalidate every cache file
+CACHE_VERSION = 1
+
+MAGIC = b"PCLT"
+HEADER_SIZE = len(MAGIC) + 16 + 4
+
+
+def getCachePrefix():
+    """ Returns the user cache directory of pychess, as
+        pychess.System.prefix.getUserCachePrefix does """
+    cache_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(
+        os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_dir, "pychess")
+
+
+def tableKey(generate, sources=()):
+    """ Returns the digest identifying the tables made by generate, whose
+        results depend on the source files in sources too """
+    key = hashlib.md5()
+    key.update(("%s %s" % (CACHE_VERSION, sys.version_info[:2])).encode())
+    key.update(marshal.dumps(generate.__code__))
+    for source in sources:
+        try:
+            with open(source, "rb") as f:
+                key.update(hashlib.md5(f.read()).digest())
+        except OSError:
+            # Frozen builds may ship without sources, which don't change
+            key.update(source.encode())
+    return key.digest()
+
+
+def readTables(path, key):
+    """ Returns the tables in the cache file at path, None if it is missing,
+        stale or corrupted """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):len(MAGIC) + 16] != key:
+        return None
+    checksum = int.from_bytes(data[len(MAGIC) + 16:HEADER_SIZE], "big")
+    payload = data[HEADER_SIZE:]
+    if zlib.crc32(payload) != checksum:
+        return None
+    try:
+        return pickle.loads(payload)
+    except Exception:
+        return None
+
+
+def writeTables(path, key, tables):
+    """ Writes the tables to the cache file at path. Parallel writers each
+        replace the file with a complete copy. """
+    payload = pickle.dumps(tables, pickle.HIGHEST_PROTOCOL)
+    header = MAGIC + key + zlib.crc32(payload).to_bytes(4, "big")
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(header + payload)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def loadTables(name, generate, sources=()):
+    """ Returns the dict of tables generate() returns, read from the cache
+        file of name when it is valid for generate and sources """
+    path = os.path.join(getCachePrefix(), "%s.tables" % name)
+    key = tableKey(generate, sources)
+    tables = readTables(path, key)
+    if tables is None:
+        tables = generate()
+        writeTables(path, key, tables)
+    return tables
@@ -41,7 +41,7 @@ from .managers.ICCAutoLogOutManager import ICCAutoLogOutManager
 from .FICSObjects import FICSPlayers, FICSGames, FICSSeeks, FICSChallenges
 from .TimeSeal import CanceledException, ICSTelnet
 from .VerboseTelnet import LinePrediction, FromPlusPrediction, FromABPlusPrediction, \
-    FromToPrediction, PredictionsTelnet, NLinesPrediction
+    FromToPrediction, PredictionsTelnet, NLinesPrediction, Predictions
 
 
 class LogOnException(Exception):
@@ -71,7 +71,7 @@ class Connection(GObject.GObject):
         self.connecting = False
         self.keep_alive_task = None
 
-        self.predictions = set()
+        self.predictions = Predictions()
         self.predictionsDict = {}
         self.reply_cmd_dict = defaultdict(list)
 
@@ -867,6 +867,15 @@ class FICSGame(FICSMatch):
         # move(style12) message queue feeded by BoardManager, consumed by balck and white ICPlayer
         self.move_queue = asyncio.Queue()
 
+        # The style12 lines parsed and the seconds spent on them, and the
+        # board updates made by the move, those loading the FEN instead, and
+        # the seconds spent on both
+        self.style12_parses = 0
+        self.style12_parse_time = 0
+        self.move_updates = 0
+        self.fen_updates = 0
+        self.update_time = 0
+
     def __hash__(self):
         return hash(":".join((self.wplayer.name[0:11].lower(
         ), self.bplayer.name[0:11].lower(), str(self.gameno))))
@@ -1,5 +1,6 @@
 import asyncio
 from io import StringIO
+from time import perf_counter
 
 from pychess.compat import create_task
 from pychess.System.Log import log
@@ -8,11 +9,61 @@ from pychess.Utils.Offer import Offer
 from pychess.Utils.const import REMOTE, DRAW, WHITE, BLACK, RUNNING, WHITEWON, KILLED, \
     TAKEBACK_OFFER, WAITING_TO_START, BLACKWON, PAUSE_OFFER, PAUSED, \
     RESUME_OFFER, DISCONNECTED, CHAT_ACTION, RESIGNATION, FLAG_CALL, OFFERS, LOCAL, \
-    UNFINISHED_STATES, ABORT_OFFER, ACTION_ERROR_NONE_TO_ACCEPT
+    UNFINISHED_STATES, ABORT_OFFER, ACTION_ERROR_NONE_TO_ACCEPT, CAMBODIANCHESS, \
+    MAKRUKCHESS, SITTUYINCHESS, EMPTY, PAWN, KING, reprSign, reprSignMakruk, \
+    reprSignSittuyin
+from pychess.Utils.lutils.bitboard import iterBits
+from pychess.Utils.lutils.lmove import parseSAN, ParsingError
 from pychess.Players.Human import Human
 from pychess.Savers import fen as fen_loader
 from pychess.ic import GAME_TYPES, TYPE_TOURNAMENT_DIRECTOR
 
+# The runs of empty squares of FEN rows, by their digits
+emptyRuns = [(str(i), "-" * i) for i in range(1, 9)]
+
+# Black pieces are marked by adding this to their piece in placementCells
+BLACK_PIECE = 16
+
+
+def cellSigns(signs):
+    """ Returns a translate table to the sign of each piece, lower case for
+        the black ones, and "-" for an empty cord """
+    table = bytearray(b"?" * 256)
+    table[EMPTY] = ord("-")
+    for piece in range(PAWN, KING + 1):
+        table[piece] = ord(signs[piece])
+        table[piece + BLACK_PIECE] = ord(signs[piece].lower())
+    return bytes(table)
+
+
+normalSigns = cellSigns(reprSign)
+makrukSigns = cellSigns(reprSignMakruk)
+sittuyinSigns = cellSigns(reprSignSittuyin)
+
+
+def placementCells(lboard):
+    """ Returns the pieces of lboard as a letter per cord, or "-" for an empty
+        one, from a8 to h1 as in style12 """
+    if lboard.variant in (CAMBODIANCHESS, MAKRUKCHESS):
+        signs = makrukSigns
+    elif lboard.variant == SITTUYINCHESS:
+        signs = sittuyinSigns
+    else:
+        signs = normalSigns
+    cells = bytearray(lboard.arBoard)
+    for cord in iterBits(lboard.friends[BLACK]):
+        cells[cord] += BLACK_PIECE
+    cells = cells.translate(signs)
+    return b"".join([cells[i:i + 8] for i in range(56, -1, -8)]).decode()
+
+
+def expandPlacement(fen):
+    """ Returns the piece placement of fen as placementCells does """
+    placement = fen.split(" ", 1)[0].replace("/", "").replace("~", "")
+    for digit, run in emptyRuns:
+        placement = placement.replace(digit, run)
+    return placement
+
 
 class ICGameModel(GameModel):
     def __init__(self, connection, ficsgame, timemodel):
@@ -179,16 +230,17 @@ class ICGameModel(GameModel):
 
     def update_board(self, gameno, ply, curcol, lastmove, fen, wname,
                      bname, wms, bms):
-        log.debug(("ICGameModel.update_board: id=%s self.ply=%s self.players=%s gameno=%s " +
-                  "wname=%s bname=%s ply=%s curcol=%s lastmove=%s fen=%s wms=%s bms=%s") %
-                  (str(id(self)), str(self.ply), repr(self.players), str(gameno), str(wname), str(bname),
-                   str(ply), str(curcol), str(lastmove), str(fen), str(wms), str(bms)))
+        log.debug("ICGameModel.update_board: id=%s self.ply=%s self.players=%s gameno=%s "
+                  "wname=%s bname=%s ply=%s curcol=%s lastmove=%s fen=%s wms=%s bms=%s",
+                  id(self), self.ply, repr(self.players), gameno, wname, bname,
+                  ply, curcol, lastmove, fen, wms, bms)
         if gameno != self.ficsgame.gameno or len(self.players) < 2 or self.disconnected:
             return
+        start = perf_counter()
 
         if self.timed:
-            log.debug("ICGameModel.update_board: id=%d self.players=%s: updating timemodel" %
-                      (id(self), str(self.players)))
+            log.debug("ICGameModel.update_board: id=%d self.players=%s: updating timemodel",
+                      id(self), str(self.players))
             # If game end coming from helper connection before last move made
             # we have to tap() ourselves
             if self.status in (DRAW, WHITEWON, BLACKWON):
@@ -214,31 +266,55 @@ class ICGameModel(GameModel):
             if len(self.moves) >= self.ply - ply:
                 self.undoMoves(self.ply - ply)
             else:
-                self.status = RUNNING
-                self.loadAndStart(
-                    StringIO(fen),
-                    fen_loader,
-                    0,
-                    -1,
-                    first_time=False)
-                self.emit("game_started")
-                curPlayer = self.players[self.curColor]
-                curPlayer.resetPosition()
+                self.reloadBoard(fen)
 
         elif ply > self.ply + 1:
             log.debug("ICGameModel.update_board: id=%d self.players=%s \
                       self.ply=%d ply=%d: FORWARD JUMP" %
                       (id(self), str(self.players), self.ply, ply))
-            self.status = RUNNING
-            self.loadAndStart(
-                StringIO(fen),
-                fen_loader,
-                0,
-                -1,
-                first_time=False)
-            self.emit("game_started")
-            curPlayer = self.players[self.curColor]
-            curPlayer.resetPosition()
+            self.reloadBoard(fen)
+
+        elif ply == self.ply + 1:
+            # ICC sends the moves without a fen
+            if not fen or self.matchesMove(lastmove, fen):
+                self.ficsgame.move_updates += 1
+            else:
+                log.debug("ICGameModel.update_board: id=%d self.players=%s \
+                          lastmove=%s fen=%s: POSITION MISMATCH" %
+                          (id(self), str(self.players), lastmove, fen))
+                self.reloadBoard(fen)
+
+        self.ficsgame.update_time += perf_counter() - start
+
+    def matchesMove(self, lastmove, fen):
+        """ Returns whether fen has the position of the last board after
+            lastmove. The move is made and taken back on the LBoard of the
+            last board, which is cheaper than loading the fen. """
+        lboard = self.boards[-1].board
+        try:
+            move = parseSAN(lboard, lastmove)
+        except ParsingError:
+            return False
+        lboard.applyMove(move)
+        try:
+            cells = placementCells(lboard)
+        finally:
+            lboard.popMove()
+        return cells == expandPlacement(fen)
+
+    def reloadBoard(self, fen):
+        """ Loads the position of fen in place of the game """
+        self.ficsgame.fen_updates += 1
+        self.status = RUNNING
+        self.loadAndStart(
+            StringIO(fen),
+            fen_loader,
+            0,
+            -1,
+            first_time=False)
+        self.emit("game_started")
+        curPlayer = self.players[self.curColor]
+        curPlayer.resetPosition()
 
     def onTimesUpdate(self, bm, gameno, wms, bms):
         if gameno != self.ficsgame.gameno:
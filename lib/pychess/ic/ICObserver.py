@@ -0,0 +1,285 @@
+""" A headless observer, which archives the games in progress on an ICS to a
+    .pgn file, without GTK and without a GameModel per game.
+
+    An ICObserver observes the games the connection announces, up to
+    maxGames at a time. Each observed game is kept as an ObservedGame: its
+    PGN tags and its moves as a list of SAN strings, rather than a Board per
+    ply. The moves are taken from the move queue BoardManager feeds the
+    FICSGame, as ICPlayer does. A game is written to the .pgn file as soon
+    as it ends, and dropped, so the memory used grows with the games in
+    progress, not with the games archived. A game longer than maxPlies is
+    written as unterminated and unobserved.
+
+    PYTHONPATH=lib/ python -m pychess.ic.ICObserver --output games.pgn
+"""
+
+import argparse
+import asyncio
+import collections
+import re
+import sys
+import textwrap
+
+from pychess.compat import create_task
+from pychess.System.Log import log
+from pychess.Savers.pgn import msToClockTimeTag, mandatory_tags
+from pychess.Utils.const import reprResult, ABORTED_REASONS, ADJOURNED_REASONS, \
+    WON_CALLFLAG, WON_ADJUDICATION, DRAW_ADJUDICATION
+from pychess.ic import IC_POS_OBSERVING_EXAMINATION
+
+# The games observed at a time, and the moves kept of a game at most
+MAX_GAMES = 30
+MAX_PLIES = 1200
+
+tagRE = re.compile(r'\[(\w+) "(.*)"\]')
+commentRE = re.compile(r"\{[^}]*\}")
+moveNumberRE = re.compile(r"\d+\.+")
+
+
+class ObservedGame:
+    """ The PGN tags and the moves of an observed game. The moves are kept
+        as interned SAN strings, which the games share, so each move costs
+        about the size of a reference. """
+
+    def __init__(self, ficsgame):
+        self.ficsgame = ficsgame
+        self.tags = collections.OrderedDict()
+        self.moves = []
+        self.wms = self.bms = None
+
+        lines = ficsgame.board.pgn.splitlines()
+        movetext = []
+        for line in lines:
+            match = tagRE.match(line)
+            if match:
+                self.tags[match.group(1)] = match.group(2)
+            else:
+                movetext.append(line)
+        for token in commentRE.sub(" ", " ".join(movetext)).split():
+            if not moveNumberRE.fullmatch(token) and token not in reprResult:
+                self.moves.append(sys.intern(token))
+
+    @property
+    def plies(self):
+        return len(self.moves)
+
+    def addMove(self, ply, san):
+        """ Records san as the move to ply, the ply after it. Any moves from
+            that ply on were taken back. Returns False if the moves before
+            ply are missing. """
+        if ply < 1 or ply - 1 > len(self.moves):
+            return False
+        del self.moves[ply - 1:]
+        self.moves.append(sys.intern(san))
+        return True
+
+    def setClocks(self, wms, bms):
+        self.wms = wms
+        self.bms = bms
+
+    def asPGN(self, result=None, reason=None):
+        """ Returns the game as PGN text, with the result and reason it ended
+            with, or as unterminated if result is None """
+
+        tags = collections.OrderedDict(
+            (tag, self.tags.get(tag, "?")) for tag in mandatory_tags)
+        tags["Result"] = reprResult[result] if result is not None else "*"
+        tags.update((tag, value) for tag, value in self.tags.items()
+                    if tag not in tags)
+
+        if result is None or reason in ADJOURNED_REASONS:
+            tags["Termination"] = "unterminated"
+        elif reason in ABORTED_REASONS:
+            tags["Termination"] = "abandoned"
+        elif reason == WON_CALLFLAG:
+            tags["Termination"] = "time forfeit"
+        elif reason in (WON_ADJUDICATION, DRAW_ADJUDICATION):
+            tags["Termination"] = "adjudication"
+        else:
+            tags["Termination"] = "normal"
+        tags["PlyCount"] = str(len(self.moves))
+        if self.wms is not None:
+            tags["WhiteClock"] = msToClockTimeTag(self.wms)
+            tags["BlackClock"] = msToClockTimeTag(self.bms)
+
+        movetext = []
+        for ply, san in enumerate(self.moves):
+            if ply % 2 == 0:
+                movetext.append("%d." % (ply // 2 + 1))
+            movetext.append(san)
+        movetext.append(tags["Result"])
+
+        text = "".join('[%s "%s"]\n' % tag for tag in tags.items())
+        return "%s\n%s\n\n" % (text, textwrap.fill(" ".join(movetext), width=80))
+
+
+class ICObserver:
+    """ Observes the games announced on connection, a FICSMainConnection
+        with its managers started, and writes each to pgnfile when it ends """
+
+    def __init__(self, connection, pgnfile, maxGames=MAX_GAMES,
+                 maxPlies=MAX_PLIES):
+        self.connection = connection
+        self.pgnfile = pgnfile
+        self.maxGames = maxGames
+        self.maxPlies = maxPlies
+
+        # The ObservedGame and the task recording its moves, by FICSGame
+        self.games = {}
+        self.tasks = {}
+        # The gamenos asked to observe, which aren't observed yet
+        self.requested = set()
+        self.archived = 0
+
+        self.connections = collections.defaultdict(list)
+        games = connection.games
+        bm = connection.bm
+        self.connections[games].append(games.connect(
+            "FICSGameCreated", self.onGamesCreated))
+        self.connections[games].append(games.connect(
+            "FICSGameEnded", self.onGameRemoved))
+        self.connections[bm].append(bm.connect(
+            "obsGameCreated", self.onObsGameCreated))
+        self.connections[bm].append(bm.connect(
+            "obsGameEnded", self.onObsGameEnded))
+        self.connections[bm].append(bm.connect(
+            "obsGameUnobserved", self.onObsGameUnobserved))
+        self.connections[connection].append(connection.connect(
+            "disconnected", self.onDisconnected))
+
+    def onGamesCreated(self, games, ficsgames):
+        for ficsgame in ficsgames:
+            if len(self.games) + len(self.requested) >= self.maxGames:
+                break
+            if ficsgame.private or not ficsgame.supported or \
+                    ficsgame in self.games or \
+                    ficsgame.gameno in self.requested:
+                continue
+            self.requested.add(ficsgame.gameno)
+            self.connection.bm.observe(ficsgame)
+
+    def onGameRemoved(self, games, ficsgame):
+        self.requested.discard(ficsgame.gameno)
+
+    def onObsGameCreated(self, bm, ficsgame):
+        self.requested.discard(ficsgame.gameno)
+        if ficsgame.relation == IC_POS_OBSERVING_EXAMINATION or \
+                ficsgame in self.games:
+            return
+        game = ObservedGame(ficsgame)
+        self.games[ficsgame] = game
+        self.tasks[ficsgame] = create_task(self.record(ficsgame, game))
+        log.debug("ICObserver.onObsGameCreated: %s with %d moves" %
+                  (ficsgame, game.plies),
+                  extra={"task": (self.connection.username, "ICObserver")})
+        bm.onGameModelStarted(ficsgame.gameno)
+
+    def onObsGameEnded(self, bm, ficsgame):
+        if ficsgame in self.games:
+            ficsgame.move_queue.put_nowait("end")
+
+    def onObsGameUnobserved(self, bm, ficsgame):
+        self.requested.discard(ficsgame.gameno)
+        if ficsgame in self.games:
+            ficsgame.move_queue.put_nowait("del")
+
+    def onDisconnected(self, connection):
+        create_task(self.close())
+
+    @asyncio.coroutine
+    def record(self, ficsgame, game):
+        """ Records the moves of ficsgame into game until it ends, and writes
+            it then """
+        while True:
+            item = yield from ficsgame.move_queue.get()
+            if item == "end":
+                self.write(game, ficsgame.result, ficsgame.reason)
+                break
+            elif item == "del":
+                self.write(game)
+                break
+            elif not isinstance(item, tuple):
+                continue
+
+            gameno, ply, curcol, lastmove, fen, wname, bname, wms, bms = item
+            if not game.addMove(ply, lastmove):
+                log.warning("ICObserver.record: %s has no move before ply %d" %
+                            (ficsgame, ply),
+                            extra={"task": (self.connection.username, "ICObserver")})
+                self.write(game)
+                self.connection.bm.unobserve(ficsgame)
+                break
+            game.setClocks(wms, bms)
+            if game.plies >= self.maxPlies:
+                log.warning("ICObserver.record: %s is longer than %d plies" %
+                            (ficsgame, self.maxPlies),
+                            extra={"task": (self.connection.username, "ICObserver")})
+                self.write(game)
+                self.connection.bm.unobserve(ficsgame)
+                break
+
+        del self.games[ficsgame]
+        del self.tasks[ficsgame]
+
+    def write(self, game, result=None, reason=None):
+        self.pgnfile.write(game.asPGN(result, reason))
+        self.pgnfile.flush()
+        self.archived += 1
+
+    @asyncio.coroutine
+    def close(self):
+        """ Stops observing, and writes the games in progress as
+            unterminated """
+        for obj in self.connections:
+            for handler_id in self.connections[obj]:
+                if obj.handler_is_connected(handler_id):
+                    obj.disconnect(handler_id)
+        self.connections.clear()
+
+        tasks = list(self.tasks.values())
+        for ficsgame in self.games:
+            ficsgame.move_queue.put_nowait("del")
+        if tasks:
+            yield from asyncio.wait(tasks)
+
+
+def main(argv=None):
+    from pychess.ic.FICSConnection import FICSMainConnection
+
+    parser = argparse.ArgumentParser(description="Archive the games of an ICS")
+    parser.add_argument("--output", required=True, help="append the games to this .pgn")
+    parser.add_argument("--host", default="freechess.org")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--username", default="guest")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--notimeseal", action="store_true", help="connect without timeseal")
+    parser.add_argument("--games", type=int, default=MAX_GAMES,
+                        help="observe at most this many games at a time (default %d)" % MAX_GAMES)
+    parser.add_argument("--plies", type=int, default=MAX_PLIES,
+                        help="keep at most this many moves of a game (default %d)" % MAX_PLIES)
+    args = parser.parse_args(argv)
+
+    loop = asyncio.get_event_loop()
+    with open(args.output, "a") as pgnfile:
+        connection = FICSMainConnection(args.host, (args.port, ), not args.notimeseal,
+                                        args.username, args.password)
+
+        observers = []
+
+        def onConnected(connection):
+            connection.start_helper_manager(True)
+            observers.append(ICObserver(connection, pgnfile, args.games, args.plies))
+            connection.client.run_command("games")
+
+        connection.connect("connected", onConnected)
+        try:
+            loop.run_until_complete(connection.start())
+        except KeyboardInterrupt:
+            connection.close()
+        for observer in observers:
+            loop.run_until_complete(observer.close())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
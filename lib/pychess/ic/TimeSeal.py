@@ -21,9 +21,16 @@ if not hasattr(asyncio.StreamReader, 'readuntil'):
 ENCODE = [ord(i) for i in "Timestamp (FICS) v1.0 - programmed by Henrik Gram."]
 ENCODELEN = len(ENCODE)
 G_RESPONSE = "\x029"
+G_MARKER = b"[G]\n\r"
 FILLER = b"1234567890abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
 IAC_WONT_ECHO = b''.join([telnetlib.IAC, telnetlib.WONT, telnetlib.ECHO])
 
+# The bytes of the encode string from each offset, and the tables setting the
+# high bit of a byte and subtracting 32 from it
+ENCODE_ROTATIONS = [bytes(ENCODE[i:] + ENCODE[:i]) for i in range(ENCODELEN)]
+SET_HIGH_BIT = bytes(i | 0x80 for i in range(256))
+SUBTRACT_32 = bytes((i - 32) & 0xff for i in range(256))
+
 _DEFAULT_LIMIT = 2 ** 16
 
 
@@ -81,7 +88,7 @@ class ICSStreamReaderProtocol(asyncio.StreamReaderProtocol):
         else:
             if self.timeseal:
                 data, g_count, self.stateinfo = self.decode(data, self.stateinfo)
-            data = data.replace(b"\r", b"").replace(b"\x07", b"")
+            data = data.translate(None, b"\r\x07")
             # enable this only for temporary debugging
             log.debug(data, extra={"task": (self.name, "raw")})
 
@@ -102,57 +109,47 @@ class ICSStreamReaderProtocol(asyncio.StreamReaderProtocol):
 
         buf = enc
 
-        for i in range(0, len(buf), 12):
-            buf[i + 11], buf[i] = buf[i], buf[i + 11]
-            buf[i + 9], buf[i + 2] = buf[i + 2], buf[i + 9]
-            buf[i + 7], buf[i + 4] = buf[i + 4], buf[i + 7]
+        # Swap bytes 0 and 11, 2 and 9, and 4 and 7 of each 12 byte block
+        for i, j in ((0, 11), (2, 9), (4, 7)):
+            buf[i::12], buf[j::12] = buf[j::12], buf[i::12]
 
         encode_offset = random.randrange(ENCODELEN)
 
-        for i in range(len(buf)):
-            buf[i] |= 0x80
-            j = (i + encode_offset) % ENCODELEN
-            buf[i] = (buf[i] ^ ENCODE[j]) - 32
+        # Xor the bytes, with their high bits set, with the encode string
+        # from the offset, and subtract 32. Setting the high bits beforehand
+        # keeps the subtraction from borrowing.
+        length = len(buf)
+        key = ENCODE_ROTATIONS[encode_offset] * (length // ENCODELEN + 1)
+        scrambled = int.from_bytes(buf.translate(SET_HIGH_BIT), "big") ^ \
+            int.from_bytes(key[:length], "big")
+        buf = bytearray(scrambled.to_bytes(length, "big").translate(SUBTRACT_32))
 
         buf += bytearray([0x80 | encode_offset])
         return buf
 
     def decode(self, buf, stateinfo=None):
-        expected_table = b"[G]\n\r"
+        """ Removes the [G] markers from buf. Returns the rest, the number of
+            markers, and the state to pass with the next buf, as a marker
+            may be split between two. """
         # TODO: add support to FatICS's new zipseal protocol when it finalizes
-        # expected_table = "[G]\n\r" if not self.FatICS else "[G]\r\n"
-        final_state = len(expected_table)
-        g_count = 0
-        result = []
-
-        if stateinfo:
-            state, lookahead = stateinfo
+        # marker = b"[G]\n\r" if not self.FatICS else b"[G]\r\n"
+        if stateinfo and stateinfo[1]:
+            buf = stateinfo[1] + buf
+
+        parts = buf.split(G_MARKER)
+        g_count = len(parts) - 1
+
+        # Keep back the start of a marker at the end. As "[" is only at the
+        # start of the marker, the start of one can only be at the last "[".
+        tail = parts[-1]
+        start = tail.rfind(b"[", max(len(tail) - len(G_MARKER) + 1, 0))
+        if start >= 0 and G_MARKER.startswith(tail[start:]):
+            lookahead = tail[start:]
+            parts[-1] = tail[:start]
         else:
-            state, lookahead = 0, []
-
-        lenb = len(buf)
-        idx = 0
-        while idx < lenb:
-            buffer_item = buf[idx]
-            expected = expected_table[state]
-            if buffer_item == expected:
-                state += 1
-                if state == final_state:
-                    g_count += 1
-                    lookahead = []
-                    state = 0
-                else:
-                    lookahead.append(buffer_item)
-                idx += 1
-            elif state == 0:
-                result.append(buffer_item)
-                idx += 1
-            else:
-                result.extend(lookahead)
-                lookahead = []
-                state = 0
+            lookahead = b""
 
-        return bytearray(result), g_count, (state, lookahead)
+        return bytearray(b"".join(parts)), g_count, (len(lookahead), lookahead)
 
 
 # You can get ICC timestamp from
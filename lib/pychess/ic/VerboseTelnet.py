@@ -1,5 +1,6 @@
 import asyncio
 import collections
+import logging
 import re
 
 from pychess.System.Log import log
@@ -16,12 +17,78 @@ class ConsoleHandler:
             self.callback(line)
 
 
+# Predictions are indexed by at most this many characters of the literal text
+# all lines they match start with
+KEY_LENGTH = 4
+
+# Characters IGNORECASE matches with an ascii letter, which lower() doesn't
+# map to it
+CASE_FOLDS = {0x130: "i", 0x131: "i", 0x17f: "s"}
+
+SPECIAL_CHARS = ".^$*+?{}[]()|"
+REPEAT_CHARS = "*+?{"
+GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+BACKREFERENCE = re.compile(r"\\\d|\(\?\(")
+
+
+def has_top_branch(pattern):
+    """ Returns whether pattern has an alternation outside of any group """
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            i += 1
+            if pattern[i:i + 1] == "^":
+                i += 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def literal_prefix(pattern):
+    """ Returns the lowercase literal text all matches of pattern start with,
+        which is "" when it isn't known """
+    if has_top_branch(pattern) or GLOBAL_FLAGS.search(pattern):
+        return ""
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            char = pattern[i + 1:i + 2]
+            if not char or not char.isascii() or char.isalnum():
+                break
+            i += 2
+        elif char in SPECIAL_CHARS or not char.isascii():
+            break
+        else:
+            i += 1
+        # A repeated character may be missing
+        if pattern[i:i + 1] and pattern[i] in REPEAT_CHARS:
+            break
+        prefix.append(char)
+    return "".join(prefix).lower()
+
+
 class Prediction:
     def __init__(self, callback, *regexps):
         self.callback = callback
         self.name = callback.__name__
         self.regexps = []
         self.matches = ()
+        self.hits = 0
         self.hash = hash(callback)
 
         for regexp in regexps:
@@ -160,6 +227,137 @@ class FromToPrediction(MultipleLinesPrediction):
         return RETURN_NO_MATCH
 
 
+class PredictionBucket:
+    """ The predictions whose first regexps have the same literal prefix key.
+        A line can only be matched by the predictions from the first one
+        whose regexp matches it, which an alternation of all the regexps
+        finds with one match. """
+
+    def __init__(self):
+        self.predictions = []
+        self.regexp = None
+        self.groups = None
+
+    def append(self, prediction):
+        self.predictions.append(prediction)
+        self.groups = None
+
+    def compile(self):
+        """ Compiles the alternation of the first regexps, and maps the
+            group of each alternative to the index of its prediction """
+        self.regexp = None
+        self.groups = {}
+        alternatives = []
+        group = 1
+        for i, prediction in enumerate(self.predictions):
+            regexp = prediction.regexps[0]
+            # The groups are numbered over the whole alternation
+            if BACKREFERENCE.search(regexp.pattern):
+                return
+            alternatives.append("(%s)" % regexp.pattern)
+            self.groups[group] = i
+            group += regexp.groups + 1
+        try:
+            self.regexp = re.compile("|".join(alternatives), re.IGNORECASE)
+        except re.error:
+            pass
+
+    def candidates(self, line):
+        if len(self.predictions) == 1:
+            return self.predictions
+        if self.groups is None:
+            self.compile()
+        if self.regexp is None:
+            return self.predictions
+        match = self.regexp.match(line)
+        if match is None:
+            return ()
+        return self.predictions[self.groups[match.lastindex]:]
+
+
+class Predictions:
+    """ The predictions of a connection, in the order they were expected.
+        They are indexed by the literal prefix of their first regexp, as a
+        line can only be matched by a prediction whose first regexp matches
+        it, unless the prediction was interrupted after it. Like a list, the
+        predictions can be reordered with random.shuffle. """
+
+    def __init__(self):
+        self.predictions = []
+        self.interrupted = None
+        self.positions = None
+        self.buckets = None
+        self.lengths = None
+
+    def __len__(self):
+        return len(self.predictions)
+
+    def __iter__(self):
+        return iter(self.predictions)
+
+    def __contains__(self, prediction):
+        return prediction in self.predictions
+
+    def __getitem__(self, index):
+        return self.predictions[index]
+
+    def __setitem__(self, index, prediction):
+        self.predictions[index] = prediction
+        self.positions = None
+
+    def add(self, prediction):
+        if prediction in self.predictions:
+            return
+        self.predictions.append(prediction)
+        if self.positions is not None:
+            self.index(prediction)
+
+    def remove(self, prediction):
+        self.predictions.remove(prediction)
+        self.positions = None
+
+    def index(self, prediction):
+        self.positions[prediction] = len(self.positions)
+        key = literal_prefix(prediction.regexps[0].pattern)[:KEY_LENGTH]
+        if key not in self.buckets:
+            self.buckets[key] = PredictionBucket()
+            self.lengths = sorted(set(self.lengths) | {len(key)})
+        self.buckets[key].append(prediction)
+
+    def candidates(self, line):
+        """ Returns the predictions which may match line, in order """
+        if self.positions is None:
+            self.positions = {}
+            self.buckets = {}
+            self.lengths = []
+            for prediction in self.predictions:
+                self.index(prediction)
+
+        key = line[:KEY_LENGTH].translate(CASE_FOLDS).lower()
+        found = []
+        sources = 0
+        for length in self.lengths:
+            bucket = self.buckets.get(key[:length])
+            if bucket is not None:
+                predictions = bucket.candidates(line)
+                if predictions:
+                    found.extend(predictions)
+                    sources += 1
+        if self.interrupted in self.positions and \
+                self.interrupted not in found:
+            found.append(self.interrupted)
+            sources += 1
+        if sources > 1:
+            found.sort(key=self.positions.__getitem__)
+        return found
+
+    def hit_counts(self):
+        """ Returns a list of the hits and name of each prediction, the most
+            hit first """
+        return sorted(((prediction.hits, prediction.name)
+                       for prediction in self.predictions), reverse=True)
+
+
 TelnetLine = collections.namedtuple('TelnetLine', ['line', 'code', 'code_type'])
 EmptyTelnetLine = TelnetLine("", None, None)
 
@@ -214,7 +412,7 @@ class TelnetLines:
                 while UNIT_END not in line:
                     if line.startswith(DTGR_START):
                         code, data = line[2:-2].split(" ", 1)
-                        log.debug("%s %s" % (code, data), extra={"task": (self.telnet.name, "datagram")})
+                        log.debug("%s %s", code, data, extra={"task": (self.telnet.name, "datagram")})
                         lines.append(TelnetLine(data, int(code), DG))
                     else:
                         if line.endswith(UNIT_END):
@@ -251,10 +449,9 @@ class TelnetLines:
                 line = yield from self.telnet.readline()
             lines.append(TelnetLine(line[:-1], code, BL))
 
-            if code != BLKCMD_PASSWORD:
-                log.debug("%s %s %s" %
-                          (identifier, code, "\n".join(line.line
-                                                       for line in lines).strip()),
+            if code != BLKCMD_PASSWORD and log.isEnabledFor(logging.DEBUG):
+                log.debug("%s %s %s", identifier, code,
+                          "\n".join(line.line for line in lines).strip(),
                           extra={"task": (self.telnet.name, "command_reply")})
         else:
             code = 0
@@ -277,6 +474,7 @@ class PredictionsTelnet:
         self.replay_cn_dict = replay_cn_dict
         self.show_reply = set([])
         self.lines = TelnetLines(telnet, self.show_reply)
+        self.nonmatched = 0
         self.__command_id = 1
 
     @asyncio.coroutine
@@ -298,17 +496,21 @@ class PredictionsTelnet:
                 log.debug(line.line, extra={"task": (self.telnet.name, callback.__name__)})
                 return
 
-        predictions = self.reply_cmd_dict[line.code] \
-            if line.code is not None and line.code in self.reply_cmd_dict else self.predictions
-        for pred in list(predictions):
+        if line.code is not None and line.code in self.reply_cmd_dict:
+            predictions = list(self.reply_cmd_dict[line.code])
+        else:
+            predictions = self.predictions.candidates(line.line)
+        for pred in predictions:
             answer = yield from self.test_prediction(pred, line)
             # print(answer, "  parse_line: trying prediction %s for line '%s'" % (pred.name, line.line[:80]))
             if answer in (RETURN_MATCH, RETURN_MATCH_END):
+                pred.hits += 1
                 log.debug("\n".join(pred.matches),
                           extra={"task": (self.telnet.name, pred.name)})
                 break
         else:
             # print("  NOT MATCHED:", line.line[:80])
+            self.nonmatched += 1
             if line.code != BLKCMD_PASSWORD:
                 log.debug(line.line,
                           extra={"task": (self.telnet.name, "nonmatched")})
@@ -317,10 +519,15 @@ class PredictionsTelnet:
     def test_prediction(self, prediction, line):
         lines = []
         answer = prediction.handle(line.line)
-        while answer is RETURN_NEED_MORE:
-            line = yield from self.lines.popleft()
-            lines.append(line)
-            answer = prediction.handle(line.line)
+        if answer is RETURN_NEED_MORE:
+            # Should reading a line fail, the prediction still waits for it
+            self.predictions.interrupted = prediction
+            while answer is RETURN_NEED_MORE:
+                line = yield from self.lines.popleft()
+                lines.append(line)
+                answer = prediction.handle(line.line)
+        if self.predictions.interrupted is prediction:
+            self.predictions.interrupted = None
 
         if lines and answer not in (RETURN_MATCH, RETURN_MATCH_END):
             self.lines.extendleft(reversed(lines))
@@ -1,5 +1,6 @@
 import re
 import asyncio
+from time import perf_counter
 
 from gi.repository import GObject
 
@@ -64,6 +65,10 @@ sr = re.compile("<sr> ([\d ]+)")
 fileToEpcord = (("a3", "b3", "c3", "d3", "e3", "f3", "g3", "h3"),
                 ("a6", "b6", "c6", "d6", "e6", "f6", "g6", "h6"))
 
+# The runs of empty squares of style12 rows, longest first, and their FEN
+# digits
+emptyRuns = [("-" * i, str(i)) for i in range(8, 0, -1)]
+
 
 def parse_reason(result, reason, wname=None):
     """
@@ -353,23 +358,9 @@ class BoardManager(GObject.GObject):
         gain = int(fields[20])
 
         # Board data
-        fenrows = []
-        for row in fields[:8]:
-            fenrow = []
-            spaceCounter = 0
-            for char in row:
-                if char == "-":
-                    spaceCounter += 1
-                else:
-                    if spaceCounter:
-                        fenrow.append(str(spaceCounter))
-                        spaceCounter = 0
-                    fenrow.append(char)
-            if spaceCounter:
-                fenrow.append(str(spaceCounter))
-            fenrows.append("".join(fenrow))
-
-        fen = "/".join(fenrows)
+        fen = "/".join(fields[:8])
+        for run, digit in emptyRuns:
+            fen = fen.replace(run, digit)
         fen += " "
 
         # Current color
@@ -409,7 +400,7 @@ class BoardManager(GObject.GObject):
 
     def onStyle12(self, match):
         style12 = match.groups()[0]
-        log.debug("onStyle12: %s" % style12)
+        log.debug("onStyle12: %s", style12)
         gameno = int(style12.split()[15])
         if gameno in self.queuedStyle12s:
             self.queuedStyle12s[gameno].append(style12)
@@ -424,8 +415,10 @@ class BoardManager(GObject.GObject):
             castleSigns = self.castleSigns[gameno]
         else:
             castleSigns = ("k", "q")
+        start = perf_counter()
         gameno, relation, curcol, ply, wname, bname, wms, bms, gain, lastmove, fen = \
             self.parseStyle12(style12, castleSigns)
+        parse_time = perf_counter() - start
 
         # examine starts with a <12> line only
         if lastmove is None and relation == IC_POS_EXAMINATING:
@@ -513,6 +506,8 @@ class BoardManager(GObject.GObject):
         else:
             if gameno in self.connection.games.games_by_gameno:
                 game = self.connection.games.get_game_by_gameno(gameno)
+                game.style12_parses += 1
+                game.style12_parse_time += parse_time
                 if wms < 0 or bms < 0:
                     # fics resend latest style12 line again when one player lost on time
                     return
@@ -521,7 +516,7 @@ class BoardManager(GObject.GObject):
                               extra={"task": (self.connection.username, "BM.onStyle12")})
                     self.emit("boardSetup", gameno, fen, wname, bname)
                 else:
-                    log.debug("put move %s into game.move_queue" % lastmove,
+                    log.debug("put move %s into game.move_queue", lastmove,
                               extra={"task": (self.connection.username, "BM.onStyle12")})
                     game.move_queue.put_nowait((gameno, ply, curcol, lastmove, fen, wname, bname, wms, bms))
             else:
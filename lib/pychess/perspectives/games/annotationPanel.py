@@ -1268,9 +1268,7 @@ class Sidepanel:
         """
         The method is called when a game is loaded.
         """
-        for ply in range(min(40, model.ply, len(model.boards))):
-            if ply >= model.lowply:
-                model.setOpening(ply)
+        model.setGameOpening()
         self.update()
 
     def on_game_changed(self, game, ply):
@@ -1,10 +1,13 @@
 import unittest
 
-from pychess.Utils.const import BLACK, KING, ROOK, D2, D4, G8, F6, C2, C4, G7, G6, G2, G3, F8, F1, E8, H8
+from pychess.Utils.const import BLACK, KING, ROOK, D2, D4, G8, F6, C2, C4, G7, G6, G2, G3, F8, F1, E8, H8, \
+    CRAZYHOUSECHESS, FEN_START
 from pychess.Utils.Cord import Cord
 from pychess.Utils.Board import Board
 from pychess.Utils.Move import Move
 from pychess.Utils.Piece import Piece
+from pychess.Utils.lutils.LBoard import LBoard, HISTORY
+from pychess.Utils.lutils.lmove import parseSAN
 
 
 class BoardTestCase(unittest.TestCase):
@@ -25,6 +28,40 @@ class BoardTestCase(unittest.TestCase):
         self.assertEqual(board[Cord(G8)].piece, Piece(BLACK, KING).piece)
         self.assertEqual(board[Cord(F8)].piece, Piece(BLACK, ROOK).piece)
 
+    def test2(self):
+        """ Testing LBoard.branch() builds the same history as clone() """
+        sans = "e4 d5 exd5 Qxd5 Nc3 Qa5 P@b4 Qxb4 d4 P@e3 Bxe3 Qxb2 Nge2 Qxa1 P@c7".split()
+
+        board = LBoard(CRAZYHOUSECHESS)
+        board.applyFen(FEN_START)
+        clones = [board]
+        branches = [board]
+        for san in sans:
+            move = parseSAN(clones[-1], san)
+            clone = clones[-1].clone()
+            clone.applyMove(move)
+            clones.append(clone)
+            branches.append(branches[-1].branch(move))
+
+        # Build the history of every other board, leaving the rest to build
+        # from a mix of built and unbuilt parents
+        for clone, branch in list(zip(clones, branches))[::-2] + list(zip(clones, branches)):
+            for name in HISTORY:
+                if hasattr(clone, name):
+                    self.assertEqual(getattr(branch, name), getattr(clone, name))
+            self.assertEqual(branch.asFen(), clone.asFen())
+
+        board = branches[-1]
+        for san in sans:
+            board.popMove()
+        self.assertEqual(board.asFen(), clones[0].asFen())
+        self.assertEqual(branches[1].asFen(), clones[1].asFen())
+
+        # A list the variant doesn't keep is missing, as on a clone
+        branch = branches[2].branch(parseSAN(branches[2], "exd5"))
+        self.assertFalse(hasattr(branch, "hist_exploding_around"))
+        self.assertEqual(getattr(branch, "hist_is_first_move", None), None)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,21 @@
+import os
+import pickle
+import tempfile
 import unittest
 from time import time
 
+from pychess.Utils.const import NORMALCHESS, hashfEXACT
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.ldata import MATE_VALUE
+from pychess.Utils.lutils.lmove import toSAN, parseSAN
+from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.lutils.lsort import MovePicker
 from pychess.Variants.losers import LosersBoard
-from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.lsearch import Search, NULLMOVE
+from pychess.Utils.lutils import lparallel
+from pychess.Utils.lutils.lparallel import ParallelSearch
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable, \
+    SharedTranspositionTable, PersistentTranspositionTable, entryType
 
 # ♜ ♞ ♝ ♛ ♚ . ♞ ♜
 # ♟ . ♟ . . ♟ ♟ ♟
@@ -14,21 +27,247 @@ from pychess.Utils.lutils import lsearch
 # ♖ . ♗ ♕ ♔ ♗ ♘ ♖
 FEN0 = "rnbqk1nr/p1p2ppp/1p2p3/3pP3/1b1P4/2N5/PPP2PPP/R1BQKBNR w KQkq - 0 5"
 
+FEN1 = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10"
+
+# Scholar's mate
+FEN2 = "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 0 4"
+
+# The rook takes the queen
+FEN3 = "4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1"
+
+
+class ReversedPool:
+    """ Runs the root moves in this process, the last one first, and hands
+        out their results in the order of the moves, as a Pool does """
+
+    def __init__(self):
+        self.tasks = []
+
+    def apply_async(self, func, args, callback):
+        task = ReversedResult(self, func, args, callback)
+        self.tasks.append(task)
+        return task
+
+    def run(self):
+        for task in reversed(self.tasks):
+            task.result = task.func(*task.args)
+            task.callback(task.result)
+        self.tasks = []
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class ReversedResult:
+    def __init__(self, pool, func, args, callback):
+        self.pool = pool
+        self.func = func
+        self.args = args
+        self.callback = callback
+        self.result = None
+
+    def get(self):
+        if self.result is None:
+            self.pool.run()
+        return self.result
+
 
 class alphabetaTests(unittest.TestCase):
     def test1(self):
-        """Testing lsearch.alphaBeta() Losers variant"""
+        """Testing Search.alphaBeta() Losers variant"""
 
         board = LosersBoard(setup=FEN0)
 
-        lsearch.searching = True
-        lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
-        lsearch.endtime = time() + 1
+        search = Search()
+        search.searching = True
+        search.endtime = time() + 1
 
-        mvs, scr = lsearch.alphaBeta(board.board, 1)
+        mvs, scr = search.alphaBeta(board.board, 1)
 
         self.assertNotEqual(mvs, [])
 
+    def test2(self):
+        """Testing Search.run() iterative deepening"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+
+        iterations = []
+
+        def onIteration(depth, mvs, scr):
+            iterations.append((depth, mvs, scr))
+
+        search = Search()
+        mvs, scr = search.run(board, 3, onIteration=onIteration)
+
+        self.assertEqual([it[0] for it in iterations], [1, 2, 3])
+        self.assertEqual((mvs, scr), iterations[-1][1:])
+        self.assertNotEqual(mvs, [])
+        self.assertEqual(board.asFen(), FEN1)
+
+        # The iteration finishing past the end time is reported too
+        iterations = []
+        search = Search()
+        search.checkTime = lambda: None
+        mvs, scr = search.run(board, 3, endtime=time() - 1, onIteration=onIteration)
+        self.assertEqual(iterations, [(1, mvs, scr)])
+
+    def test3(self):
+        """Testing Search.run() finds a mate in one"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN2)
+
+        search = Search()
+        mvs, scr = search.run(board, 2)
+
+        self.assertEqual(toSAN(board, mvs[0]), "Qxf7#")
+        self.assertEqual(scr, MATE_VALUE - 1)
+
+    def test4(self):
+        """Testing ParallelSearch.run() agrees with Search.run()"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+        search = Search()
+        mvs, scr = search.run(board, 3)
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+        search = ParallelSearch(2)
+        try:
+            pmvs, pscr = search.run(board, 3)
+        finally:
+            search.close()
+
+        self.assertEqual(pmvs[0], mvs[0])
+        self.assertEqual(pscr, scr)
+        self.assertGreater(search.nodes, 0)
+        self.assertEqual(board.asFen(), FEN1)
+
+    def test5(self):
+        """Testing SharedTranspositionTable rejects torn entries"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+        table = SharedTranspositionTable(1024)
+        table.record(board, 1234, 56, hashfEXACT, 3)
+
+        self.assertEqual(table.probe(board, 3, -100, 100), (1234, 56, hashfEXACT))
+
+        # Simulate another process half way through overwriting the entry
+        index = (board.hash % table.buckets) * 4
+        offset = index * entryType.size + entryType.size - 1
+        table.data[offset] = bytes([table.data[offset][0] ^ 1])
+
+        self.assertIsNone(table.probe(board, 3, -100, 100))
+
+    def test6(self):
+        """Testing PersistentTranspositionTable warm starts a new search"""
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            board = LBoard(NORMALCHESS)
+            board.applyFen(FEN1)
+            search = Search(PersistentTranspositionTable(path, 1024 * 1024))
+            mvs, scr = search.run(board, 3)
+            cold_nodes = search.nodes
+            del search
+
+            search = Search(PersistentTranspositionTable(path, 1024 * 1024))
+            self.assertEqual(search.run(board, 3), (mvs[:1], scr))
+            self.assertLess(search.nodes, cold_nodes)
+
+            # A table pickled for a spawned process maps the same file
+            table = pickle.loads(pickle.dumps(search.table))
+            table.record(board, 1234, 56, hashfEXACT, 30)
+            self.assertEqual(search.table.probe(board, 30, -100, 100), (1234, 56, hashfEXACT))
+        finally:
+            os.remove(path)
+
+    def test7(self):
+        """Testing MovePicker hands out every move once, hash move first"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+        moves = sorted(genAllMoves(board))
+        table = TranspositionTable(1024)
+        picker = MovePicker()
+
+        self.assertEqual(sorted(picker.reset(board, table, 2)), moves)
+
+        # A pawn move is looked up among the generated moves, a bishop move
+        # is checked on the board
+        for san in ("a3", "Bxa6", "O-O"):
+            hashmove = parseSAN(board, san)
+            table.setHashMove(2, hashmove)
+            table.addKiller(2, parseSAN(board, "Kd1"))
+            picked = list(picker.reset(board, table, 2))
+            self.assertEqual(picked[0], hashmove)
+            self.assertEqual(sorted(picked), moves)
+
+        # A hash move from another position is left out
+        table.setHashMove(2, parseSAN(board, "Kd1") ^ 1)
+        self.assertEqual(sorted(picker.reset(board, table, 2)), moves)
+
+    def test8(self):
+        """Testing Search.run() reductions"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN1)
+        board.applyMove(parseSAN(board, "a4"))
+        fen, hash = board.asFen(), board.hash
+        self.assertNotEqual(board.enpassant, None)
+        board.applyMove(NULLMOVE)
+        self.assertEqual(board.enpassant, None)
+        board.popMove()
+        self.assertEqual((board.asFen(), board.hash), (fen, hash))
+
+        search = Search()
+        search.run(board, 4)
+        unreduced = Search()
+        unreduced.nullMoveReduction = unreduced.lateMoveReduction = \
+            unreduced.futilityMargin = 0
+        unreduced.run(board, 4)
+        self.assertLess(search.nodes, unreduced.nodes)
+        self.assertEqual(board.asFen(), fen)
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN2)
+        mvs, scr = Search().run(board, 4)
+        self.assertEqual(toSAN(board, mvs[0]), "Qxf7#")
+
+        losers = LosersBoard(setup=FEN0).board
+        self.assertFalse(search.isPrunable(losers, 1, False))
+
+    def test9(self):
+        """Testing ParallelSearch when the root moves finish in reverse order"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN3)
+        blunder = parseSAN(board, "Kf2")
+
+        search = ParallelSearch(2)
+        search.pool = ReversedPool()
+        search.poolTable = search.table
+        lparallel._initWorker(search.table, search.stopEvent, search.rootAlpha)
+        try:
+            # The blunder is searched first but finishes last, after Rxd5
+            # raised the root alpha, so it fails low
+            search.searching = True
+            search.endtime = time() + 60
+            search.bestmove = blunder
+            mvs, scr = search.alphaBeta(board, 3)
+        finally:
+            lparallel._initWorker(None, None, None)
+
+        self.assertEqual(toSAN(board, mvs[0]), "Rxd5")
+        self.assertEqual(board.asFen(), FEN3)
+
 
 if __name__ == '__main__':
     unittest.main()
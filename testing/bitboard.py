@@ -1,10 +1,14 @@
 import unittest
 
+import os
 import random
 import operator
+import tempfile
 from functools import reduce
 
+from pychess.Utils.lutils import ldata
 from pychess.Utils.lutils.bitboard import setBit, clearBit, firstBit, lastBit, iterBits
+from pychess.Utils.lutils.tablecache import tableKey, readTables, writeTables
 
 
 class BitboardTestCase(unittest.TestCase):
@@ -52,6 +56,52 @@ class BitboardTestCase(unittest.TestCase):
             itered = sorted(iterBits(board))
             self.assertEqual(positions, itered)
 
+    def test4(self):
+        """Testing cached lookup tables"""
+
+        tables = ldata.generateTables()
+        self.assertEqual(tables["attack45"], ldata.attack45)
+        self.assertEqual(tables["distance"], ldata.distance)
+
+        key = tableKey(ldata.generateTables)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            writeTables(path, key, tables)
+            self.assertEqual(readTables(path, key), tables)
+            self.assertEqual(readTables(path, tableKey(firstBit)), None)
+
+            with open(path, "r+b") as f:
+                f.seek(-1, os.SEEK_END)
+                last = f.read(1)
+                f.seek(-1, os.SEEK_END)
+                f.write(bytes([last[0] ^ 1]))
+            self.assertEqual(readTables(path, key), None)
+
+            # A change to a source the tables depend on changes the key
+            sourcekey = tableKey(ldata.generateTables, (path, ))
+            self.assertNotEqual(sourcekey, key)
+            with open(path, "ab") as f:
+                f.write(b"\n")
+            self.assertNotEqual(tableKey(ldata.generateTables, (path, )), sourcekey)
+        finally:
+            os.remove(path)
+
+    def test5(self):
+        """Testing occupancy attack tables against the rotated ones"""
+
+        lines = ((ldata.rookMasks, ldata.rookAttacks,
+                  (ldata.ray00, ldata.attack00), (ldata.ray90, ldata.attack90)),
+                 (ldata.bishopMasks, ldata.bishopAttacks,
+                  (ldata.ray45, ldata.attack45), (ldata.ray135, ldata.attack135)))
+        for positions, board in self.positionSets:
+            for cord in range(64):
+                blocker = setBit(board, cord)
+                for masks, tables, (rayA, attackA), (rayB, attackB) in lines:
+                    attacks = attackA[cord][rayA[cord] & blocker] | \
+                        attackB[cord][rayB[cord] & blocker]
+                    self.assertEqual(tables[cord][blocker & masks[cord]], attacks)
+
 
 if __name__ == '__main__':
     unittest.main()
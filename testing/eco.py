@@ -0,0 +1,108 @@
+import sqlite3
+import unittest
+
+from pychess.System import conf
+from pychess.Utils import eco
+from pychess.Utils.const import FEN_START
+from pychess.Utils.GameModel import GameModel
+from pychess.Utils.Move import parseAny
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseSAN
+
+
+def line_hashes(sans):
+    """ Returns the hashes of the positions after each move of sans """
+    board = LBoard()
+    board.applyFen(FEN_START)
+    hashes = []
+    for san in sans:
+        board.applyMove(parseSAN(board, san))
+        hashes.append(board.hash)
+    return hashes
+
+
+class EcoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.saved = (getattr(eco, "conn", None), eco.ECO_OK, eco.lang,
+                      eco.index, eco.index_lang, conf.no_gettext)
+
+        self.hashes = line_hashes(("e4", "e5", "Nf3", "Nc6", "Bb5"))
+        e4, e5, nf3, nc6, bb5 = [memoryview(eco.hash_struct.pack(hash)) for hash in self.hashes]
+
+        # A small openings table, as pgn2ecodb.py makes it
+        eco.conn = sqlite3.connect(":memory:")
+        eco.conn.execute("create table openings(hash blob, base integer, eco text, lang text, opening text, variation text)")
+        eco.conn.executemany(
+            "insert into openings(hash, base, eco, lang, opening, variation) values (?, ?, ?, ?, ?, ?)", (
+                (e4, 1, "B00", "en", "King's pawn opening", ""),
+                (e5, 1, "C20", "en", "King's pawn game", ""),
+                (e5, 0, "C20", "en", "Open game", ""),
+                (nc6, 1, "C44", "en", "King's knight opening", ""),
+                (bb5, 1, "C60", "en", "Ruy Lopez", "Spanish opening"),
+                (e4, 1, "B00", "de", "Königsbauerneröffnung", ""),
+                (bb5, 1, "C60", "de", "Spanische Partie", ""),
+            ))
+        eco.ECO_OK = True
+        eco.lang = "en"
+        eco.index = eco.index_lang = None
+        conf.no_gettext = False
+
+    def tearDown(self):
+        eco.conn.close()
+        conn, eco.ECO_OK, eco.lang, eco.index, eco.index_lang, conf.no_gettext = self.saved
+        if conn is None:
+            del eco.conn
+        else:
+            eco.conn = conn
+
+    def test1(self):
+        """Testing the first row of a hash wins"""
+
+        e4, e5, nf3, nc6, bb5 = self.hashes
+        self.assertEqual(eco.get_eco(e5), ("C20", "King's pawn game", ""))
+        self.assertEqual(eco.get_eco(nf3), None)
+        self.assertEqual(eco.get_ecos(self.hashes), [
+            ("B00", "King's pawn opening", ""),
+            ("C20", "King's pawn game", ""),
+            None,
+            ("C44", "King's knight opening", ""),
+            ("C60", "Ruy Lopez", "Spanish opening"),
+        ])
+
+    def test2(self):
+        """Testing the index follows the language"""
+
+        e4, e5, nf3, nc6, bb5 = self.hashes
+        self.assertEqual(eco.get_eco(e4)[1], "King's pawn opening")
+
+        eco.lang = "de"
+        self.assertEqual(eco.get_eco(e4)[1], "Königsbauerneröffnung")
+        self.assertEqual(eco.get_eco(e5), None)
+
+        conf.no_gettext = True
+        self.assertEqual(eco.get_eco(e4)[1], "King's pawn opening")
+
+    def test3(self):
+        """Testing the opening of a game is its last classified position"""
+
+        e4, e5, nf3, nc6, bb5 = self.hashes
+        self.assertEqual(eco.get_game_eco(self.hashes), ("C60", "Ruy Lopez", "Spanish opening"))
+        self.assertEqual(eco.get_game_eco([e4, e5, nf3]), ("C20", "King's pawn game", ""))
+        self.assertEqual(eco.get_game_eco([nf3]), None)
+        self.assertEqual(eco.get_game_eco([]), None)
+
+    def test4(self):
+        """Testing GameModel.setGameOpening"""
+
+        model = GameModel()
+        for san in ("e4", "e5", "Nf3", "Nc6", "Bb5", "a6"):
+            move = parseAny(model.boards[-1], san)
+            model.boards.append(model.boards[-1].move(move))
+            model.moves.append(move)
+        model.setGameOpening()
+        self.assertEqual((model.tags["ECO"], model.tags["Opening"], model.tags["Variation"]),
+                         ("C60", "Ruy Lopez", "Spanish opening"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,29 @@
+import random
 import unittest
 
-from pychess.Utils.const import WHITE, BLACK, NORMALCHESS
+from pychess.Utils.const import WHITE, BLACK, KING, NORMALCHESS, ATOMICCHESS, \
+    CRAZYHOUSECHESS
 from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmovegen import genAllMoves
 from pychess.Utils.lutils.leval import evaluateComplete
 from pychess.Utils.lutils import leval
+from pychess.Utils.lutils.Benchmark import benchmarkPositions
+
+try:
+    from pychess.Utils.lutils import lbatch
+except ImportError:
+    lbatch = None
+
+
+def mirrorFen(fen):
+    """ Returns fen with the board flipped and the colors swapped """
+    rows, color, castling, ep, fifty, move = fen.split()
+    rows = "/".join(reversed(rows.swapcase().split("/")))
+    color = "b" if color == "w" else "w"
+    castling = "".join(sorted(castling.swapcase())) if castling != "-" else "-"
+    if ep != "-":
+        ep = ep[0] + str(9 - int(ep[1]))
+    return " ".join((rows, color, castling, ep, fifty, move))
 
 
 class EvalTestCase(unittest.TestCase):
@@ -56,6 +76,72 @@ class EvalTestCase(unittest.TestCase):
             # print func, sw, sb
             self.assertEqual(sw, sb)
 
+    def test4(self):
+        """Testing incremental material and tropism against a new board"""
+        rand = random.Random(5)
+        for variant in (NORMALCHESS, ATOMICCHESS, CRAZYHOUSECHESS):
+            board = LBoard(variant)
+            board.applyFen(
+                "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+            for ply in range(60):
+                moves = []
+                for move in genAllMoves(board):
+                    board.applyMove(move)
+                    if not board.opIsChecked():
+                        moves.append(move)
+                    board.popMove()
+                if not moves:
+                    break
+                board.applyMove(rand.choice(moves))
+                # An exploded atomic king keeps its last cord on the board
+                if not (board.boards[WHITE][KING] and board.boards[BLACK][KING]):
+                    break
+
+                fresh = LBoard(variant)
+                fresh.applyFen(board.asFen())
+                self.assertEqual(board.material, fresh.material)
+                for color in (WHITE, BLACK):
+                    self.assertEqual(leval.evalKingTropism(board, color, 0),
+                                     leval.evalKingTropism(fresh, color, 0))
+                    self.assertEqual(leval.evalMaterial(board, color),
+                                     leval.evalMaterial(fresh, color))
+
+
+@unittest.skipIf(lbatch is None, "NumPy is not installed")
+class BatchEvalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.boards = []
+        for fen in benchmarkPositions:
+            for fen in (fen, mirrorFen(fen)):
+                board = LBoard(NORMALCHESS)
+                board.applyFen(fen)
+                self.boards.append(board)
+
+    def test1(self):
+        """Testing batch positions and symmetry of evaluateBatch"""
+        positions = lbatch.fromBoards(self.boards)
+        for board, row in zip(self.boards, positions):
+            self.assertEqual(list(row["boards"][:6]), board.boards[WHITE][1:])
+            self.assertEqual(list(row["boards"][6:]), board.boards[BLACK][1:])
+            self.assertEqual(row["color"], board.color)
+
+        scores = lbatch.evaluateBatch(positions)
+        self.assertEqual(scores[0], 0)
+        self.assertEqual(list(scores[0::2]), list(scores[1::2]))
+        # The material decides the sign where one side is far ahead
+        for board, score in zip(self.boards, scores):
+            material, phase = leval.evalMaterial(board, board.color)
+            if abs(material) > 500:
+                self.assertEqual(score > 0, material > 0)
+
+    def test2(self):
+        """Testing evaluateBatch in several chunks"""
+        positions = lbatch.fromBoards(self.boards)
+        scores = lbatch.evaluateBatch(positions)
+        many = positions.repeat(lbatch.CHUNK_SIZE // len(positions) + 3)
+        self.assertEqual(list(lbatch.evaluateBatch(many)),
+                         list(scores.repeat(lbatch.CHUNK_SIZE // len(positions) + 3)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,11 @@
+import random
 import unittest
 
+from pychess.Utils.const import NORMALCHESS, ATOMICCHESS, CRAZYHOUSECHESS, \
+    THREECHECKCHESS, CAMBODIANCHESS, FISCHERRANDOMCHESS
 from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Variants import variants
 
 
 class FenTestCase(unittest.TestCase):
@@ -19,6 +24,51 @@ class FenTestCase(unittest.TestCase):
             fenstr2 = board.asFen()
             self.assertEqual(fenstr, fenstr2)
 
+    def testSnapshot(self):
+        """Testing board-snapshot conversion with and without history"""
+
+        with open('gamefiles/perftsuite.epd') as f:
+            positions = [line[:line.find(" ;")] for line in f]
+
+        for fenstr in positions[1:]:
+            board = LBoard()
+            board.applyFen(fenstr)
+            data = board.asSnapshot()
+            board2 = LBoard()
+            self.assertEqual(board2.applySnapshot(memoryview(data)), len(data))
+            self.assertEqual(board2.asFen(), fenstr)
+            self.assertEqual(board2.hash, board.hash)
+            self.assertEqual(board2.pawnhash, board.pawnhash)
+
+        random.seed(0)
+        for variant in (NORMALCHESS, ATOMICCHESS, CRAZYHOUSECHESS,
+                        THREECHECKCHESS, CAMBODIANCHESS, FISCHERRANDOMCHESS):
+            board = variants[variant](setup=True).board
+            for i in range(60):
+                moves = [move for move in genAllMoves(board)
+                         if not board.willLeaveInCheck(move)]
+                if not moves or -1 in board.kings:
+                    break
+                board.applyMove(random.choice(moves))
+
+            # Two snapshots in one buffer
+            data = board.asSnapshot(history=True) + board.asSnapshot()
+            board2 = LBoard()
+            offset = board2.applySnapshot(data)
+            board3 = LBoard()
+            self.assertEqual(board3.applySnapshot(data, offset), len(data))
+            self.assertEqual(board2.variant, variant)
+            self.assertEqual(board3.hist_move, [])
+            self.assertEqual(board3.asFen(), board.asFen())
+            self.assertEqual(board2.material, board.material)
+
+            while board.hist_move:
+                self.assertEqual(board2.asFen(), board.asFen())
+                self.assertEqual(board2.hash, board.hash)
+                board.popMove()
+                board2.popMove()
+            self.assertEqual(board2.asFen(), board.asFen())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,8 @@ import asyncio
 import unittest
 import datetime
 import random
+from io import StringIO
+from types import SimpleNamespace
 
 from pychess.Utils.const import WHITE, FEN_START, DRAW_BLACKINSUFFICIENTANDWHITETIME, \
     DRAW_WHITEINSUFFICIENTANDBLACKTIME, ADJOURNED_COURTESY_WHITE, ADJOURNED_COURTESY_BLACK
@@ -11,7 +13,10 @@ from pychess.ic.FICSObjects import FICSPlayer, FICSGames, FICSSeeks, FICSChallen
 
 from pychess.ic import BLOCK_START, BLOCK_SEPARATOR, BLOCK_END
 from pychess.ic.FICSConnection import Connection
-from pychess.ic.VerboseTelnet import PredictionsTelnet, TelnetLine, BL
+from pychess.ic.VerboseTelnet import PredictionsTelnet, TelnetLine, BL, literal_prefix
+from pychess.ic.ICGameModel import ICGameModel, placementCells, expandPlacement
+from pychess.ic.ICObserver import ICObserver, ObservedGame
+from pychess.Utils.Board import Board
 from pychess.ic.managers.AdjournManager import AdjournManager
 from pychess.ic.managers.SeekManager import SeekManager
 from pychess.ic.managers.BoardManager import BoardManager
@@ -59,14 +64,7 @@ class DummyConnection(Connection):
     def __init__(self):
         Connection.__init__(self, 'host', (0, ), True, 'tester', '123456')
 
-        class FakeSet(list):
-            def __init__(self, *args):
-                list.__init__(self, args)
-
-            def add(self, x):
-                self.append(x)
-
-        self.predictions = FakeSet()  # make predictions able to be reordered
+        # predictions are able to be reordered
         self.client = self.DummyClient(self.predictions, self.reply_cmd_dict, self.replay_dg_dict, self.replay_cn_dict)
         self.client.lines.block_mode = True
         self.client.lines.line_prefix = "fics%"
@@ -1048,6 +1046,31 @@ class BoardManagerTests(EmittingTestCase):
         expectedResults = (game, )
         self.runAndAssertEquals(signal, lines, expectedResults)
 
+    def test18(self):
+        """Testing the FEN of style12 lines"""
+
+        line = "rnbqkb-r pppppppp -----n-- -------- ----P--- -------- PPPPKPPP RNBQ-BNR B -1 0 0 1 1 0 7 Newton Einstein 1 2 12 39 39 119 122 2 K/e1-e2 (0:06) Ke2 0"
+        result = self.manager.parseStyle12(line, ("k", "q"))
+        self.assertEqual(result, (7, 1, 1, 3, "Newton", "Einstein", 119, 122, 12, "Ke2",
+                                  "rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPPKPPP/RNBQ1BNR b kq - 0 2"))
+
+        line = "-------- -------- -------- -------- -------- -------- -------- -------k W 3 1 1 0 0 0 5 A B 0 2 0 39 39 119 122 30 none (0:00) none 0"
+        self.assertEqual(self.manager.parseStyle12(line, ("k", "q"))[-1],
+                         "8/8/8/8/8/8/8/7k w KQ d6 0 30")
+
+    def test19(self):
+        """Testing that the style12 position after a move is checked against the board"""
+
+        model = SimpleNamespace(boards=[Board(setup=True)])
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+        self.assertEqual(placementCells(model.boards[-1].board),
+                         expandPlacement("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"))
+        self.assertTrue(ICGameModel.matchesMove(model, "e4", fen))
+        self.assertFalse(ICGameModel.matchesMove(model, "d4", fen))
+        self.assertFalse(ICGameModel.matchesMove(model, "Ke5", fen))
+        self.assertEqual(model.boards[-1].asFen(),
+                         "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+
 
 class GamesTests(EmittingTestCase):
     def setUp(self):
@@ -1250,6 +1273,68 @@ class ConsoleManagerTests(EmittingTestCase):
                                 (expected_result, None))
 
 
+class PredictionsTests(EmittingTestCase):
+    def setUp(self):
+        EmittingTestCase.setUp(self)
+        self.predictions = self.connection.predictions
+
+    def test1(self):
+        """Testing the literal prefixes of regexps"""
+
+        for pattern, prefix in (
+                ("<12> (.+)", "<12> "),
+                (r"\{Game (\d+) \(", "{game "),
+                (r"Game (\d+): Game clock", "game "),
+                (r"Illegal move \((%s)\)\.", "illegal move ("),
+                ("<s(?:n?)> (.+)", "<s"),
+                ("Posted by.*", "posted by"),
+                ("abc?", "ab"),
+                ("abc{2}", "ab"),
+                ("$|", ""),
+                (r"(?:\w+\s+is (?:PUBLIC|PERSONAL))|$", ""),
+                ("a[|]b|c", ""),
+                (r"(\d+) %s", ""),
+                (r"\s*Win: .+", ""),
+                ("Only (.+?) may join", "only "),
+        ):
+            self.assertEqual(literal_prefix(pattern), prefix, pattern)
+
+    def test2(self):
+        """Testing that the candidates of a line are the predictions which may match it, in order"""
+
+        lines = [
+            "<12> rnbqkbnr pppppppp -------- -------- -------- -------- PPPPPPPP RNBQKBNR W -1 1 1 1 1 0 1 a b 0 3 0 39 39 180 180 1 none (0:00) none 0 0 0",
+            "<sr> 119", "<sc>", "GAME 1: Game clock paused.", "game",
+            "Creating: GuestA (++++) GuestB (++++) unrated blitz 3 0",
+            "You are now observing game 12.", "you are no longer examining game 3.",
+            r"\   just a continuation", "", "ſorry, game 1 is a private game.",
+            "Notification: GuestA has arrived.", "Lists:", "--> GuestA hi",
+        ]
+        for i in range(3):
+            random.shuffle(self.predictions)
+            for line in lines:
+                matching = [pred for pred in self.predictions
+                            if pred.regexps[0].match(line)]
+                candidates = self.predictions.candidates(line)
+                self.assertEqual(
+                    [pred for pred in candidates if pred.regexps[0].match(line)],
+                    matching, line)
+                self.assertLess(len(candidates), len(self.predictions))
+
+    def test3(self):
+        """Testing the hit counters of predictions"""
+
+        lines = ["<sr> 119 120", "<sr> 121"]
+
+        def coro():
+            yield from self.connection.process_lines(lines)
+        self.loop.run_until_complete(coro())
+
+        hits = dict((name, hits) for hits, name in self.predictions.hit_counts())
+        self.assertEqual(hits["on_seek_remove"], 2)
+        self.assertEqual(self.predictions.hit_counts()[0], (2, "on_seek_remove"))
+
+
 class FICSObjectsCleanupTest(EmittingTestCase):
     def setUp(self):
         EmittingTestCase.setUp(self)
@@ -1318,6 +1403,148 @@ class FICSObjectsCleanupTest(EmittingTestCase):
         self.assertEqual(self.connection.players.players_cids, {})
 
 
+# A recorded session of observing a game
+OBSERVE_463 = [
+    "{Game 463 (schachbjm vs. Maras) Creating rated standard match.}",
+    BLOCK_START + '34' + BLOCK_SEPARATOR + '80' + BLOCK_SEPARATOR,
+    'You are now observing game 463.',
+    'Game 463: schachbjm (2243) Maras (2158E) rated standard 45 45',
+    '',
+    '<12> -r------ --k----- ----p--- n-ppPb-p -----P-P -PP-K-P- PR------ --R----- W -1 0 0 0 0 11 463 schachbjm Maras 0 45 45 17 15 557871 274070 37 R/f8-b8 (0:10.025) Rb8 0 1 0',
+    BLOCK_END
+]
+
+MOVELIST_463 = [
+    'Movelist for game 463:',
+    '',
+    'schachbjm (2243) vs. Maras (2158) --- Sat Jan 23, 14:34 EST 2016',
+    'Rated standard match, initial time: 45 minutes, increment: 45 seconds.',
+    '',
+    'Move  schachbjm               Maras',
+    '----  ---------------------   ---------------------',
+    '1.  e4      (0:00.000)      e6      (0:00.000)',
+    '2.  d4      (0:01.617)      d5      (0:02.220)',
+    '3.  Nc3     (0:00.442)      Nc6     (0:54.807)',
+    '4.  e5      (0:40.427)      Nge7    (0:28.205)',
+    '5.  Nf3     (0:21.570)      Nf5     (0:28.818)',
+    '6.  h4      (1:17.369)      h5      (4:58.315)',
+    '7.  Bg5     (0:55.946)      Be7     (4:01.555)',
+    '8.  Qd2     (0:02.434)      b6      (5:12.110)',
+    '9.  O-O-O   (0:59.124)      Bb7     (0:08.796)',
+    '10.  Kb1     (0:01.900)      Qd7     (4:39.500)',
+    '11.  Bxe7    (19:59.514)     Qxe7    (2:42.462)',
+    '12.  g3      (0:58.847)      O-O-O   (0:36.468)',
+    '13.  Bh3     (0:12.284)      Nh6     (4:06.076)',
+    '14.  Ne2     (0:02.387)      g6      (5:02.695)',
+    '15.  Nf4     (0:02.976)      Kb8     (5:26.776)',
+    '16.  Rhe1    (2:33.781)      Na5     (2:23.956)',
+    '17.  b3      (0:28.817)      Rc8     (1:09.281)',
+    '18.  Ng5     (8:15.515)      c5      (5:17.139)',
+    '19.  Bxe6    (12:26.052)     fxe6    (1:14.670)',
+    '20.  Nxg6    (0:02.168)      Qd7     (1:23.832)',
+    '21.  Nxh8    (0:02.249)      Rxh8    (0:04.212)',
+    '22.  dxc5    (0:14.456)      Nf5     (0:24.046)',
+    '23.  cxb6    (0:07.092)      axb6    (0:03.296)',
+    '24.  Qb4     (0:42.800)      Qc6     (2:48.991)',
+    '25.  Nf7     (2:09.657)      Rc8     (0:37.030)',
+    '26.  Rd2     (0:01.602)      Qc5     (5:03.082)',
+    '27.  Qxc5    (0:09.672)      bxc5    (0:00.100)',
+    '28.  Nd6     (0:00.849)      Rf8     (0:04.101)',
+    '29.  c3      (0:57.437)      Kc7     (3:05.263)',
+    '30.  Nxf5    (1:51.872)      Rxf5    (0:00.100)',
+    '31.  f4      (0:00.603)      Bc6     (1:06.696)',
+    '32.  Kc2     (0:01.613)      Be8     (0:07.670)',
+    '33.  Kd3     (1:39.823)      Rf8     (1:28.227)',
+    '34.  Ke3     (0:06.207)      Bg6     (0:08.648)',
+    '35.  Rc1     (3:24.100)      Bf5     (1:11.762)',
+    '36.  Rb2     (0:13.173)      Rb8     (0:10.025)',
+    '{Still in progress} *',
+]
+
+
+class ICObserverTests(EmittingTestCase):
+    def setUp(self):
+        EmittingTestCase.setUp(self)
+        self.pgnfile = StringIO()
+
+    def replay(self, lines):
+        def coro():
+            yield from self.connection.process_lines(lines)
+        self.loop.run_until_complete(coro())
+        # Let the observer record the moves, and the ends of the games
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+
+    def test1(self):
+        """ Test archiving an observed game """
+
+        observer = ICObserver(self.connection, self.pgnfile)
+        self.replay(OBSERVE_463 + MOVELIST_463)
+        game = self.connection.games.get_game_by_gameno(463)
+        self.assertEqual(observer.games[game].plies, 72)
+
+        self.replay([
+            '<12> -r------ --k----- ----p--- n-ppPb-p ---K-P-P -PP---P- PR------ --R----- B -1 0 0 0 0 12 463 schachbjm Maras 0 45 45 17 15 557000 274070 37 K/e3-d4 (0:05.871) Kd4 0 1 0',
+            '{Game 463 (schachbjm vs. Maras) Maras resigns} 1-0',
+        ])
+        self.assertEqual(observer.games, {})
+        self.assertEqual(observer.archived, 1)
+
+        pgn = self.pgnfile.getvalue()
+        self.assertTrue(pgn.startswith('[Event "FICS rated standard game"]\n[Site "freechess.org"]\n'
+                                       '[Date "2016.01.23"]\n[Round "?"]\n[White "schachbjm"]\n'
+                                       '[Black "Maras"]\n[Result "1-0"]\n'), pgn)
+        self.assertIn('[Termination "normal"]\n[PlyCount "73"]\n', pgn)
+        self.assertIn('[WhiteClock "0:09:17.000"]', pgn)
+        self.assertIn("1. e4 e6 2. d4 d5 3. Nc3 Nc6", pgn)
+        self.assertTrue(pgn.endswith("36. Rb2 Rb8 37. Kd4 1-0\n\n"), pgn)
+
+    def test2(self):
+        """ Test archiving an observed game longer than the moves kept """
+
+        observer = ICObserver(self.connection, self.pgnfile, maxPlies=74)
+        self.replay(OBSERVE_463 + MOVELIST_463 + [
+            '<12> -r------ --k----- ----p--- n-ppPb-p ---K-P-P -PP---P- PR------ --R----- B -1 0 0 0 0 12 463 schachbjm Maras 0 45 45 17 15 557000 274070 37 K/e3-d4 (0:05.871) Kd4 0 1 0',
+        ])
+        self.assertEqual(self.pgnfile.getvalue(), "")
+
+        self.replay([
+            '<12> -r------ -------- --k-p--- n-ppPb-p ---K-P-P -PP---P- PR------ --R----- W -1 0 0 0 0 13 463 schachbjm Maras 0 45 45 17 15 557000 270000 38 K/c7-c6 (0:04.070) Kc6 0 1 0',
+        ])
+        self.assertEqual(observer.games, {})
+        self.assertEqual(self.connection.client.commands[-1], "unobserve 463")
+
+        pgn = self.pgnfile.getvalue()
+        self.assertIn('[Result "*"]\n', pgn)
+        self.assertIn('[Termination "unterminated"]\n[PlyCount "74"]\n', pgn)
+        self.assertTrue(pgn.endswith("37. Kd4 Kc6 *\n\n"), pgn)
+
+    def test3(self):
+        """ Test observing the games announced, up to the games observed at most """
+
+        observer = ICObserver(self.connection, self.pgnfile, maxGames=2)
+        games = []
+        for gameno, private in ((1, False), (2, True), (3, False), (4, False)):
+            game = FICSGame(FICSPlayer("white%d" % gameno), FICSPlayer("black%d" % gameno),
+                            gameno=gameno, game_type=GAME_TYPES["blitz"], private=private)
+            games.append(self.connection.games.get(game, emit=False))
+        self.connection.games.emit("FICSGameCreated", games)
+        self.assertEqual(observer.requested, {1, 3})
+        self.assertEqual(self.connection.client.commands[-2:], ["observe 1", "observe 3"])
+
+        self.connection.games.emit("FICSGameCreated", games)
+        self.assertEqual(self.connection.client.commands[-2:], ["observe 1", "observe 3"])
+
+        game = ObservedGame(SimpleNamespace(board=FICSBoard(0, 0, pgn=(
+            '[White "white1"]\n[Black "black1"]\n[Result "*"]\n'
+            '1. e4 {[%emt 0:00:00.000]} e5 {[%emt 0:00:01.000]} 2. Nf3 *\n'))))
+        self.assertEqual(game.tags, {"White": "white1", "Black": "black1", "Result": "*"})
+        self.assertEqual(game.moves, ["e4", "e5", "Nf3"])
+        # A takeback, and a move after missing moves
+        self.assertTrue(game.addMove(2, "c5"))
+        self.assertEqual(game.moves, ["e4", "c5"])
+        self.assertFalse(game.addMove(4, "Nc6"))
+
+
 if __name__ == '__main__':
     unittest.main()
     # suite = unittest.TestLoader().loadTestsFromTestCase(HelperManagerTests)
@@ -0,0 +1,130 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pychess.System import Log
+from pychess.System.Log import log, set_task_level, get_task_level
+
+
+class Message:
+    """ A message arg, which records the threads formatting it """
+
+    def __init__(self, text):
+        self.text = text
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return self.text
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.setFormatter(Log.formatter)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class LogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.level = log.logger.level
+        log.logger.setLevel(logging.DEBUG)
+        self.handlers = Log.listener.handlers
+        self.handler = ListHandler()
+        Log.listener.handlers = (self.handler, )
+
+    def tearDown(self):
+        self.flush()
+        Log.listener.handlers = self.handlers
+        log.logger.setLevel(self.level)
+        for task in list(Log.task_levels):
+            set_task_level(task, None)
+
+    def flush(self):
+        Log.listener.stop()
+        Log.listener.start()
+
+    def test1(self):
+        """Testing the formatting of messages in the writer thread"""
+
+        message = Message("e2e4")
+        log.debug("move %s", message, extra={"task": "engine"})
+        self.flush()
+        self.assertEqual(len(self.handler.messages), 1)
+        self.assertTrue(self.handler.messages[0].endswith(" engine DEBUG: move e2e4"))
+        self.assertEqual(len(message.threads), 1)
+        self.assertIsNot(message.threads[0], threading.current_thread())
+
+        log.info("no task")
+        self.flush()
+        self.assertTrue(self.handler.messages[1].endswith(" Default INFO: no task"))
+
+    def test2(self):
+        """Testing the levels of tasks"""
+
+        set_task_level("SQL", logging.WARNING)
+        set_task_level("raw", logging.INFO)
+        self.assertEqual(get_task_level("SQL"), logging.WARNING)
+        self.assertEqual(get_task_level(("freechess.org", "raw")), logging.INFO)
+        self.assertEqual(get_task_level(("freechess.org", "lines")), None)
+
+        message = Message("select")
+        log.debug("%s", message, extra={"task": "SQL"})
+        log.debug("%s", message, extra={"task": ("freechess.org", "raw")})
+        log.info("fics%", extra={"task": ("freechess.org", "raw")})
+        log.debug("<12>", extra={"task": ("freechess.org", "lines")})
+        log.warning("locked", extra={"task": "SQL"})
+        self.flush()
+        # The messages dropped are never formatted
+        self.assertEqual(message.threads, [])
+        self.assertEqual([text.split(": ", 1)[1] for text in self.handler.messages],
+                         ["fics%", "<12>", "locked"])
+
+        set_task_level("SQL", None)
+        log.debug("%s", message, extra={"task": "SQL"})
+        self.flush()
+        self.assertEqual(len(message.threads), 1)
+
+    def test3(self):
+        """Testing a list arg is formatted as it was logged"""
+
+        players = ["white"]
+        log.debug("players %r", players)
+        players.append("black")
+        self.flush()
+        self.assertTrue(self.handler.messages[0].endswith(" Default DEBUG: players ['white']"))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test4(self):
+        """Testing a forked process writes its records before os._exit"""
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "child.log")
+            handler = logging.FileHandler(path, delay=True, encoding="utf-8")
+            handler.setFormatter(Log.formatter)
+            Log.listener.handlers = (handler, )
+
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    log.info("from child %s", Message("worker"))
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            handler.close()
+
+            with open(path, encoding="utf-8") as f:
+                self.assertTrue(f.read().endswith(" Default INFO: from child worker\n"))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from pychess.Utils.const import NORMALCHESS, FISCHERRANDOMCHESS, CRAZYHOUSECHESS, \
+    ATOMICCHESS, MAKRUKCHESS, SITTUYINCHESS, CAMBODIANCHESS, ASEANCHESS, \
+    SUICIDECHESS
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.perft import do_perft, countLeaves, divide
+
+# Kiwipete
+FEN0 = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+POSITIONS = (
+    (NORMALCHESS, FEN0),
+    (NORMALCHESS, "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    (FISCHERRANDOMCHESS, "nr1kqrbn/pbpppppp/1p6/8/8/1P6/PBPPPPPP/NR1KQRBN w BFbf - 0 1"),
+    (CRAZYHOUSECHESS, "r1bqk2r/pppp1ppp/2n2n2/4p3/1b2P3/2N2N2/PPPP1PPP/R1BQKB1R/Pp w KQkq - 0 5"),
+    (ATOMICCHESS, "r4bn1/4p2r/2n2pp1/p2p2Pk/1p4Qp/2P1P3/PP1P3P/R1B1K2R b KQ - 0 1"),
+    (ATOMICCHESS, "r2nkbnr/pp1bpppp/2p5/1N6/3q4/8/PPPP1PPP/R1BQKB1R w KQkq - 0 1"),
+    (SUICIDECHESS, "rnbqkbnr/pppp1ppp/8/4p3/3P4/8/PPP1PPPP/RNBQKBNR w - - 0 2"),
+    (MAKRUKCHESS, "rnsmksnr/8/ppppp1pp/2P5/5p2/PP1PPPPP/8/RNSKMSNR w - - 0 3"),
+    (SITTUYINCHESS, "8/6k1/6p1/3s2P1/3npR2/2r5/p2N2F1/3K4 b - - 0 49"),
+    (CAMBODIANCHESS, "rns2snr/2m1k3/ppp1pppp/3p4/4P3/PPPP1PPP/3K1M2/RNS2SNR w - - 4 4"),
+    (ASEANCHESS, "rnbqkbnr/8/pppppppp/8/8/PPPPPPPP/8/RNBQKBNR w - - 0 1"),
+    # Touching kings, where the pinned knight may move
+    (ATOMICCHESS, "r7/8/8/8/8/8/Nk6/K7 w - - 0 1"),
+)
+
+
+class PerftTestCase(unittest.TestCase):
+    def test1(self):
+        """Testing countLeaves with known leaf counts"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN0)
+        cache = {}
+        for depth, nodes in ((1, 48), (2, 2039), (3, 97862)):
+            self.assertEqual(countLeaves(board, depth), nodes)
+            self.assertEqual(countLeaves(board, depth, cache), nodes)
+
+        board = LBoard(SITTUYINCHESS)
+        board.applyFen(POSITIONS[8][1])
+        self.assertEqual(countLeaves(board, 3, {}), 19354)
+
+        board = LBoard(MAKRUKCHESS)
+        board.applyFen(POSITIONS[7][1])
+        self.assertEqual(countLeaves(board, 3, {}), 17062)
+
+    def test2(self):
+        """Testing countLeaves against do_perft in several variants"""
+
+        for variant, fen in POSITIONS:
+            board = LBoard(variant)
+            board.applyFen(fen)
+            fen = board.asFen()
+            for depth in (1, 2):
+                nodes = do_perft(board, depth, 0)
+                self.assertEqual(countLeaves(board, depth), nodes, fen)
+                self.assertEqual(countLeaves(board, depth, {}), nodes, fen)
+            self.assertEqual(board.asFen(), fen)
+
+    def test3(self):
+        """Testing divide in worker processes"""
+
+        for variant, fen in POSITIONS[2:4]:
+            board = LBoard(variant)
+            board.applyFen(fen)
+            counts = divide(board, 3)
+            self.assertEqual(sum(count for move, count in counts),
+                             countLeaves(board, 3))
+            self.assertEqual(divide(board, 3, workers=2, cache={}), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,18 @@
 
+import os
+import random
+import shutil
+import tempfile
 import unittest
+import zipfile
 
 from pychess.Savers.pgn import load, walk, pattern, MOVE
 from pychess.System.protoopen import protoopen
+from pychess.Database.PgnImport import PgnImport, read_games, split_games
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import toSAN
+from pychess.Utils.lutils.perft import legalMoves
+from pychess.Utils.const import FEN_START
 
 
 file_names = ("atomic", "chess960rwch", "world_matches", "zh")
@@ -25,6 +35,125 @@ class PgnTestCase(unittest.TestCase):
         matches = [m[MOVE - 1] for m in pattern.findall(moves)]
         self.assertEqual(' '.join(matches), ' '.join(moves.split()))
 
+    def test_shards(self):
+        """Testing sharded header reading against reading the whole file"""
+        filename = "gamefiles/dortmund.pgn"
+        with protoopen(filename) as handle:
+            whole = [dict(tags) for tags in read_games(handle)]
+
+        bounds = split_games(filename, 8)
+        self.assertEqual(len(bounds), 8)
+
+        sharded = []
+        for start, end in zip(bounds, bounds[1:] + [None]):
+            with protoopen(filename) as handle:
+                handle.seek(start)
+                sharded += [dict(tags) for tags in read_games(handle, start, end)]
+        self.assertEqual(whole, sharded)
+
+    def test_append_sync(self):
+        """Testing incremental import of games appended to a .pgn"""
+        with open("gamefiles/dortmund.pgn", "rb") as f:
+            data = f.read()
+        half = data.index(b"\n[Event ", len(data) // 2) + 1
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "sync.pgn")
+
+            def reopen(content):
+                with open(path, "wb") as f:
+                    f.write(content)
+                # make the .pgn newer than its .sqlite
+                os.utime(path, (os.path.getmtime(path) + 10, ) * 2)
+                pgnfile = load(protoopen(path))
+                pgnfile.init_tag_database()
+                pgnfile.limit = 1000
+                games, plys = pgnfile.get_records()
+                pgnfile.close()
+                return [(rec["Id"], rec["Offset"], rec["Event"]) for rec in games]
+
+            first = reopen(data[:half])
+            appended = reopen(data)
+            self.assertEqual(appended[:len(first)], first)
+
+            os.remove(path.replace(".pgn", ".sqlite"))
+            full = reopen(data)
+            self.assertEqual(appended, full)
+
+            # changed prefix forces a full reimport
+            changed = reopen(data.replace(b"Dortmund", b"Dortmunt"))
+            self.assertEqual([rec[1] for rec in changed], [rec[1] for rec in full])
+            self.assertTrue(all(rec[2] == "Dortmunt" for rec in changed))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_zip_import(self):
+        """Testing import of a .zip of several .pgn files"""
+        names = ("dortmund.pgn", "threefold.pgn")
+        tmpdir = tempfile.mkdtemp()
+        try:
+            zippath = os.path.join(tmpdir, "both.zip")
+            with zipfile.ZipFile(zippath, "w") as zf:
+                for name in names:
+                    zf.write("gamefiles/%s" % name, name)
+            path = os.path.join(tmpdir, "db.pgn")
+            open(path, "w").close()
+
+            pgnfile = load(protoopen(path))
+            pgnfile.init_tag_database()
+            importer = PgnImport(pgnfile, cores=1)
+            importer.initialize()
+            # several chunks to a file
+            importer.CHUNK = 100
+            importer.do_import(zippath)
+            count = pgnfile.engine.execute("select count(*) from game").scalar()
+            pgnfile.close()
+
+            expected = 0
+            for name in names:
+                with protoopen("gamefiles/%s" % name) as handle:
+                    expected += sum(1 for tags in read_games(handle))
+            self.assertEqual(count, expected)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_lazy_history(self):
+        """Testing that loading a long game leaves the history of its boards unbuilt"""
+        board = LBoard()
+        board.applyFen(FEN_START)
+        rand = random.Random(3)
+        movetext = []
+        for ply in range(800):
+            moves = legalMoves(board)
+            if not moves:
+                break
+            move = rand.choice(moves)
+            if ply % 2 == 0:
+                movetext.append("%d." % (ply // 2 + 1))
+            movetext.append(toSAN(board, move))
+            board.applyMove(move)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "long.pgn")
+            with open(path, "w") as f:
+                f.write('[Event "long"]\n[Result "*"]\n\n%s *\n' % " ".join(movetext))
+            pgnfile = load(protoopen(path))
+            pgnfile.init_tag_database()
+            games, plys = pgnfile.get_records()
+            model = pgnfile.loadToModel(games[0])
+            pgnfile.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+        lboards = [board.board for board in model.boards]
+        self.assertEqual(len(lboards), len(board.hist_move) + 1)
+        # Only the last board needs its history, for the status of the game
+        self.assertTrue(all("history_parent" in lboard.__dict__ for lboard in lboards[1:-1]))
+        self.assertEqual([lboard.lastMove for lboard in lboards[1:]], board.hist_move)
+        self.assertEqual(lboards[-2].hist_move, board.hist_move[:-1])
+
 
 def create_test(o, n):
     def test_expected(self):
@@ -121,6 +121,37 @@ class PolyglotTestCase(unittest.TestCase):
 
         loop.run_until_complete(coro())
 
+    def testPolyglot_3(self):
+        """Testing probing several books and remapping changed books"""
+
+        board = LBoard(Board)
+        board.applyFen(testcases[0][0])
+        e2e4 = (E2 << 6) | E4
+        a2a4 = (A2 << 6) | A4
+
+        book1 = "polyglot_book1.bin"
+        book2 = "polyglot_book2.bin"
+        try:
+            with open(book1, "wb") as f:
+                f.write(book.entrystruct.pack(testcases[0][1], e2e4, 3, 0))
+            with open(book2, "wb") as f:
+                f.write(book.entrystruct.pack(testcases[0][1], a2a4, 1, 0))
+                f.write(book.entrystruct.pack(testcases[0][1], e2e4, 5, 0))
+
+            openings = book.getOpenings(board, (book1, book2, "missing_book.bin"))
+            self.assertEqual(openings, [(newMove(E2, E4), 3, 0), (newMove(A2, A4), 1, 0)])
+            # cached probe
+            self.assertEqual(book.getOpenings(board, (book1, )), [(newMove(E2, E4), 3, 0)])
+
+            with open(book1, "wb") as f:
+                f.write(book.entrystruct.pack(testcases[0][1] - 1, a2a4, 1, 0))
+                f.write(book.entrystruct.pack(testcases[0][1], e2e4, 7, 0))
+            self.assertEqual(book.getOpenings(board, (book1, )), [(newMove(E2, E4), 7, 0)])
+        finally:
+            for fi in (book1, book2):
+                book.books.pop(fi).close()
+                os.remove(fi)
+
 
 if __name__ == '__main__':
     unittest.main()
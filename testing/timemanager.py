@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from pychess.Utils.lutils.ltime import TimeManager, MOVE_OVERHEAD, HARD_FACTOR, \
+    STABLE_ITERATIONS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.
+
+    def __call__(self):
+        return self.now
+
+
+class TimeManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch("pychess.Utils.lutils.ltime.time", new=self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def iterate(self, timer, moves, times, score=0):
+        """ Runs iterations taking times seconds, finding the best moves,
+            until the timer stops them. Returns the number run. """
+        for depth, (move, seconds) in enumerate(zip(moves, times), 1):
+            self.clock.now += seconds
+            self.assertLessEqual(self.clock.now, timer.endtime)
+            if timer.onIteration(depth, [move], score):
+                return depth
+        return len(times)
+
+    def test1(self):
+        """Testing soft and hard time limits"""
+
+        timer = TimeManager(60, 0, 40)
+        self.assertAlmostEqual(timer.soft, (60 - MOVE_OVERHEAD) / 40)
+        self.assertAlmostEqual(timer.hard, timer.soft * HARD_FACTOR)
+        self.assertEqual(timer.endtime, self.clock.now + timer.hard)
+
+        # Little time left
+        timer = TimeManager(1, 2, 40)
+        self.assertLess(timer.hard, 0.5)
+        self.assertLessEqual(timer.soft, timer.hard)
+
+        # The increment is used
+        self.assertGreater(TimeManager(60, 2, 40).soft, TimeManager(60, 0, 40).soft)
+
+        # Fixed time per move
+        timer = TimeManager(0, 0, 1, searchtime=5)
+        self.assertEqual(timer.soft, timer.hard)
+        self.assertAlmostEqual(timer.hard, 5 - MOVE_OVERHEAD)
+
+    def test2(self):
+        """Testing the timer doesn't start iterations it can't finish"""
+
+        timer = TimeManager(0, 0, 1, searchtime=10)
+        # The next iteration would take 4 * 3 seconds
+        self.assertEqual(self.iterate(timer, [1] * 10, [0.1, 0.4, 3, 12]), 3)
+
+    def test3(self):
+        """Testing the timer stops a stable search and extends an unstable one"""
+
+        times = [0.01 * 2 ** i for i in range(16)]
+        timer = TimeManager(600, 0, 40)
+        stable = self.iterate(timer, [1] * 16, times)
+
+        timer = TimeManager(600, 0, 40)
+        unstable = self.iterate(timer, list(range(16)), times)
+        self.assertGreater(unstable, stable)
+        self.assertGreater(stable, STABLE_ITERATIONS)
+
+        # A dropping score gets more time too
+        timer = TimeManager(600, 0, 40)
+        for depth, seconds in enumerate(times, 1):
+            self.clock.now += seconds
+            if timer.onIteration(depth, [1], -100 * depth):
+                break
+        self.assertGreater(depth, stable)
+
+
+if __name__ == '__main__':
+    unittest.main()
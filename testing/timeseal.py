@@ -0,0 +1,158 @@
+import asyncio
+import random
+import unittest
+
+from pychess.ic.TimeSeal import ICSStreamReaderProtocol, ENCODE, ENCODELEN, FILLER, \
+    G_MARKER
+
+
+def encode_bytewise(inbuf, timestamp):
+    """ The byte by byte encoding of TimeSeal, as it was implemented before """
+    enc = inbuf + bytearray('\x18%d\x19' % timestamp, "ascii")
+    padding = 12 - len(enc) % 12
+    filler = random.sample(FILLER, padding)
+    enc += bytearray(filler)
+
+    buf = enc
+
+    for i in range(0, len(buf), 12):
+        buf[i + 11], buf[i] = buf[i], buf[i + 11]
+        buf[i + 9], buf[i + 2] = buf[i + 2], buf[i + 9]
+        buf[i + 7], buf[i + 4] = buf[i + 4], buf[i + 7]
+
+    encode_offset = random.randrange(ENCODELEN)
+
+    for i in range(len(buf)):
+        buf[i] |= 0x80
+        j = (i + encode_offset) % ENCODELEN
+        buf[i] = (buf[i] ^ ENCODE[j]) - 32
+
+    buf += bytearray([0x80 | encode_offset])
+    return buf
+
+
+def decode_bytewise(buf, stateinfo=None):
+    """ The byte by byte decoding of TimeSeal, as it was implemented before """
+    expected_table = b"[G]\n\r"
+    final_state = len(expected_table)
+    g_count = 0
+    result = []
+
+    if stateinfo:
+        state, lookahead = stateinfo
+    else:
+        state, lookahead = 0, []
+
+    lenb = len(buf)
+    idx = 0
+    while idx < lenb:
+        buffer_item = buf[idx]
+        expected = expected_table[state]
+        if buffer_item == expected:
+            state += 1
+            if state == final_state:
+                g_count += 1
+                lookahead = []
+                state = 0
+            else:
+                lookahead.append(buffer_item)
+            idx += 1
+        elif state == 0:
+            result.append(buffer_item)
+            idx += 1
+        else:
+            result.extend(lookahead)
+            lookahead = []
+            state = 0
+
+    return bytearray(result), g_count, (state, lookahead)
+
+
+def unscramble(buf):
+    """ Returns the bytes of an encoded buf, before the scrambling """
+    encode_offset = buf[-1] & 0x7f
+    buf = bytearray(((b + 32) & 0xff ^ ENCODE[(i + encode_offset) % ENCODELEN]) & 0x7f
+                    for i, b in enumerate(buf[:-1]))
+    for i in range(0, len(buf), 12):
+        buf[i + 11], buf[i] = buf[i], buf[i + 11]
+        buf[i + 9], buf[i + 2] = buf[i + 2], buf[i + 9]
+        buf[i + 7], buf[i + 4] = buf[i + 4], buf[i + 7]
+    return buf
+
+
+class TimeSealTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.protocol = ICSStreamReaderProtocol(
+            asyncio.StreamReader(loop=self.loop), None, self.loop, "test", True)
+        self.random = random.Random(42)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def stream(self, length):
+        """ Returns length random bytes, rich in markers and parts of them """
+        pieces = [G_MARKER, G_MARKER[:1], G_MARKER[:2], G_MARKER[:3],
+                  G_MARKER[:4], G_MARKER[1:], b"[", b"G", b"]", b"\n", b"\r",
+                  b"fics% ", b"<12> rnbqkbnr"]
+        data = bytearray()
+        while len(data) < length:
+            if self.random.random() < 0.5:
+                data += self.random.choice(pieces)
+            else:
+                data.append(self.random.randrange(256))
+        return bytes(data)
+
+    def test1(self):
+        """Testing encode against the byte by byte encoding"""
+
+        for length in list(range(30)) + [100, 1000, 5000]:
+            text = bytearray(self.random.randrange(32, 127) for i in range(length))
+            for timestamp in (1, 123456, 9999999):
+                seed = self.random.random()
+                random.seed(seed)
+                encoded = self.protocol.encode(bytearray(text), timestamp)
+                random.seed(seed)
+                self.assertEqual(encoded, encode_bytewise(bytearray(text), timestamp))
+
+                stamped = text + bytearray('\x18%d\x19' % timestamp, "ascii")
+                self.assertEqual(unscramble(encoded)[:len(stamped)], stamped)
+                self.assertEqual(len(encoded) % 12, 1)
+
+    def test2(self):
+        """Testing decode against the byte by byte decoding"""
+
+        for i in range(200):
+            data = self.stream(self.random.randrange(1, 300))
+            result, g_count, stateinfo = self.protocol.decode(data)
+            expected, expected_count, expected_state = decode_bytewise(data)
+            self.assertEqual(result, expected, data)
+            self.assertEqual(g_count, expected_count)
+            self.assertEqual(stateinfo[0], expected_state[0])
+            self.assertEqual(list(stateinfo[1]), expected_state[1])
+
+    def test3(self):
+        """Testing decode of a stream split into packets"""
+
+        for i in range(100):
+            data = self.stream(self.random.randrange(1, 2000))
+            cuts = sorted(self.random.randrange(len(data) + 1)
+                          for j in range(self.random.randrange(1, 40)))
+            packets = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+
+            results = [bytearray(), bytearray()]
+            counts = [0, 0]
+            states = [None, None]
+            for packet in packets:
+                for k, decode in enumerate((self.protocol.decode, decode_bytewise)):
+                    result, g_count, states[k] = decode(packet, states[k])
+                    results[k] += result
+                    counts[k] += g_count
+                self.assertEqual(results[0], results[1])
+                self.assertEqual(list(states[0][1]), states[1][1])
+            self.assertEqual(counts[0], counts[1])
+            self.assertEqual(counts[0], data.count(G_MARKER))
+
+
+if __name__ == '__main__':
+    unittest.main()